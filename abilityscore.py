@@ -1,8 +1,10 @@
-from data_structures import JSONObject, Metadata, register_object
+from data_structures import Field, JSONObject, Metadata, register_object
 from typing import Any, Optional
 
 
 class AbilityScoreRV:
+    __slots__ = ("_base", "_extra")
+
     def __init__(self) -> None:
         self._base: int = 0
         self._extra: int = 0
@@ -15,12 +17,19 @@ class AbilityScoreRV:
 
     def __str__(self) -> str:
         cls = self.__class__.__name__
-        attrs = ', '.join(f"{k}={v!r}" for k, v in self.__dict__.items())
+        attrs = ', '.join(f"{k}={getattr(self, k)!r}" for k in self.__slots__)
         return f"{cls}({attrs})"
 
 
 @register_object
 class AbilityScore(JSONObject):
+    __slots__ = ("_object", "_flags", "str", "dex", "con", "int", "wis", "chr", "extra", "metadata")
+    _schema = (
+        Field("str"), Field("dex"), Field("con"), Field("int"), Field("wis"), Field("chr"),
+        Field("extra", "AbilityScore", required=False),
+        Field("metadata", Metadata),
+    )
+
     def __init__(self, json_data: dict[str, Any] | None = None) -> None:
         super().__init__(json_data)
         if json_data:
@@ -48,15 +57,12 @@ class AbilityScore(JSONObject):
         self.extra: AbilityScore
 
     def validate(self) -> None:
-        def is_valid(val: Any) -> bool:
-            return (isinstance(val, int) and
-                    val <= self.metadata.get("max") and
-                    val >= self.metadata.get("min"))
-
         if isinstance(self.metadata, Metadata):
-            if not (is_valid(self.str) and is_valid(self.dex) and is_valid(self.con) and 
-                    is_valid(self.int) and is_valid(self.wis) and is_valid(self.chr)):
-                raise ValueError("Invalid AbilityScore parameters.")
+            max_val = self.metadata.get("max")
+            min_val = self.metadata.get("min")
+            for val in (self.str, self.dex, self.con, self.int, self.wis, self.chr):
+                if not (isinstance(val, int) and val <= max_val and val >= min_val):
+                    raise ValueError("Invalid AbilityScore parameters.")
         else:
             raise ValueError(f"Expected class 'Metadata' in {self.__class__.__name__}")
         return
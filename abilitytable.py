@@ -0,0 +1,237 @@
+from typing import Any, Iterable, Optional
+import numpy as np
+from abilityscore import AbilityScore, AbilityScoreRV
+from data_structures import Metadata
+
+
+ABILITIES = ("str", "dex", "con", "int", "wis", "chr")
+ABILITY_INDEX = {name: i for i, name in enumerate(ABILITIES)}
+
+Rows = Optional[np.ndarray | slice | Iterable[int]]
+
+
+class AbilityScoreTable:
+    """
+    Skóre schopností mnoha tvorů ve dvou polích (N, 6) int16 (základ
+    a extra) s jedním min/max pro celou tabulku, takže plošné efekty
+    a odvozené hodnoty jsou jedna operace nad polem místo čtení atributů
+    tvora po tvorovi.
+
+    Argument `rows` přijímá pole indexů, booleovskou masku, slice nebo None
+    (všechny řádky).
+    """
+
+    def __init__(self, min_val: int = 1, max_val: int = 20, extra_min: int = 0, extra_max: int = 5,
+                 capacity: int = 64) -> None:
+        self.metadata = Metadata({"min": min_val, "max": max_val})
+        self.extra_metadata = Metadata({"min": extra_min, "max": extra_max})
+        self._base = np.zeros((capacity, 6), np.int16)
+        self._extra = np.zeros((capacity, 6), np.int16)
+        self._has_extra = np.zeros(capacity, bool)
+        self._flags: list[Any] = []
+        self.count = 0
+
+    @classmethod
+    def from_scores(cls, scores: Iterable[AbilityScore]) -> "AbilityScoreTable":
+        """Tabulka z existujících skóre; všechna musí mít stejné meze."""
+        scores = list(scores)
+        table: Optional[AbilityScoreTable] = None
+        for score in scores:
+            bounds = _bounds(score)
+            if table is None:
+                table = cls(*bounds, capacity=max(len(scores), 1))
+            elif bounds != table.bounds:
+                raise ValueError("AbilityScoreTable rows must share min/max bounds.")
+            table.add(score)
+        return table if table is not None else cls()
+
+    @property
+    def bounds(self) -> tuple[int, int, int, int]:
+        return (self.metadata.get("min"), self.metadata.get("max"),
+                self.extra_metadata.get("min"), self.extra_metadata.get("max"))
+
+    @property
+    def base(self) -> np.ndarray:
+        return self._base[:self.count]
+
+    @property
+    def extra(self) -> np.ndarray:
+        return self._extra[:self.count]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _grow(self) -> None:
+        capacity = max(2 * len(self._base), 1)
+        for name in ("_base", "_extra", "_has_extra"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def add(self, score: AbilityScore | None = None) -> int:
+        """Přidá řádek (kopii `score`, je-li zadáno); vrací jeho index."""
+        if self.count == len(self._base):
+            self._grow()
+        row = self.count
+        self.count += 1
+        flags = None
+        if score is not None:
+            self._base[row] = [getattr(score, a) for a in ABILITIES]
+            extra = getattr(score, "extra", None)
+            if extra is not None:
+                self._extra[row] = [getattr(extra, a) for a in ABILITIES]
+                self._has_extra[row] = True
+            flags = getattr(score, "_flags", None)
+        self._flags.append(flags)
+        return row
+
+    def modify(self, ability: str, modifier: int | np.ndarray, rows: Rows = None, extra: bool = False) -> None:
+        """Přičte `modifier` (skalár nebo pole po řádcích) k jedné schopnosti, oříznuto na meze tabulky."""
+        column = ABILITY_INDEX[ability]
+        values = self.extra if extra else self.base
+        lo, hi = self.bounds[2:] if extra else self.bounds[:2]
+        selected = slice(None) if rows is None else rows
+        changed = values[selected, column].astype(np.int32) + modifier
+        values[selected, column] = np.clip(changed, lo, hi)
+
+    def combined(self, ability: str | None = None, rows: Rows = None) -> np.ndarray:
+        """Základ + extra, buď (N, 6), nebo (N,) pro jednu schopnost."""
+        selected = slice(None) if rows is None else rows
+        column = slice(None) if ability is None else ABILITY_INDEX[ability]
+        return self.base[selected, column].astype(np.int32) + self.extra[selected, column]
+
+    def bonus_per(self, val: int, ability: str | None = None, rows: Rows = None) -> np.ndarray:
+        return (self.combined(ability, rows) - 10) // val
+
+    def view(self, row: int) -> "AbilityScoreView":
+        if not 0 <= row < self.count:
+            raise IndexError(row)
+        return AbilityScoreView(self, row)
+
+    def views(self) -> list["AbilityScoreView"]:
+        return [AbilityScoreView(self, row) for row in range(self.count)]
+
+
+def _bounds(score: AbilityScore) -> tuple[int, int, int, int]:
+    extra = getattr(score, "extra", None)
+    extra_meta = extra.metadata if extra is not None else None
+    return (score.metadata.get("min"), score.metadata.get("max"),
+            extra_meta.get("min") if extra_meta else 0, extra_meta.get("max") if extra_meta else 5)
+
+
+def _column(name: str, extra: bool) -> property:
+    column = ABILITY_INDEX[name]
+    attr = "_extra" if extra else "_base"
+
+    def getter(self: Any) -> int:
+        return int(getattr(self._table, attr)[self._row, column])
+
+    def setter(self: Any, value: int) -> None:
+        getattr(self._table, attr)[self._row, column] = value
+
+    return property(getter, setter)
+
+
+class _ExtraScoreView(AbilityScore):
+    """Část `extra` jednoho řádku tabulky."""
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: AbilityScoreTable, row: int) -> None:
+        object.__setattr__(self, "_object", "AbilityScore")
+        object.__setattr__(self, "_table", table)
+        object.__setattr__(self, "_row", row)
+
+    @property
+    def metadata(self) -> Metadata:
+        return self._table.extra_metadata
+
+    @property
+    def extra(self) -> Any:
+        raise AttributeError("extra")
+
+    def modify(self, ability: str, modifier: int) -> bool:
+        if ability not in ABILITY_INDEX:
+            return False
+        self._table.modify(ability, modifier, [self._row], extra=True)
+        return True
+
+
+class AbilityScoreView(AbilityScore):
+    """
+    Jeden řádek AbilityScoreTable, který se chová jako AbilityScore: přístup
+    k atributům, modify(), get(), validate() i to_dict() čtou a zapisují
+    přímo do tabulky.
+    """
+    __slots__ = ("_table", "_row")
+
+    def __init__(self, table: AbilityScoreTable, row: int) -> None:
+        object.__setattr__(self, "_object", "AbilityScore")
+        object.__setattr__(self, "_table", table)
+        object.__setattr__(self, "_row", row)
+        if table._flags[row] is not None:
+            object.__setattr__(self, "_flags", table._flags[row])
+
+    @property
+    def metadata(self) -> Metadata:
+        return self._table.metadata
+
+    @property
+    def extra(self) -> _ExtraScoreView:
+        if not self._table._has_extra[self._row]:
+            raise AttributeError("extra")
+        return _ExtraScoreView(self._table, self._row)
+
+    def modify(self, ability: str, modifier: int) -> bool:
+        if ability not in ABILITY_INDEX:
+            return False
+        self._table.modify(ability, modifier, [self._row])
+        return True
+
+    def get(self, ability: str) -> Optional[AbilityScoreRV]:
+        """Skóre schopnosti podle zkratky."""
+        column = ABILITY_INDEX.get(ability)
+        if column is None:
+            return None
+        rv: AbilityScoreRV = AbilityScoreRV()
+        rv._base = int(self._table._base[self._row, column])
+        rv._extra = int(self._table._extra[self._row, column]) if self._table._has_extra[self._row] else 0
+        return rv
+
+
+for _name in ABILITIES:
+    setattr(_ExtraScoreView, _name, _column(_name, extra=True))
+    setattr(AbilityScoreView, _name, _column(_name, extra=False))
+del _name
+# odkaz na tabulku se do skóre neukládá
+_ExtraScoreView._slot_names = AbilityScoreView._slot_names = AbilityScore._slot_names
+
+
+def main() -> None:
+    import time
+    from benchmark import CREATURE_DATA
+
+    count = 10_000
+    scores = [AbilityScore(CREATURE_DATA["ability_score"]) for _ in range(count)]
+    table = AbilityScoreTable.from_scores(scores)
+    rng = np.random.default_rng(0)
+    in_range = rng.random(count) < 0.3
+
+    start = time.perf_counter()
+    for score, hit in zip(scores, in_range):
+        if hit:
+            score.modify("str", -2)
+    print(f"Per object: {time.perf_counter() - start:.4f} s")
+    start = time.perf_counter()
+    table.modify("str", -2, in_range)
+    print(f"Table:      {time.perf_counter() - start:.4f} s")
+
+    print("Same result:", all(s.to_dict() == table.view(i).to_dict() for i, s in enumerate(scores)))
+    print("Bonus per 2:", table.bonus_per(2, "str")[:5], scores[0].get("str").bonus_per(2))
+    view = table.view(0)
+    view.modify("dex", 100)
+    print(view, view.get("dex").combined())
+
+
+if __name__ == "__main__":
+    main()
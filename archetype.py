@@ -0,0 +1,231 @@
+import copy
+from typing import Any, Dict
+from abilityscore import AbilityScore
+from behaviour import Behaviour
+from creature import Creature
+from data_structures import JSONObject, Metadata, register_object
+
+
+NEW = object.__new__
+SET = object.__setattr__
+_MISSING = object()
+
+
+def _encode(value: Any) -> Any:
+    """Hodnota pole tak, jak by ji zapsal JSONObject.to_dict()."""
+    if isinstance(value, JSONObject):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [v.to_dict() if isinstance(v, JSONObject) else v for v in value]
+    return value
+
+
+def _copy_metadata(metadata: Metadata) -> Metadata:
+    """Mělká kopie Metadata bez validace, aby změna mezí nezasáhla šablonu."""
+    result = Metadata.__new__(Metadata)
+    for name in Metadata.__slots__:
+        try:
+            value = object.__getattribute__(metadata, name)
+        except AttributeError:
+            continue
+        if name in ("_flags", "_extra") and value is not None:
+            value = copy.copy(value)
+        SET(result, name, value)
+    return result
+
+
+def _copy_score(score: AbilityScore) -> AbilityScore:
+    """Kopie AbilityScore bez validace, včetně Metadata (mezí)."""
+    result = AbilityScore.__new__(AbilityScore)
+    for name in AbilityScore._slot_names:
+        try:
+            value = object.__getattribute__(score, name)
+        except AttributeError:
+            continue
+        if name == "extra" and isinstance(value, AbilityScore):
+            value = _copy_score(value)
+        elif name == "metadata" and isinstance(value, Metadata):
+            value = _copy_metadata(value)
+        elif name == "_flags":
+            value = copy.copy(value)
+        SET(result, name, value)
+    return result
+
+
+class Archetype:
+    """
+    Šablona tvora: JSON se dekóduje a zvaliduje jednou, spawn() pak vytváří
+    instance bez čtení dictu.
+
+    Nová instance má nastavený jen odkaz na šablonu a vlastní hodnoty
+    z spawn(); ostatní pole si doplní až při prvním přístupu. Jméno a rasu
+    (neměnné řetězce) sdílí se šablonou odkazem, stejně jako
+    BehaviourDefinition. Měnitelné části (flagy, ability_score včetně
+    Metadata, behaviour, inventory, tags, reactions) se při prvním přístupu
+    zkopírují; have_flag() flagy jen čte, takže kopii nevynutí.
+    """
+
+    # pole sdílená se šablonou odkazem
+    SHARED = ("_object", "name", "race")
+
+    def __init__(self, name: str, data: Dict[str, Any]) -> None:
+        self.name = name
+        self.prototype = Creature(data)
+        self.template: Dict[str, Any] = self.prototype.to_dict()
+
+    def spawn(self, **overrides: Any) -> "ArchetypeCreature":
+        """Nová instance; `overrides` jsou vlastní hodnoty polí (např. name)."""
+        creature = NEW(ArchetypeCreature)
+        SET(creature, "_archetype", self)
+        for field, value in overrides.items():
+            SET(creature, field, value)
+        return creature
+
+    def _materialize(self, creature: "ArchetypeCreature", field: str) -> Any:
+        prototype = self.prototype
+        try:
+            value = object.__getattribute__(prototype, field)
+        except AttributeError:
+            raise AttributeError(f"'ArchetypeCreature' object has no attribute '{field}'") from None
+        if isinstance(value, AbilityScore):
+            value = _copy_score(value)
+        elif isinstance(value, Behaviour):
+            value = Behaviour(value.definition)
+        elif field not in self.SHARED:
+            value = copy.deepcopy(value)
+        SET(creature, field, value)
+        return value
+
+    def diff(self, creature: "ArchetypeCreature") -> Dict[str, Any]:
+        """Kompaktní podoba instance: odkaz na šablonu a pole, která se od ní liší."""
+        result: Dict[str, Any] = {"_object": "ArchetypeCreature", "_archetype": self.name}
+        template = self.template
+        for field in Creature._slot_names:
+            if field == "_object":
+                continue
+            try:
+                value = object.__getattribute__(creature, field)
+            except AttributeError:
+                continue
+            encoded = _encode(value)
+            if encoded != template.get(field, _MISSING):
+                result[field] = encoded
+        return result
+
+
+ARCHETYPES: Dict[str, Archetype] = {}
+
+
+def register_archetype(name: str, data: Dict[str, Any]) -> Archetype:
+    archetype = ARCHETYPES[name] = Archetype(name, data)
+    return archetype
+
+
+def spawn(name: str, **overrides: Any) -> "ArchetypeCreature":
+    return ARCHETYPES[name].spawn(**overrides)
+
+
+@register_object
+class ArchetypeCreature(Creature):
+    """
+    Creature vytvořený z Archetype. Pole, která instance ještě nemá, se čtou
+    ze šablony (viz Archetype._materialize).
+
+    to_dict() vrací plnou podobu (načte se jako obyčejný Creature),
+    to_dict(compact=True) jen {"_archetype": jméno, ...rozdíly}; tu umí
+    načíst decode_value(), pokud je archetyp zaregistrovaný.
+    """
+    __slots__ = ("_archetype",)
+
+    def __init__(self, json_data: dict[str, Any] | None = None) -> None:
+        name = (json_data or {}).get("_archetype")
+        if name not in ARCHETYPES:
+            raise ValueError(f"Unknown archetype '{name}'.")
+        SET(self, "_archetype", ARCHETYPES[name])
+        fields = {field.name: field.type for field in Creature._schema}
+        for key, value in json_data.items():
+            if key in ("_object", "_archetype"):
+                continue
+            cls = fields.get(key)
+            if isinstance(value, dict) and isinstance(cls, type):
+                value = cls(value)
+            setattr(self, key, value)
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            archetype = object.__getattribute__(self, "_archetype")
+        except AttributeError:
+            return super().__getattr__(name)
+        return archetype._materialize(self, name)
+
+    def have_flag(self, flag: str) -> bool:
+        try:
+            flags = object.__getattribute__(self, "_flags")
+        except AttributeError:
+            flags = getattr(self._archetype.prototype, "_flags", None)
+        return flag in (flags or ())
+
+    def _items(self):
+        # pole, která instance ještě nezkopírovala, mají hodnotu ze šablony
+        prototype = self._archetype.prototype
+        get = object.__getattribute__
+        for name in self._slot_names:
+            try:
+                yield name, get(self, name)
+            except AttributeError:
+                try:
+                    yield name, get(prototype, name)
+                except AttributeError:
+                    pass
+
+    def to_dict(self, compact: bool = False) -> dict[str, Any]:
+        # plná podoba má "_object" šablony, tj. "Creature"
+        return self._archetype.diff(self) if compact else super().to_dict()
+
+
+# odkaz na šablonu se neukládá
+ArchetypeCreature._slot_names = Creature._slot_names
+
+
+def main() -> None:
+    import time
+    import tracemalloc
+    from benchmark import CREATURE_DATA
+    from data_structures import decode_value
+
+    count = 5000
+    dragon = register_archetype("dragon", CREATURE_DATA)
+
+    start = time.perf_counter()
+    full = [Creature({**CREATURE_DATA, "name": f"Dragon {i}"}) for i in range(count)]
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    spawned = [dragon.spawn(name=f"Dragon {i}") for i in range(count)]
+    spawn_time = time.perf_counter() - start
+    print(f"Creature(dict): {built * 1e6 / count:.1f} us, spawn(): {spawn_time * 1e6 / count:.2f} us "
+          f"({built / spawn_time:.0f}x)")
+
+    tracemalloc.start()
+    kept = [dragon.spawn(name=f"Dragon {i}") for i in range(count)]
+    print(f"Memory per spawned creature: {tracemalloc.get_traced_memory()[0] / count:.0f} B")
+    tracemalloc.stop()
+    del kept
+
+    context = {"enemies_in_sight": 2, "distance_to_nearest_enemy": 7, "stamina": 10}
+    for a, b in zip(full, spawned):
+        a.think(dict(context))
+        b.think(dict(context))
+    print("Same to_dict:", all(a.to_dict() == b.to_dict() for a, b in zip(full, spawned)))
+
+    hero = spawned[0]
+    hero.ability_score.modify("str", -5)
+    hero.inventory.append("gold")
+    print("Template untouched:", dragon.prototype.ability_score.str, spawned[1].ability_score.str,
+          spawned[1].inventory)
+    compact = hero.to_dict(compact=True)
+    print("Compact:", sorted(compact))
+    print("Round trip:", decode_value(compact).to_dict() == hero.to_dict())
+
+
+if __name__ == "__main__":
+    main()
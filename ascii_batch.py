@@ -0,0 +1,122 @@
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional
+from data_structures import AsciiImage
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp")
+CACHE_DIR = os.path.join(".cache", "ascii")
+DEFAULT_CHARSET = AsciiImage().charset()
+
+
+def cache_key(filepath: str, max_height: int | None, max_width: int | None, charset: str) -> str:
+    """Klíč převodu: obsah souboru + cílová velikost + znaková sada."""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    digest.update(json.dumps([max_height, max_width, charset]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _convert(filepath: str, max_height: int | None, max_width: int | None, charset: str) -> Optional[dict[str, Any]]:
+    image = AsciiImage()
+    image.charset(charset)
+    image.from_file(filepath, max_height, max_width)
+    if not image.width:
+        return None
+    return {"data": image.data, "metadata": image.metadata.to_dict()}
+
+
+def convert_directory(directory: str, max_height: int | None = None, max_width: int | None = None,
+                      charset: str = DEFAULT_CHARSET, cache_dir: str | None = CACHE_DIR,
+                      workers: int | None = None) -> dict[str, AsciiImage]:
+    """
+    Převede všechny obrázky v adresáři na AsciiImage (klíčem je jméno souboru).
+
+    Nekešované soubory se převádějí paralelně v procesech; výsledky se ukládají
+    do `cache_dir` pod cache_key(), takže opakovaný běh nic nepřevádí.
+    `cache_dir=None` kešování vypne.
+    """
+    names = sorted(n for n in os.listdir(directory) if n.lower().endswith(IMAGE_EXTENSIONS))
+    results: dict[str, Optional[dict[str, Any]]] = {}
+    pending: dict[str, str] = {}
+    for name in names:
+        path = os.path.join(directory, name)
+        key = cache_key(path, max_height, max_width, charset)
+        cached = os.path.join(cache_dir, f"{key}.json") if cache_dir else None
+        if cached and os.path.exists(cached):
+            with open(cached, "r", encoding="utf-8") as f:
+                results[name] = json.load(f)
+        else:
+            pending[name] = key
+
+    if pending:
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                name: pool.submit(_convert, os.path.join(directory, name), max_height, max_width, charset)
+                for name in pending
+            }
+            for name, future in futures.items():
+                results[name] = data = future.result()
+                if data is not None and cache_dir:
+                    with open(os.path.join(cache_dir, f"{pending[name]}.json"), "w", encoding="utf-8") as f:
+                        json.dump(data, f, ensure_ascii=False)
+
+    images = {}
+    for name in names:
+        data = results[name]
+        if data is None:
+            logging.warning(f"Could not convert '{name}'.")
+            continue
+        image = AsciiImage(data)
+        image.charset(charset)
+        images[name] = image
+    return images
+
+
+def _sample_directory(directory: str, count: int = 8) -> None:
+    """Vzorové obrázky (přechody a vlny v odstínech šedi) pro demo bez argumentu."""
+    import numpy as np
+    from PIL import Image
+
+    y, x = np.mgrid[0:480, 0:640]
+    for i in range(count):
+        pixels = (np.sin(x / (9.0 + 2 * i)) * np.cos(y / (7.0 + i)) * 127 + 128).astype(np.uint8)
+        Image.fromarray(pixels).save(os.path.join(directory, f"sample_{i}.png"))
+
+
+def main() -> None:
+    import shutil
+    import sys
+    import tempfile
+    import time
+
+    if len(sys.argv) > 1:
+        directory, cache_dir, cleanup = sys.argv[1], CACHE_DIR, None
+    else:
+        cleanup = tempfile.mkdtemp()
+        directory, cache_dir = os.path.join(cleanup, "images"), os.path.join(cleanup, "cache")
+        os.makedirs(directory)
+        _sample_directory(directory)
+        print(f"No directory given, converting sample images in {directory}")
+    try:
+        for attempt in ("cold", "cached"):
+            start = time.perf_counter()
+            images = convert_directory(directory, max_height=40, cache_dir=cache_dir)
+            print(f"{attempt}: {len(images)} images in {time.perf_counter() - start:.2f} s")
+        for name, image in sorted(images.items())[:1]:
+            print(name)
+            print(image)
+    finally:
+        if cleanup:
+            shutil.rmtree(cleanup)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,136 +1,458 @@
+import logging
+import os
 import random
-import math
-from typing import Any, Dict, List, Optional
+import time
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, MutableMapping, Optional, Tuple, TYPE_CHECKING
+from behaviour_analysis import BEHAVIOUR_DIR, analyze, step_dependencies
+from condition import Condition, _ContextView, compile_condition
+from context import CreatureContext
 from data_structures import JSONObject, register_object
 from json import loads
 
+if TYPE_CHECKING:
+    from behaviour_profile import BehaviourProfiler
 
-def safe_eval(expr: str, context: Dict[str, Any]) -> bool:
-    """Vyhodnotí výraz v bezpečném omezeném prostředí."""
-    safe_names = {
-        "min": min, "max": max, "abs": abs, "math": math,
-        **{k: v for k, v in context.items() if isinstance(v, (int, float, bool))}
-    }
-    try:
-        return bool(eval(expr, {"__builtins__": {}}, safe_names))
-    except Exception:
-        return False
+
+def _freeze(value: Any) -> Any:
+    """Neměnná kopie JSON dat: slovníky jako MappingProxyType, seznamy jako n-tice."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """Opak _freeze(): běžné dict/list, např. pro uložení nebo pickle."""
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
 
 
 class BehaviourState:
-    def __init__(self, name: str, data: Dict[str, Any]):
+    def __init__(self, name: str, data: Mapping[str, Any], index: int = 0):
         self.name = name
-        self.actions: List[str] = data.get("actions", [])
-        self.transitions: List[Dict[str, Any]] = data.get("transitions", [])
+        self.index = index  # pozice v Behaviour._cooldowns
+        # akce se vrací přímo z step(), proto neměnná n-tice
+        self.actions: Tuple[str, ...] = tuple(data.get("actions", ()))
+        self.transitions: Tuple[Mapping[str, Any], ...] = data.get("transitions", ())
         self.type: str = data.get("type", "idle")
-        self.context: Dict[str, Any] = data.get("context", {})
+        self.context: Mapping[str, Any] = data.get("context", MappingProxyType({}))
+        self.cooldown: int = self.context.get("cooldown", 0)
+        self.cost: Tuple[Tuple[str, Any], ...] = tuple(self.context.get("cost", {}).items())
+        # Behaviour._settled kroku, který v tomto stavu skončil bez přechodu
+        self.settled: Tuple[str, Tuple[str, ...]] = (name, () if self.type == "transition" else self.actions)
+        self.compiled_transitions: List[Tuple[Optional[str], Condition]] = [
+            (t.get("to"), compile_condition(t.get("condition", "True")))
+            for t in self.transitions
+        ]
+        # klíče kontextu, které přechody čtou (pro cache výsledku)
+        self.keys: Tuple[str, ...] = tuple(sorted(
+            frozenset().union(*(condition.names for _, condition in self.compiled_transitions))
+        ))
 
-    def get_next_state(self, context: Dict[str, Any], ignored: list[str]) -> Optional[str]:
+    def get_next_state(self, context: Dict[str, Any], ignored: Iterable[str] = ()) -> Optional[str]:
         """Vrátí první splněný přechod podle kontextu."""
-        for t in self.transitions:
-            if safe_eval(t.get("condition", "True"), context):
-                if t.get("to") not in ignored:
-                    return t.get("to")
+        view = context if type(context) is _ContextView else _ContextView(context)
+        for to, condition in self.compiled_transitions:
+            if condition(view):
+                if to not in ignored:
+                    return to
         return None
 
 
+class BehaviourDefinition:
+    """
+    Neměnná definice chování (zkompilovaný graf stavů).
+
+    Jedna instance je sdílená všemi tvory, kteří načtou stejný soubor, proto
+    se data ukládají zmrazená (viz _freeze) a to_dict() vrací měnitelnou kopii.
+    """
+    __slots__ = ("source", "data", "initial", "states", "state_objects",
+                 "global_triggers", "compiled_triggers", "extra",
+                 "trigger_keys", "cost_keys", "triggers_stable", "dependencies")
+
+    REQUIRED = ("initial", "states", "extra", "global_triggers")
+
+    def __init__(self, data: Mapping[str, Any], source: Optional[str] = None) -> None:
+        missing = [r for r in self.REQUIRED if r not in data]
+        if missing:
+            logging.error(f"Missing attributes {missing} in 'Behaviour'.")
+            raise AttributeError("Missing attribute")
+        if data["initial"] not in data["states"]:
+            raise ValueError(f"Initial state '{data['initial']}' is not defined.")
+        data = _freeze(data)
+        setter = super().__setattr__
+        setter("source", source)
+        setter("data", data)
+        setter("initial", data["initial"])
+        setter("states", data["states"])
+        setter("state_objects", MappingProxyType({
+            name: BehaviourState(name, state, i) for i, (name, state) in enumerate(data["states"].items())
+        }))
+        setter("global_triggers", data["global_triggers"])
+        setter("compiled_triggers", tuple(
+            (trigger.get("to"), compile_condition(trigger.get("condition", "False")))
+            for trigger in self.global_triggers
+        ))
+        setter("extra", data["extra"])
+        setter("trigger_keys", frozenset().union(*(c.names for _, c in self.compiled_triggers)))
+        setter("cost_keys", frozenset(
+            res for state in self.state_objects.values() for res in state.context.get("cost", {})
+        ))
+        # cost je jediné, co step() v kontextu mění; když ho triggery nečtou,
+        # dávají v rámci jednoho kroku pořád stejný výsledek
+        setter("triggers_stable", not self.trigger_keys & self.cost_keys)
+        states = self.state_objects
+        setter("dependencies", MappingProxyType(step_dependencies(
+            {name: state.keys for name, state in states.items()},
+            {name: [to for to, _ in state.compiled_transitions if to in states] for name, state in states.items()},
+            {name: state.context.get("cost", {}) for name, state in states.items()},
+            [name for name, state in states.items() if state.type == "transition"],
+            self.trigger_keys,
+        )))
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("BehaviourDefinition is immutable.")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return _thaw(self.data)
+
+    def __repr__(self) -> str:
+        return f"BehaviourDefinition(source={self.source!r}, states={len(self.state_objects)})"
+
+
+_DEFINITION_CACHE: Dict[str, Tuple[int, BehaviourDefinition]] = {}
+
+
+def load_definition(filename: str, directory: Optional[str] = None) -> BehaviourDefinition:
+    """
+    Vrátí sdílenou definici ze složky behaviours/ (nebo z `directory`).
+
+    Soubor se čte znovu jen tehdy, když se změní jeho mtime. Definice mimo
+    behaviours/ jsou v cache pod celou cestou.
+    """
+    directory = BEHAVIOUR_DIR if directory is None else directory
+    path = os.path.join(directory, f"{filename}.json")
+    key = filename if os.path.abspath(directory) == os.path.abspath(BEHAVIOUR_DIR) else path
+    mtime = os.stat(path).st_mtime_ns
+    cached = _DEFINITION_CACHE.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(path, "r", encoding="utf-8") as f:
+        data = loads(f.read())
+    problems = [f"[{i.state}] {i.message}" if i.state else i.message for i in analyze(data).errors]
+    if problems:
+        for problem in problems:
+            logging.error(f"[Behaviour] {filename}: {problem}")
+        raise ValueError(f"Invalid behaviour definition '{filename}': {'; '.join(problems)}")
+    definition = BehaviourDefinition(data, source=filename)
+    _DEFINITION_CACHE[key] = (mtime, definition)
+    return definition
+
+
+def clear_definition_cache() -> None:
+    _DEFINITION_CACHE.clear()
+
+
+def export_definitions(filenames: Iterable[str]) -> Dict[str, Tuple[int, Dict[str, Any]]]:
+    """(mtime, data) sdílených definic - k předání jiným procesům."""
+    payload = {}
+    for name in filenames:
+        definition = load_definition(name)
+        payload[name] = (_DEFINITION_CACHE[name][0], definition.to_dict())
+    return payload
+
+
+def install_definitions(payload: Mapping[str, Tuple[int, Dict[str, Any]]]) -> None:
+    """Naplní cache definicemi z export_definitions(), takže se soubory nečtou znovu."""
+    for name, (mtime, data) in payload.items():
+        _DEFINITION_CACHE[name] = (mtime, BehaviourDefinition(data, source=name))
+
+
+class CooldownTracker(MutableMapping[str, int]):
+    """
+    Pohled {stav: zbývající kola} na pole cooldownů v Behaviour; obsahuje
+    jen stavy se zbývajícím cooldownem, jako dřívější dict.
+    """
+    __slots__ = ("_behaviour",)
+
+    def __init__(self, behaviour: "Behaviour") -> None:
+        self._behaviour = behaviour
+
+    def _index(self, state: str) -> int:
+        try:
+            return self._behaviour.definition.state_objects[state].index
+        except KeyError:
+            raise KeyError(state) from None
+
+    def __getitem__(self, state: str) -> int:
+        remaining = self._behaviour._cooldowns[self._index(state)]
+        if not remaining:
+            raise KeyError(state)
+        return remaining
+
+    def __setitem__(self, state: str, remaining: int) -> None:
+        behaviour = self._behaviour
+        i = self._index(state)
+        remaining = max(0, int(remaining))
+        behaviour._cooling += (remaining > 0) - (behaviour._cooldowns[i] > 0)
+        behaviour._cooldowns[i] = remaining
+        behaviour._settled = None  # přeskočení kroku počítalo s původními cooldowny
+
+    def __delitem__(self, state: str) -> None:
+        if not self[state]:
+            raise KeyError(state)
+        self[state] = 0
+
+    def __iter__(self) -> Iterator[str]:
+        cooldowns = self._behaviour._cooldowns
+        for state in self._behaviour.definition.state_objects.values():
+            if cooldowns[state.index]:
+                yield state.name
+
+    def __len__(self) -> int:
+        return self._behaviour._cooling
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
 @register_object
 class Behaviour(JSONObject):
+    """
+    Běhový stav chování jednoho tvora (`current`, `cooldown_tracker`)
+    s odkazem na sdílenou BehaviourDefinition.
+    """
+    # volitelný BehaviourProfiler (viz behaviour_profile.py); neukládá se
+    profiler: Optional["BehaviourProfiler"] = None
+    # stav -> (hodnoty klíčů kontextu, výsledek get_next_state); viz cache_transitions()
+    transition_cache: Optional[Dict[str, Tuple[tuple, Optional[str]]]] = None
+    # (stav, akce) posledního kroku, který nic nezměnil; s CreatureContext
+    # se další krok přeskočí, dokud se nezmění klíč, na kterém stav závisí
+    _settled: Optional[Tuple[str, Tuple[str, ...]]] = None
+    # indexy cílů, které ten krok přeskočil kvůli cooldownu; přeskakovat
+    # se smí, jen dokud jsou všechny pořád na cooldownu
+    _blocked: Tuple[int, ...] = ()
+    _transient = frozenset({"profiler", "transition_cache", "_settled", "_blocked", "_cooldowns", "_cooling", "_view"})
+
     def __init__(self, json_data: dict[str, Any] | None = None):
         # kontrola flagu "_flags": ["to_load"]
-        if json_data and "_flags" in json_data and "to_load" in json_data["_flags"]:
+        if isinstance(json_data, BehaviourDefinition):
+            self.definition = json_data
+            json_data = None
+        elif json_data and "_flags" in json_data and "to_load" in json_data["_flags"]:
             filename = json_data.get("loadfile")
             if not filename:
                 raise ValueError("Behaviour has 'to_load' flag but no 'loadfile' specified.")
-            json_data = self.load(filename)
+            self.definition = load_definition(filename)
+        else:
+            self.definition = BehaviourDefinition(json_data or {})
+        # zbývající cooldown podle BehaviourState.index, počet nenulových
+        # a pohled na kontext sdílený podmínkami jednoho kroku
+        self._cooldowns: List[int] = [0] * len(self.definition.state_objects)
+        self._cooling = 0
+        self._view = _ContextView(None)
+
+        super().__init__({k: json_data[k] for k in ("current", "cooldown_tracker") if k in json_data}
+                         if json_data else None)
+        if not hasattr(self, "current"):
+            self.current: str = self.definition.initial
+        elif self.current not in self.definition.state_objects:
+            raise ValueError(f"Unknown behaviour state '{self.current}'.")
+
+    @property
+    def cooldown_tracker(self) -> CooldownTracker:
+        return CooldownTracker(self)
+
+    @cooldown_tracker.setter
+    def cooldown_tracker(self, cooldowns: Mapping[str, int]) -> None:
+        states = self.definition.state_objects
+        unknown = [name for name in cooldowns if name not in states]
+        if unknown:
+            raise ValueError(f"Unknown behaviour state '{unknown[0]}' in cooldown_tracker.")
+        self._cooldowns = [0] * len(states)
+        self._cooling = 0
+        self._settled = None
+        tracker = CooldownTracker(self)
+        for name, remaining in cooldowns.items():
+            tracker[name] = remaining
+
+    @property
+    def initial(self) -> str:
+        return self.definition.initial
+
+    @property
+    def states(self) -> Mapping[str, Mapping[str, Any]]:
+        return self.definition.states
+
+    @property
+    def state_objects(self) -> Mapping[str, BehaviourState]:
+        return self.definition.state_objects
 
-        super().__init__(json_data)
+    @property
+    def global_triggers(self) -> Tuple[Mapping[str, Any], ...]:
+        return self.definition.global_triggers
 
-        self.complete(["initial", "states", "extra", "global_triggers"])
-        self.current = self.initial
+    @property
+    def compiled_triggers(self) -> Tuple[Tuple[Optional[str], Condition], ...]:
+        return self.definition.compiled_triggers
 
-        self.state_objects: Dict[str, BehaviourState] = {
-            name: BehaviourState(name, data)
-            for name, data in self.states.items()
-        }
+    @property
+    def extra(self) -> Mapping[str, Any]:
+        return self.definition.extra
 
-        self.global_triggers: List[Dict[str, Any]] = json_data.get("global_triggers", [])
+    def to_dict(self) -> dict[str, Any]:
+        """Uloží jen běhový stav; sdílená definice se ukládá odkazem na soubor."""
+        if self.definition.source:
+            result: dict[str, Any] = {"_object": self._object, "_flags": ["to_load"],
+                                      "loadfile": self.definition.source}
+        else:
+            result = {**self.definition.to_dict(), "_object": self._object}
+        result["current"] = self.current
+        result["cooldown_tracker"] = dict(self.cooldown_tracker)
+        return result
 
     def validate(self) -> None:
         return
 
     def check_global_triggers(self, context: Dict[str, Any]) -> Optional[str]:
         """Zkontroluje, zda nějaký globální trigger neaktivuje přechod."""
-        for trigger in self.global_triggers:
-            if safe_eval(trigger.get("condition", "False"), context):
-                return trigger.get("to")
+        for to, condition in self.compiled_triggers:
+            if condition(context):
+                return to
         return None
 
-    def step(self, context: Dict[str, Any]) -> List[str]:
+    def cache_transitions(self, enabled: bool = True) -> None:
+        """
+        Zapne pamatování výsledku přechodů: stav se znovu vyhodnotí, jen když
+        se od minula změnil některý z klíčů, které jeho podmínky čtou.
+        """
+        self.transition_cache = {} if enabled else None
+
+    def _cached_next_state(self, state: BehaviourState, context: Dict[str, Any]) -> Optional[str]:
+        cache = self.transition_cache
+        values = tuple(map(context.get, state.keys))
+        cached = cache.get(state.name)
+        if cached is not None and cached[0] == values:
+            return cached[1]
+        result = state.get_next_state(context)
+        cache[state.name] = (values, result)
+        return result
+
+    def _tick_cooldowns(self) -> None:
+        """Odečte jedno kolo ze všech běžících cooldownů."""
+        cooldowns = self._cooldowns
+        cooling = 0
+        for i, remaining in enumerate(cooldowns):
+            if remaining:
+                cooldowns[i] = remaining - 1
+                cooling += remaining > 1
+        self._cooling = cooling
+
+    def step(self, context: Dict[str, Any]) -> Tuple[str, ...]:
         """
         Provede akce aktuálního stavu, poté zkontroluje přechody.
         Transition stavy se vyhodnocují okamžitě a nespouští akce.
+
+        Vrací sdílenou n-tici akcí stavu; krok sám nic nealokuje, pokud
+        nezapíná profiler ani transition cache.
         """
-        actions: List[str] = []
-        if not hasattr(self, "cooldown_tracker"):
-            self.cooldown_tracker: Dict[str, int] = {}
+        profiler = self.profiler
+        start_state, depth = self.current, 0
+        settling = False
+        cooldowns = self._cooldowns
+        if isinstance(context, CreatureContext):
+            dirty = context.consume_dirty()
+            settled = self._settled
+            if (settled is not None and profiler is None and settled[0] == start_state
+                    and self.definition.dependencies[start_state].isdisjoint(dirty)
+                    and (not self._blocked or all(cooldowns[i] for i in self._blocked))):
+                if self._cooling:
+                    self._tick_cooldowns()
+                return settled[1]
+            settling = True
+        self._settled = None
+        if profiler is not None:
+            started = time.perf_counter_ns()
+        actions: Tuple[str, ...] = ()
+        view = self._view
+        view.context = context
+        state_objects = self.definition.state_objects
 
-        state = self.state_objects[self.current]
-        transition_loop = False
-        on_cooldown_detected: list[str] = []
+        state = state_objects[self.current]
+        # cíle přeskočené kvůli cooldownu; seznam vzniká až při prvním přeskočení
+        on_cooldown_detected: List[str] | Tuple[()] = ()
+        triggers_stable = self.definition.triggers_stable
+        triggers_checked = False
         while True:
 
-            # global triggers
-            global_next = self.check_global_triggers(context)
-            if global_next and global_next in self.state_objects:
+            # global triggers (bez závislosti na cost stačí jednou za krok)
+            if not (triggers_stable and triggers_checked):
+                if profiler is None:
+                    global_next = self.check_global_triggers(view)
+                else:
+                    global_next = profiler.global_triggers(self, context)
+                triggers_checked = True
+            if global_next and global_next in state_objects:
                 self.current = global_next
 
             # regular states
-            next_state_name = state.get_next_state(context, on_cooldown_detected)
-            if next_state_name and next_state_name in self.state_objects:
-                next_state = self.state_objects[next_state_name]
+            if profiler is not None:
+                next_state_name = profiler.next_state(self, state, context, on_cooldown_detected)
+            elif self.transition_cache is not None and not on_cooldown_detected:
+                next_state_name = self._cached_next_state(state, context)
+            else:
+                next_state_name = state.get_next_state(view, on_cooldown_detected)
+            if next_state_name and next_state_name in state_objects:
+                next_state = state_objects[next_state_name]
 
                 # ❌ Skip pokud je na cooldownu
-                cd = next_state.context.get("cooldown", 0)
-                if cd and self.cooldown_tracker.get(next_state_name, 0) > 0:
-                    on_cooldown_detected.append(next_state_name)
+                cd = next_state.cooldown
+                if cd and cooldowns[next_state.index] > 0:
+                    if on_cooldown_detected:
+                        on_cooldown_detected.append(next_state_name)
+                    else:
+                        on_cooldown_detected = [next_state_name]
+                    if profiler is not None:
+                        profiler.cooldown_skip(self, state.name, next_state_name)
                     continue
 
                 # 🔋 Check cost
-                cost = next_state.context.get("cost", {})
-                if all(context.get(res, 0) >= val for res, val in cost.items()):
+                for res, val in next_state.cost:
+                    if context.get(res, 0) < val:
+                        next_state_name = None  # ignoruj, pokud nemá resources
+                        break
+                else:
                     # odečti cost
-                    for res, val in cost.items():
+                    for res, val in next_state.cost:
                         context[res] -= val
-                else:
-                    next_state_name = None  # ignoruj, pokud nemá resources
 
                 if next_state_name:
                     self.current = next_state_name
-                    state = self.state_objects[self.current]
+                    state = next_state
+                    depth += 1
                     # pokud je transition, pokračuj bez akcí
                     if state.type == "transition":
                         continue
                     # nastav cooldown
                     if cd:
-                        self.cooldown_tracker[next_state_name] = cd + 1
+                        cooldowns[state.index] = cd + 1
+                        self._cooling += 1
             if state.type != "transition":
-                actions.extend(state.actions)
-                break
-            else:
-                transition_loop = True
-            if transition_loop:
-                break
+                actions = state.actions
+            break
 
-        # cooldown decrement
-        for k in list(self.cooldown_tracker.keys()):
-            self.cooldown_tracker[k] = max(0, self.cooldown_tracker[k] - 1)
-            if self.cooldown_tracker[k] == 0:
-                self.cooldown_tracker.pop(k)
+        if self._cooling:
+            self._tick_cooldowns()
 
+        view.context = None  # nedržet kontext volajícího mezi kroky
+        if settling and depth == 0 and self.current == start_state:
+            self._settled = state.settled
+            self._blocked = tuple(state_objects[name].index for name in on_cooldown_detected)
+        if profiler is not None:
+            profiler.step_done(self, start_state, depth, time.perf_counter_ns() - started)
         return actions
-
-    def load(self, filename: str) -> dict[str, Any]:
-        """Načte JSON ze složky behaviours/"""
-        with open(f"behaviours/{filename}.json", "r", encoding="utf-8") as f:
-            return loads(f.read())
@@ -0,0 +1,329 @@
+import ast
+import json
+import os
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+from condition import Condition
+
+
+ERROR = "error"
+WARNING = "warning"
+INFO = "info"
+BEHAVIOUR_DIR = "behaviours"
+CONTEXT_TAGS_FILE = "context_tags.txt"
+
+
+def load_context_tags(path: str = CONTEXT_TAGS_FILE) -> List[str]:
+    """Načte seznam klíčů kontextu (jeden na řádek, prázdné řádky se přeskočí)."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+class Issue:
+    __slots__ = ("severity", "state", "message")
+
+    def __init__(self, severity: str, state: Optional[str], message: str) -> None:
+        self.severity = severity
+        self.state = state
+        self.message = message
+
+    def __str__(self) -> str:
+        where = f"[{self.state}] " if self.state else ""
+        return f"{self.severity.upper()}: {where}{self.message}"
+
+    def __repr__(self) -> str:
+        return f"Issue({self.severity!r}, {self.state!r}, {self.message!r})"
+
+
+class AnalysisReport:
+    """
+    Výsledek analyze(): nalezené problémy, dosažitelné stavy, cykly
+    přechodových stavů a pro každý stav množina klíčů kontextu, na kterých
+    závisí jeden krok začínající v tomto stavu.
+    """
+
+    def __init__(self) -> None:
+        self.issues: List[Issue] = []
+        self.reachable: Set[str] = set()
+        self.cycles: List[List[str]] = []
+        self.dependencies: Dict[str, FrozenSet[str]] = {}
+
+    def add(self, severity: str, state: Optional[str], message: str) -> None:
+        self.issues.append(Issue(severity, state, message))
+
+    @property
+    def errors(self) -> List[Issue]:
+        return [i for i in self.issues if i.severity == ERROR]
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def __str__(self) -> str:
+        return "\n".join(map(str, self.issues)) or "OK"
+
+
+def _conjuncts(node: ast.AST) -> Iterator[ast.AST]:
+    if isinstance(node, ast.BoolOp) and isinstance(node.op, ast.And):
+        for value in node.values:
+            yield from _conjuncts(value)
+    else:
+        yield node
+
+
+_FLIP = {ast.Lt: ast.Gt, ast.Gt: ast.Lt, ast.LtE: ast.GtE, ast.GtE: ast.LtE, ast.Eq: ast.Eq, ast.NotEq: ast.NotEq}
+
+
+def _bound(node: ast.AST) -> Optional[Tuple[str, type, float]]:
+    """`klíč op konstanta` (v libovolném pořadí) -> (klíč, op, hodnota)."""
+    if not isinstance(node, ast.Compare) or len(node.ops) != 1:
+        return None
+    left, op, right = node.left, type(node.ops[0]), node.comparators[0]
+    if isinstance(left, ast.Constant) and isinstance(right, ast.Name):
+        left, right, op = right, left, _FLIP.get(op)
+    if op not in _FLIP or not isinstance(left, ast.Name) or not isinstance(right, ast.Constant):
+        return None
+    if not isinstance(right.value, (int, float)):
+        return None
+    return left.id, op, float(right.value)
+
+
+def never_true(condition: Condition) -> bool:
+    """
+    Konzervativní test: konjunkce porovnání s konstantami, která si odporují
+    (např. `hp > 5 and hp < 3`). False znamená "nevím".
+    """
+    if condition.constant is not None:
+        return not condition.constant
+    lower: Dict[str, Tuple[float, bool]] = {}  # klíč -> (hodnota, včetně)
+    upper: Dict[str, Tuple[float, bool]] = {}
+    equal: Dict[str, float] = {}
+    excluded: Dict[str, Set[float]] = {}
+    for part in _conjuncts(condition.tree.body):
+        bound = _bound(part)
+        if bound is None:
+            continue
+        key, op, value = bound
+        if op is ast.Eq:
+            if key in equal and equal[key] != value:
+                return True
+            equal[key] = value
+        elif op is ast.NotEq:
+            excluded.setdefault(key, set()).add(value)
+        elif op in (ast.Gt, ast.GtE):
+            current = lower.get(key)
+            candidate = (value, op is ast.GtE)
+            if current is None or value > current[0] or value == current[0] and not candidate[1]:
+                lower[key] = candidate
+        else:
+            current = upper.get(key)
+            candidate = (value, op is ast.LtE)
+            if current is None or value < current[0] or value == current[0] and not candidate[1]:
+                upper[key] = candidate
+    for key in set(lower) | set(upper) | set(equal):
+        lo, hi = lower.get(key), upper.get(key)
+        if lo and hi and (lo[0] > hi[0] or lo[0] == hi[0] and not (lo[1] and hi[1])):
+            return True
+        if key in equal:
+            value = equal[key]
+            if lo and (value < lo[0] or value == lo[0] and not lo[1]):
+                return True
+            if hi and (value > hi[0] or value == hi[0] and not hi[1]):
+                return True
+            if value in excluded.get(key, ()):
+                return True
+    return False
+
+
+def _compile(report: AnalysisReport, state: Optional[str], expr: Any) -> Optional[Condition]:
+    try:
+        return Condition(expr)
+    except (ValueError, TypeError) as e:
+        report.add(ERROR, state, str(e))
+        return None
+
+
+def _strongly_connected(graph: Dict[str, Set[str]]) -> List[List[str]]:
+    """Tarjanův algoritmus (iterativně); vrací komponenty s cyklem."""
+    index: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    stack: List[str] = []
+    on_stack: Set[str] = set()
+    result = []
+    for root in graph:
+        if root in index:
+            continue
+        work = [(root, iter(sorted(graph[root])))]
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, children = work[-1]
+            child = next(children, None)
+            if child is not None:
+                if child not in index:
+                    index[child] = low[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(sorted(graph[child]))))
+                elif child in on_stack:
+                    low[node] = min(low[node], index[child])
+                continue
+            work.pop()
+            if work:
+                low[work[-1][0]] = min(low[work[-1][0]], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                if len(component) > 1 or node in graph[node]:
+                    result.append(sorted(component))
+    return result
+
+
+def step_dependencies(own_keys: Mapping[str, Iterable[str]], edges: Mapping[str, Iterable[str]],
+                      costs: Mapping[str, Iterable[str]], transitional: Iterable[str],
+                      trigger_keys: Iterable[str] = ()) -> Dict[str, FrozenSet[str]]:
+    """
+    Klíče kontextu, které může přečíst jeden krok začínající v daném stavu:
+    globální triggery, přechody stavu, cost jejich cílů a totéž pro
+    přechodové stavy, do kterých krok pokračuje.
+    """
+    transitional = frozenset(transitional)
+    dependencies = {
+        name: set(keys).union(trigger_keys, *(costs.get(t, ()) for t in edges[name]))
+        for name, keys in own_keys.items()
+    }
+    changed = True
+    while changed:
+        changed = False
+        for name in dependencies:
+            for target in transitional.intersection(edges[name]):
+                if not dependencies[target] <= dependencies[name]:
+                    dependencies[name] |= dependencies[target]
+                    changed = True
+    return {name: frozenset(keys) for name, keys in dependencies.items()}
+
+
+def analyze(data: Dict[str, Any], known_keys: Optional[Set[str]] = None) -> AnalysisReport:
+    """
+    Statická kontrola JSON definice chování (bez jejího načtení do Behaviour).
+
+    Hlásí neexistující cíle přechodů, chybné cost/cooldown, nedosažitelné
+    stavy, cykly přechodových stavů (step() v nich může běžet donekonečna),
+    přechody, které nikdy neproběhnou, a klíče mimo `known_keys`.
+    """
+    report = AnalysisReport()
+    states: Dict[str, Any] = data.get("states") or {}
+    initial = data.get("initial")
+    if initial not in states:
+        report.add(ERROR, None, f"Initial state '{initial}' is not defined.")
+
+    edges: Dict[str, Set[str]] = {name: set() for name in states}
+    own_keys: Dict[str, Set[str]] = {name: set() for name in states}
+    cost_keys: Dict[str, Set[str]] = {name: set() for name in states}
+    used_keys: Set[str] = set()
+
+    trigger_keys: Set[str] = set()
+    trigger_targets: Set[str] = set()
+    for i, trigger in enumerate(data.get("global_triggers") or []):
+        to = trigger.get("to")
+        if to not in states:
+            report.add(ERROR, None, f"Global trigger #{i} targets unknown state '{to}'.")
+        else:
+            trigger_targets.add(to)
+        condition = _compile(report, None, trigger.get("condition", "False"))
+        if condition is not None:
+            trigger_keys |= condition.names
+            if never_true(condition):
+                report.add(WARNING, None, f"Global trigger #{i} ({condition.source!r}) can never fire.")
+
+    for name, state in states.items():
+        context = state.get("context") or {}
+        cost = context.get("cost", {})
+        if not isinstance(cost, dict) or not all(
+                isinstance(v, (int, float)) and not isinstance(v, bool) and v >= 0 for v in cost.values()):
+            report.add(ERROR, name, f"Invalid cost {cost!r} (expected {{resource: non-negative number}}).")
+        else:
+            cost_keys[name] = set(cost)
+        cooldown = context.get("cooldown", 0)
+        if not isinstance(cooldown, int) or isinstance(cooldown, bool) or cooldown < 0:
+            report.add(ERROR, name, f"Invalid cooldown {cooldown!r} (expected a non-negative int).")
+
+        transitions = state.get("transitions") or []
+        if state.get("type", "idle") == "transition" and not transitions:
+            report.add(WARNING, name, "Transition state has no transitions and emits no actions.")
+        always = None
+        seen = set()
+        for i, transition in enumerate(transitions):
+            to = transition.get("to")
+            if to not in states:
+                report.add(ERROR, name, f"Transition #{i} targets unknown state '{to}'.")
+            else:
+                edges[name].add(to)
+            condition = _compile(report, name, transition.get("condition", "True"))
+            if condition is None:
+                continue
+            own_keys[name] |= condition.names
+            if always is not None:
+                report.add(WARNING, name, f"Transition #{i} -> {to} is shadowed by always-true #{always}.")
+            elif never_true(condition):
+                report.add(WARNING, name, f"Transition #{i} -> {to} ({condition.source!r}) can never be taken.")
+            if (to, condition.source.strip()) in seen:
+                report.add(WARNING, name, f"Transition #{i} -> {to} duplicates an earlier one.")
+            seen.add((to, condition.source.strip()))
+            if condition.constant and always is None:
+                always = i
+        used_keys |= own_keys[name]
+
+    # dosažitelnost z počátečního stavu (triggery míří kamkoli)
+    pending = [s for s in [initial, *trigger_targets] if s in states]
+    report.reachable = set(pending)
+    while pending:
+        for target in edges[pending.pop()]:
+            if target not in report.reachable:
+                report.reachable.add(target)
+                pending.append(target)
+    for name in states:
+        if name not in report.reachable:
+            report.add(WARNING, name, "State is unreachable from the initial state.")
+
+    # step() pokračuje bez akcí jen přes stavy typu "transition"
+    transitional = {n for n, s in states.items() if s.get("type", "idle") == "transition"}
+    chain = {n: edges[n] & transitional for n in transitional}
+    report.cycles = _strongly_connected(chain)
+    for cycle in report.cycles:
+        report.add(WARNING, cycle[0], f"Cycle of transition states {' -> '.join(cycle)} can loop within one step.")
+
+    report.dependencies = step_dependencies(own_keys, edges, cost_keys, transitional, trigger_keys)
+
+    if known_keys is not None:
+        unknown = sorted((used_keys | trigger_keys) - known_keys)
+        if unknown:
+            report.add(INFO, None, f"Context keys not listed in {CONTEXT_TAGS_FILE}: {', '.join(unknown)}.")
+    return report
+
+
+def analyze_file(path: str, known_keys: Optional[Set[str]] = None) -> AnalysisReport:
+    with open(path, "r", encoding="utf-8") as f:
+        return analyze(json.load(f), known_keys)
+
+
+def main() -> None:
+    known = set(load_context_tags()) if os.path.exists(CONTEXT_TAGS_FILE) else None
+    for file in sorted(os.listdir(BEHAVIOUR_DIR)):
+        if not file.endswith(".json"):
+            continue
+        name = file[:-5]
+        report = analyze_file(os.path.join(BEHAVIOUR_DIR, file), known)
+        print(f"== {name}: {len(report.reachable)} reachable states, {len(report.cycles)} transition cycles")
+        print(report)
+        for state, keys in sorted(report.dependencies.items()):
+            print(f"  {state:12} {', '.join(sorted(keys))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,438 @@
+import ast
+import operator
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from behaviour import Behaviour, BehaviourDefinition
+from behaviour_analysis import load_context_tags
+from condition import SAFE_GLOBALS, Condition
+
+
+Evaluated = Tuple[Any, Any]  # (hodnoty, maska chyb)
+
+
+class BatchContext:
+    """
+    Sloupcový kontext N tvorů: pro každý klíč pole hodnot a maska přítomnosti.
+
+    Nečíselné hodnoty se do sloupců neukládají, protože je safe_eval stejně
+    nevidí - chovají se jako chybějící klíč.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.columns: Dict[str, np.ndarray] = {}
+        self.present: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_dicts(cls, contexts: Sequence[Dict[str, Any]], keys: Iterable[str] | None = None) -> "BatchContext":
+        ctx = cls(len(contexts))
+        names = dict.fromkeys(load_context_tags() if keys is None else keys)
+        for context in contexts:
+            names.update(dict.fromkeys(context))
+        for key in names:
+            values = [c.get(key) for c in contexts]
+            mask = np.fromiter((isinstance(v, (int, float)) for v in values), bool, ctx.size)
+            numeric = [v for v, ok in zip(values, mask) if ok]
+            if all(isinstance(v, bool) for v in numeric):
+                dtype = bool
+            elif all(isinstance(v, int) for v in numeric):
+                dtype = np.int64
+            else:
+                dtype = np.float64
+            column = np.zeros(ctx.size, dtype)
+            column[mask] = numeric
+            ctx.set_column(key, column, mask)
+        return ctx
+
+    def set_column(self, key: str, values: np.ndarray, present: np.ndarray | None = None) -> None:
+        if values.shape != (self.size,):
+            raise ValueError(f"Column '{key}' has shape {values.shape}, expected ({self.size},).")
+        self.columns[key] = values
+        self.present[key] = np.ones(self.size, bool) if present is None else present
+
+    def get(self, key: str, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Vrátí (hodnoty, přítomnost) klíče pro vybrané řádky."""
+        if key not in self.columns:
+            return np.zeros(len(rows), np.int64), np.zeros(len(rows), bool)
+        return self.columns[key][rows], self.present[key][rows]
+
+    def subtract(self, key: str, rows: np.ndarray, value: Any) -> None:
+        """Odečte cenu (`context[res] -= val`) na vybraných řádcích."""
+        if not rows.size:
+            return
+        if key not in self.columns or not self.present[key][rows].all():
+            raise KeyError(key)
+        column = self.columns[key]
+        if column.dtype == bool or (isinstance(value, float) and column.dtype != np.float64):
+            column = self.columns[key] = column.astype(np.float64 if isinstance(value, float) else np.int64)
+        column[rows] -= value
+
+    def row_dict(self, row: int) -> Dict[str, Any]:
+        return {k: v[row].item() for k, v in self.columns.items() if self.present[k][row]}
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [self.row_dict(i) for i in range(self.size)]
+
+
+class _Unsupported(Exception):
+    pass
+
+
+def _num(value: Any) -> Any:
+    """Bool pole převede na int, aby aritmetika odpovídala Pythonu (True + True == 2)."""
+    if isinstance(value, np.ndarray) and value.dtype == bool:
+        return value.astype(np.int64)
+    return value
+
+
+def _truthy(value: Any) -> Any:
+    if isinstance(value, np.ndarray):
+        return value if value.dtype == bool else value != 0
+    return bool(value)
+
+
+_BINOPS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: np.true_divide, ast.FloorDiv: np.floor_divide, ast.Mod: np.mod,
+}
+_CMPOPS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt,
+    ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+}
+
+
+class _Rows:
+    """Sloupce vybraných řádků, každý klíč se vybírá jen jednou."""
+    __slots__ = ("ctx", "rows", "cache")
+
+    def __init__(self, ctx: BatchContext, rows: np.ndarray) -> None:
+        self.ctx = ctx
+        self.rows = rows
+        self.cache: Dict[str, Evaluated] = {}
+
+    def load(self, name: str) -> Evaluated:
+        if name not in self.cache:
+            values, present = self.ctx.get(name, self.rows)
+            self.cache[name] = (_num(values), ~present)
+        return self.cache[name]
+
+
+def _compile_node(node: ast.AST) -> Callable[[_Rows], Evaluated]:
+    """
+    Převede AST podmínky na funkci nad sloupci. Vrací (hodnoty, chyby), kde
+    chyby označují řádky, na kterých by eval() vyhodil výjimku (NameError,
+    dělení nulou) - s ohledem na zkrácené vyhodnocování and/or.
+    """
+    if isinstance(node, ast.Constant):
+        if not isinstance(node.value, (int, float)):
+            raise _Unsupported
+        value = node.value
+        return lambda env: (value, False)
+
+    if isinstance(node, ast.Name):
+        if node.id in SAFE_GLOBALS:
+            raise _Unsupported
+        name = node.id
+        return lambda env: env.load(name)
+
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile_node(v) for v in node.values]
+        is_and = isinstance(node.op, ast.And)
+
+        def bool_op(env: _Rows) -> Evaluated:
+            result, err = parts[0](env)
+            for part in parts[1:]:
+                value, value_err = part(env)
+                taken = _truthy(result) if is_and else ~np.asarray(_truthy(result))
+                err = err | (taken & value_err)
+                result = np.where(taken, value, result)
+            return result, err
+        return bool_op
+
+    if isinstance(node, ast.UnaryOp):
+        inner = _compile_node(node.operand)
+        if isinstance(node.op, ast.Not):
+            return lambda env: (lambda v, e: (~np.asarray(_truthy(v)), e))(*inner(env))
+        if isinstance(node.op, ast.USub):
+            return lambda env: (lambda v, e: (-_num(np.asarray(v)), e))(*inner(env))
+        if isinstance(node.op, ast.UAdd):
+            return lambda env: (lambda v, e: (_num(np.asarray(v)), e))(*inner(env))
+        raise _Unsupported
+
+    if isinstance(node, ast.BinOp):
+        if type(node.op) not in _BINOPS:
+            raise _Unsupported
+        op = _BINOPS[type(node.op)]
+        checks_zero = isinstance(node.op, (ast.Div, ast.FloorDiv, ast.Mod))
+        left, right = _compile_node(node.left), _compile_node(node.right)
+
+        def bin_op(env: _Rows) -> Evaluated:
+            lv, le = left(env)
+            rv, re_ = right(env)
+            lv, rv = _num(lv), _num(rv)
+            err = le | re_
+            if checks_zero:
+                zero = np.asarray(rv) == 0
+                err = err | zero
+                rv = np.where(zero, 1, rv)
+            with np.errstate(all="ignore"):
+                return op(lv, rv), err
+        return bin_op
+
+    if isinstance(node, ast.Compare):
+        operands = [_compile_node(node.left)]
+        ops: List[Callable[[Any, Any], Any]] = []
+        for cmp_op, comparator in zip(node.ops, node.comparators):
+            if isinstance(cmp_op, (ast.In, ast.NotIn)):
+                if len(node.ops) > 1 or not isinstance(comparator, (ast.Tuple, ast.List)) or not all(
+                        isinstance(e, ast.Constant) and isinstance(e.value, (int, float)) for e in comparator.elts):
+                    raise _Unsupported
+                members = [e.value for e in comparator.elts]
+                negate = isinstance(cmp_op, ast.NotIn)
+                ops.append(lambda a, _b, m=members, n=negate: np.isin(a, m) != n)
+                operands.append(lambda env: (0, False))
+                continue
+            if type(cmp_op) not in _CMPOPS:
+                raise _Unsupported
+            ops.append(_CMPOPS[type(cmp_op)])
+            operands.append(_compile_node(comparator))
+
+        def compare(env: _Rows) -> Evaluated:
+            left_value, err = operands[0](env)
+            result: Any = True
+            for op, operand in zip(ops, operands[1:]):
+                right_value, right_err = operand(env)
+                err = err | (result & right_err)
+                result = result & np.asarray(op(left_value, right_value))
+                left_value = right_value
+            return result, err
+        return compare
+
+    if isinstance(node, ast.IfExp):
+        test, body, orelse = _compile_node(node.test), _compile_node(node.body), _compile_node(node.orelse)
+
+        def if_exp(env: _Rows) -> Evaluated:
+            tv, te = test(env)
+            bv, be = body(env)
+            ov, oe = orelse(env)
+            taken = _truthy(tv)
+            return np.where(taken, bv, ov), te | np.where(taken, be, oe)
+        return if_exp
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        args = [_compile_node(a) for a in node.args]
+        if node.func.id == "abs" and len(args) == 1:
+            return lambda env: (lambda v, e: (np.abs(_num(v)), e))(*args[0](env))
+        if node.func.id in ("min", "max") and len(args) >= 2:
+            reduce = np.minimum.reduce if node.func.id == "min" else np.maximum.reduce
+
+            def min_max(env: _Rows) -> Evaluated:
+                evaluated = [a(env) for a in args]
+                err: Any = False
+                for _, e in evaluated:
+                    err = err | e
+                return reduce(np.broadcast_arrays(*(_num(np.asarray(v)) for v, _ in evaluated))), err
+            return min_max
+
+    raise _Unsupported
+
+
+class VectorCondition:
+    """Podmínka vyhodnocovaná najednou nad sloupci více tvorů."""
+
+    def __init__(self, condition: Condition) -> None:
+        self.condition = condition
+        self._fn: Optional[Callable[[_Rows], Evaluated]] = None
+        if condition.constant is None:
+            try:
+                self._fn = _compile_node(condition.tree.body)
+            except _Unsupported:
+                self._fn = None
+
+    def __call__(self, ctx: BatchContext, rows: np.ndarray) -> np.ndarray:
+        if self.condition.constant is not None:
+            return np.full(len(rows), self.condition.constant)
+        if self._fn is None:
+            # nepodporovaná syntaxe -> po řádcích přes původní podmínku
+            return np.fromiter((self.condition(ctx.row_dict(r)) for r in rows), bool, len(rows))
+        values, err = self._fn(_Rows(ctx, rows))
+        ok = np.broadcast_to(np.asarray(_truthy(values)), (len(rows),))
+        return ok & ~np.broadcast_to(np.asarray(err), (len(rows),))
+
+
+class BatchState:
+    """Běhový stav N tvorů: aktuální stav a cooldowny (tvor × stav)."""
+
+    def __init__(self, current: np.ndarray, cooldown: np.ndarray) -> None:
+        self.current = current
+        self.cooldown = cooldown
+
+    def __len__(self) -> int:
+        return len(self.current)
+
+
+class BatchBehaviour:
+    """
+    Dávkové krokování mnoha tvorů se stejnou definicí chování.
+
+    Výsledky odpovídají volání Behaviour.step() pro každého tvora zvlášť.
+    """
+
+    def __init__(self, behaviour: Behaviour | BehaviourDefinition) -> None:
+        definition = behaviour.definition if isinstance(behaviour, Behaviour) else behaviour
+        self.definition = definition
+        self.names: List[str] = list(definition.state_objects)
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        states = [definition.state_objects[name] for name in self.names]
+        self.initial = self.index[definition.initial]
+        self.is_transition = np.array([s.type == "transition" for s in states], bool)
+        self.cooldowns: List[Any] = [s.context.get("cooldown", 0) for s in states]
+        self.costs: List[Dict[str, Any]] = [s.context.get("cost", {}) for s in states]
+        self.actions: List[Tuple[str, ...]] = [s.actions for s in states]
+        self.transitions: List[List[Tuple[int, VectorCondition]]] = [
+            [(self._target(to), VectorCondition(cond)) for to, cond in s.compiled_transitions]
+            for s in states
+        ]
+        self.triggers: List[Tuple[int, VectorCondition]] = [
+            (self._target(to), VectorCondition(cond)) for to, cond in definition.compiled_triggers
+        ]
+
+    def _target(self, name: Optional[str]) -> int:
+        return self.index.get(name, -1) if name else -1
+
+    def new_state(self, size: int) -> BatchState:
+        return BatchState(np.full(size, self.initial, np.int64),
+                          np.zeros((size, len(self.names)), np.int64))
+
+    def from_behaviours(self, behaviours: Sequence[Behaviour]) -> BatchState:
+        """Převezme běhový stav z jednotlivých instancí Behaviour."""
+        state = self.new_state(len(behaviours))
+        for i, b in enumerate(behaviours):
+            if b.definition is not self.definition and b.definition.data != self.definition.data:
+                raise ValueError("All behaviours in a batch must share one definition.")
+            state.current[i] = self.index[b.current]
+            for name, value in b.cooldown_tracker.items():
+                state.cooldown[i, self.index[name]] = value
+        return state
+
+    def write_back(self, state: BatchState, behaviours: Sequence[Behaviour]) -> None:
+        """Zapíše běhový stav zpět do jednotlivých instancí Behaviour."""
+        for i, b in enumerate(behaviours):
+            b.current = self.names[state.current[i]]
+            b.cooldown_tracker = {
+                self.names[s]: int(state.cooldown[i, s]) for s in np.flatnonzero(state.cooldown[i])
+            }
+
+    def _first_true(self, transitions: List[Tuple[int, VectorCondition]], ctx: BatchContext,
+                    rows: np.ndarray, ignored: np.ndarray | None) -> np.ndarray:
+        """Cíl prvního splněného přechodu pro každý řádek (-1 = žádný / neplatný)."""
+        result = np.full(len(rows), -1, np.int64)
+        undecided = np.arange(len(rows))
+        for target, condition in transitions:
+            if not undecided.size:
+                break
+            hit = condition(ctx, rows[undecided])
+            if ignored is not None and target >= 0:
+                hit &= ~ignored[rows[undecided], target]
+            result[undecided[hit]] = target
+            undecided = undecided[~hit]
+        return result
+
+    def step(self, state: BatchState, ctx: BatchContext) -> List[Tuple[str, ...]]:
+        """Provede jeden krok všech tvorů; mění `state` i `ctx` (odečet ceny)."""
+        n = len(state)
+        current = state.current
+        cooldown = state.cooldown
+        local = current.copy()
+        ignored = np.zeros(cooldown.shape, bool)
+        emitted = np.full(n, -1, np.int64)
+        active = np.arange(n)
+
+        while active.size:
+            if self.triggers:
+                global_next = self._first_true(self.triggers, ctx, active, None)
+                fired = global_next >= 0
+                current[active[fired]] = global_next[fired]
+
+            next_state = np.full(active.size, -1, np.int64)
+            local_active = local[active]
+            for s in np.unique(local_active):
+                sel = np.flatnonzero(local_active == s)
+                next_state[sel] = self._first_true(self.transitions[s], ctx, active[sel], ignored)
+
+            has_next = next_state >= 0
+            target = np.where(has_next, next_state, 0)
+            cd = np.array([self.cooldowns[t] for t in target], dtype=object) if active.size else np.zeros(0)
+            has_cd = has_next & np.array([bool(c) for c in cd], bool)
+            on_cooldown = has_cd & (cooldown[active, target] > 0)
+            ignored[active[on_cooldown], target[on_cooldown]] = True
+
+            moved = has_next & ~on_cooldown
+            for t in np.unique(target[moved]):
+                sel = np.flatnonzero(moved & (target == t))
+                rows = active[sel]
+                affordable = np.ones(len(rows), bool)
+                for res, val in self.costs[t].items():
+                    values, present = ctx.get(res, rows)
+                    affordable &= np.where(present, values, 0) >= val
+                for res, val in self.costs[t].items():
+                    ctx.subtract(res, rows[affordable], val)
+                moved[sel[~affordable]] = False
+
+            moved_rows = active[moved]
+            current[moved_rows] = target[moved]
+            local[moved_rows] = target[moved]
+            chained = moved & self.is_transition[target]
+            settled = moved & ~chained & has_cd
+            cooldown[active[settled], target[settled]] = [c + 1 for c in cd[settled]]
+
+            finished = ~on_cooldown & ~chained
+            done_rows = active[finished]
+            acting = ~self.is_transition[local[done_rows]]
+            emitted[done_rows[acting]] = local[done_rows[acting]]
+            active = active[~finished]
+
+        np.maximum(cooldown - 1, 0, out=cooldown)
+        return [self.actions[s] if s >= 0 else () for s in emitted]
+
+
+def main() -> None:
+    import random
+    from creature import Creature
+
+    rng = random.Random(7)
+    dragons = [
+        Creature({
+            "_object": "Creature", "name": f"Dragon {i}", "race": "Dragon",
+            "ability_score": None, "inventory": [],
+            "behaviour": {"_flags": {"to_load"}, "loadfile": "dragon"},
+            "tags": {}, "reactions": {},
+        })
+        for i in range(200)
+    ]
+    behaviours = [d.behaviour for d in dragons]
+    batch = BatchBehaviour(behaviours[0])
+    state = batch.from_behaviours(behaviours)
+
+    mismatches = 0
+    for tick in range(50):
+        contexts = [
+            {
+                "enemies_in_sight": rng.randint(0, 3),
+                "distance_to_nearest_enemy": rng.randint(1, 9),
+                "health_ratio": rng.choice([0.5, 1.0]),
+                "stamina": rng.randint(0, 10),
+                "surrounded": rng.random() < 0.2,
+            }
+            for _ in dragons
+        ]
+        ctx = BatchContext.from_dicts(contexts)
+        batch_actions = batch.step(state, ctx)
+        single_actions = [b.step(c) for b, c in zip(behaviours, contexts)]
+        mismatches += sum(a != b for a, b in zip(batch_actions, single_actions))
+        mismatches += sum(batch.names[s] != b.current for s, b in zip(state.current, behaviours))
+    print(f"Mismatches after 50 ticks x {len(dragons)} dragons: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from behaviour import Behaviour, BehaviourState
+
+
+class _Timing:
+    __slots__ = ("evaluations", "hits", "ns")
+
+    def __init__(self) -> None:
+        self.evaluations = 0
+        self.hits = 0
+        self.ns = 0
+
+
+class BehaviourProfiler:
+    """
+    Volitelné měření Behaviour.step: počty vyhodnocení a čas podmínek
+    pro každý přechod a globální trigger, hloubka řetězce přechodů za krok
+    a počty přeskočení kvůli cooldownu.
+
+    Zapíná se přiřazením `behaviour.profiler = profiler` (jeden profiler může
+    sdílet libovolný počet tvorů); bez něj step() nic neměří.
+    """
+
+    def __init__(self) -> None:
+        # (definice, stav, index přechodu, cíl) -> měření
+        self.transitions: Dict[Tuple[str, str, int, Optional[str]], _Timing] = {}
+        # (definice, index triggeru, cíl) -> měření
+        self.triggers: Dict[Tuple[str, int, Optional[str]], _Timing] = {}
+        self.cooldown_skips: Counter = Counter()  # (definice, stav, cíl)
+        self.chain_depth: Dict[str, Counter] = {}  # definice -> {hloubka: počet kroků}
+        self.steps: Counter = Counter()  # (definice, výchozí stav)
+        self.step_ns: Counter = Counter()
+
+    @staticmethod
+    def _source(behaviour: "Behaviour") -> str:
+        return behaviour.definition.source or "<inline>"
+
+    def global_triggers(self, behaviour: "Behaviour", context: Dict[str, Any]) -> Optional[str]:
+        """Behaviour.check_global_triggers s měřením."""
+        source = self._source(behaviour)
+        clock = time.perf_counter_ns
+        for i, (to, condition) in enumerate(behaviour.compiled_triggers):
+            key = (source, i, to)
+            timing = self.triggers.get(key)
+            if timing is None:
+                timing = self.triggers[key] = _Timing()
+            start = clock()
+            result = condition(context)
+            timing.ns += clock() - start
+            timing.evaluations += 1
+            if result:
+                timing.hits += 1
+                return to
+        return None
+
+    def next_state(self, behaviour: "Behaviour", state: "BehaviourState", context: Dict[str, Any],
+                   ignored: List[str]) -> Optional[str]:
+        """BehaviourState.get_next_state s měřením."""
+        source = self._source(behaviour)
+        clock = time.perf_counter_ns
+        for i, (to, condition) in enumerate(state.compiled_transitions):
+            key = (source, state.name, i, to)
+            timing = self.transitions.get(key)
+            if timing is None:
+                timing = self.transitions[key] = _Timing()
+            start = clock()
+            result = condition(context)
+            timing.ns += clock() - start
+            timing.evaluations += 1
+            if result:
+                timing.hits += 1
+                if to not in ignored:
+                    return to
+        return None
+
+    def cooldown_skip(self, behaviour: "Behaviour", state: str, target: str) -> None:
+        self.cooldown_skips[(self._source(behaviour), state, target)] += 1
+
+    def step_done(self, behaviour: "Behaviour", start_state: str, depth: int, ns: int) -> None:
+        source = self._source(behaviour)
+        self.chain_depth.setdefault(source, Counter())[depth] += 1
+        self.steps[(source, start_state)] += 1
+        self.step_ns[(source, start_state)] += ns
+
+    def reset(self) -> None:
+        self.__init__()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Strojově čitelná podoba (pro JSON)."""
+        return {
+            "transitions": [
+                {"definition": d, "state": s, "index": i, "to": to,
+                 "evaluations": t.evaluations, "hits": t.hits, "ns": t.ns}
+                for (d, s, i, to), t in self.transitions.items()
+            ],
+            "triggers": [
+                {"definition": d, "index": i, "to": to,
+                 "evaluations": t.evaluations, "hits": t.hits, "ns": t.ns}
+                for (d, i, to), t in self.triggers.items()
+            ],
+            "cooldown_skips": [
+                {"definition": d, "state": s, "to": to, "count": n}
+                for (d, s, to), n in self.cooldown_skips.items()
+            ],
+            "chain_depth": {d: dict(sorted(c.items())) for d, c in self.chain_depth.items()},
+            "steps": [
+                {"definition": d, "state": s, "count": n, "ns": self.step_ns[(d, s)]}
+                for (d, s), n in self.steps.items()
+            ],
+        }
+
+    def folded(self) -> str:
+        """
+        Řádky "definice;stav;podmínka ns" pro flamegraph.pl / speedscope.
+        Čas kroků mimo vyhodnocování podmínek je v rámci "(step)".
+        """
+        lines = []
+        own: Counter = Counter()
+        for (d, _), ns in self.step_ns.items():
+            own[d] += ns
+        for (d, s, i, to), t in self.transitions.items():
+            lines.append(f"{d};{s};{s}->{to}#{i} {t.ns}")
+            own[d] -= t.ns
+        for (d, i, to), t in self.triggers.items():
+            lines.append(f"{d};global_triggers;trigger#{i}->{to} {t.ns}")
+            own[d] -= t.ns
+        lines += [f"{d};(step) {max(ns, 0)}" for d, ns in own.items()]
+        return "\n".join(lines) + "\n"
+
+    def report(self, top: int = 15) -> str:
+        """Textový přehled nejdražších podmínek, hloubek řetězců a cooldownů."""
+        rows = [(t.ns, f"{d}:{s} -> {to} #{i}", t) for (d, s, i, to), t in self.transitions.items()]
+        rows += [(t.ns, f"{d}:global -> {to} #{i}", t) for (d, i, to), t in self.triggers.items()]
+        rows.sort(key=lambda row: row[0], reverse=True)
+        total = sum(self.steps.values())
+        lines = [f"Steps: {total}, time {sum(self.step_ns.values()) / 1e6:.2f} ms", "",
+                 f"{'condition':42} {'evals':>9} {'hits':>8} {'total ms':>9} {'ns/eval':>8}"]
+        for ns, name, t in rows[:top]:
+            lines.append(f"{name:42} {t.evaluations:>9} {t.hits:>8} {ns / 1e6:>9.3f} "
+                         f"{ns / max(t.evaluations, 1):>8.0f}")
+        lines.append("")
+        for source, depths in self.chain_depth.items():
+            lines.append(f"Chain depth ({source}): " + ", ".join(f"{k}: {v}" for k, v in sorted(depths.items())))
+        if self.cooldown_skips:
+            lines.append("Cooldown skips: " + ", ".join(
+                f"{s}->{to}: {n}" for (_, s, to), n in self.cooldown_skips.most_common(top)))
+        return "\n".join(lines)
+
+
+def main() -> None:
+    import timeit
+    from benchmark import _contexts, _dragons
+
+    dragons = _dragons(200)
+    contexts = _contexts(len(dragons))
+
+    def tick() -> None:
+        for dragon, ctx in zip(dragons, contexts):
+            dragon.think(dict(ctx))
+
+    disabled = min(timeit.repeat(tick, number=20, repeat=5))
+    profiler = BehaviourProfiler()
+    for dragon in dragons:
+        dragon.behaviour.profiler = profiler
+    enabled = min(timeit.repeat(tick, number=20, repeat=5))
+    print(f"Tick: {disabled * 50:.2f} ms disabled, {enabled * 50:.2f} ms profiled\n")
+    print(profiler.report(top=10))
+    print()
+    print(profiler.folded().splitlines()[:5])
+
+
+if __name__ == "__main__":
+    main()
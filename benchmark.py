@@ -0,0 +1,444 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+import numpy as np
+from hexmap import HexMap
+
+
+class _DictHex:
+    """Původní buňka (kopie před přechodem na pole) - jen pro srovnání."""
+
+    def __init__(self, q: int, r: int, terrain: str = "plain"):
+        self.q = q
+        self.r = r
+        self.terrain = terrain
+        self.occupant = None
+
+    def neighbors(self):
+        return [(self.q + dq, self.r + dr) for dq, dr in
+                ((1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1), (0, 1))]
+
+
+class DictHexMap:
+    """Původní HexMap nad dict[(q, r)] -> Hex - jen pro srovnání."""
+
+    def __init__(self, radius: int):
+        self.hexes: dict[tuple[int, int], _DictHex] = {}
+        for q in range(-radius, radius + 1):
+            r1 = max(-radius, -q - radius)
+            r2 = min(radius, -q + radius)
+            for r in range(r1, r2 + 1):
+                self.hexes[(q, r)] = _DictHex(q, r)
+
+    def get(self, q: int, r: int) -> _DictHex | None:
+        return self.hexes.get((q, r))
+
+    def distance(self, a: Any, b: Any) -> int:
+        return (abs(a.q - b.q) + abs(a.q + a.r - b.q - b.r) + abs(a.r - b.r)) // 2
+
+    def neighbors(self, hex_: _DictHex):
+        return [self.hexes.get(n) for n in hex_.neighbors() if n in self.hexes]
+
+
+def measure_memory(factory: Callable[[], Any]) -> tuple[Any, int]:
+    """Vrátí (objekt, bajty alokované při jeho vytvoření)."""
+    tracemalloc.start()
+    obj = factory()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current
+
+
+def ops_per_sec(fn: Callable[[], Any], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return repeat / (time.perf_counter() - start)
+
+
+def bench_hexmap(radii: tuple[int, ...] = (10, 50, 200, 500), lookups: int = 100_000) -> list[dict[str, Any]]:
+    """Porovná paměť a rychlost dotazů array HexMap vs. původní dict verze."""
+    results = []
+    for radius in radii:
+        rng = random.Random(radius)
+        coords = [(rng.randint(-radius, radius), rng.randint(-radius, radius)) for _ in range(lookups)]
+        for name, cls in (("array", HexMap), ("dict", DictHexMap)):
+            start = time.perf_counter()
+            m, memory = measure_memory(lambda: cls(radius))
+            build = time.perf_counter() - start
+            center = m.get(0, 0)
+            it = iter(coords * 2)
+            results.append({
+                "impl": name,
+                "radius": radius,
+                "memory_bytes": memory,
+                "build_s": build,
+                "get_ops": ops_per_sec(lambda: m.get(*next(it)), lookups),
+                "neighbors_ops": ops_per_sec(lambda: m.neighbors(center), lookups // 10),
+            })
+            del m
+    return results
+
+
+CREATURE_DATA: dict[str, Any] = {
+    "_object": "Creature",
+    "_flags": [],
+    "name": "Johnny",
+    "race": "Dragon",
+    "ability_score": {
+        "_object": "AbilityScore",
+        "_flags": ["extra_ability_score"],
+        "str": 20, "dex": 14, "con": 20, "int": 14, "wis": 18, "chr": 15,
+        "extra": {
+            "_object": "AbilityScore",
+            "str": 0, "dex": 0, "con": 0, "int": 0, "wis": 0, "chr": 0,
+            "metadata": {"_object": "Metadata", "min": 0, "max": 5}
+        },
+        "metadata": {"_object": "Metadata", "min": 1, "max": 20}
+    },
+    "inventory": [],
+    "behaviour": {"_object": "Behaviour", "_flags": ["to_load"], "loadfile": "dragon"},
+    "tags": {},
+    "reactions": {},
+}
+
+
+def bench_object_memory(count: int = 10_000) -> dict[str, float]:
+    """
+    Průměrná paměť na instanci (bajty) po vytvoření a po to_dict() - ten u
+    objektů bez slotů materializuje __dict__.
+    """
+    from creature import Creature
+    from abilityscore import AbilityScore
+    from data_structures import Metadata
+
+    Creature(CREATURE_DATA)  # načte sdílenou definici chování mimo měření
+    cases = {
+        "Metadata": lambda: Metadata(CREATURE_DATA["ability_score"]["metadata"]),
+        "AbilityScore": lambda: AbilityScore(CREATURE_DATA["ability_score"]),
+        "Creature": lambda: Creature(CREATURE_DATA),
+    }
+    results = {}
+    for name, factory in cases.items():
+        objects, memory = measure_memory(lambda: [factory() for _ in range(count)])
+        results[name] = memory / count
+        _, memory = measure_memory(lambda: [o.to_dict() for o in objects] and None)
+        results[f"{name} (after to_dict)"] = results[name] + memory / count
+        del objects
+    return results
+
+
+Setup = Callable[[], tuple[Callable[[], Any], int]]
+BENCHMARKS: dict[str, Setup] = {}
+RESULTS_FORMAT = "my_little_rpg/bench"
+MIN_PEAK_BYTES = 64 * 1024  # menší špičky jsou jen šum
+
+
+def benchmark(name: str) -> Callable[[Setup], Setup]:
+    """
+    Registruje benchmark. Funkce připraví data (mimo měření) a vrátí
+    (operace, počet položek zpracovaných jedním voláním).
+    """
+    def register(setup: Setup) -> Setup:
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _dragons(count: int) -> list[Any]:
+    from creature import Creature
+    return [Creature({**CREATURE_DATA, "name": f"Dragon {i}"}) for i in range(count)]
+
+
+def _contexts(count: int, seed: int = 0) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "enemies_in_sight": rng.randint(0, 3),
+            "distance_to_nearest_enemy": rng.randint(1, 9),
+            "health_ratio": rng.choice([0.5, 1.0]),
+            "stamina": rng.randint(0, 10),
+            "surrounded": rng.random() < 0.2,
+        }
+        for _ in range(count)
+    ]
+
+
+@benchmark("behaviour.step")
+def _behaviour_step() -> tuple[Callable[[], Any], int]:
+    dragons = _dragons(1000)
+    contexts = _contexts(len(dragons))
+
+    def tick() -> None:
+        for dragon, ctx in zip(dragons, contexts):
+            dragon.think(dict(ctx))
+    return tick, len(dragons)
+
+
+@benchmark("behaviour.step_inplace")
+def _behaviour_step_inplace() -> tuple[Callable[[], Any], int]:
+    # trvalé kontexty a ponechané výsledky: alloc_blocks/peak_bytes ukazují,
+    # co alokuje samotný step()
+    dragons = _dragons(1000)
+    contexts = [dict(ctx) for ctx in _contexts(len(dragons))]
+    behaviours = [dragon.behaviour for dragon in dragons]
+
+    def tick() -> list[Any]:
+        return [behaviour.step(ctx) for behaviour, ctx in zip(behaviours, contexts)]
+    return tick, len(dragons)
+
+
+@benchmark("behaviour.batch_step")
+def _behaviour_batch_step() -> tuple[Callable[[], Any], int]:
+    from behaviour_batch import BatchBehaviour, BatchContext
+    dragons = _dragons(1000)
+    contexts = _contexts(len(dragons))
+    batch = BatchBehaviour(dragons[0].behaviour)
+    state = batch.from_behaviours([d.behaviour for d in dragons])
+
+    def tick() -> None:
+        batch.step(state, BatchContext.from_dicts(contexts))
+    return tick, len(dragons)
+
+
+@benchmark("json.decode")
+def _json_decode() -> tuple[Callable[[], Any], int]:
+    from data_structures import decode_value
+    tree = {"_object": "Metadata", "creatures": [
+        {**CREATURE_DATA, "name": f"Dragon {i}"} for i in range(1000)
+    ]}
+    _dragons(1)  # definice chování se načte mimo měření
+    return lambda: decode_value(tree), 1000
+
+
+@benchmark("json.encode")
+def _json_encode() -> tuple[Callable[[], Any], int]:
+    dragons = _dragons(1000)
+    return lambda: [d.to_dict() for d in dragons], len(dragons)
+
+
+for _radius in (50, 200):
+    def _setups(radius: int) -> None:
+        # každá sada má vlastní RNG, aby výsledky nezávisely na výběru (-k) a pořadí benchmarků
+        @benchmark(f"hexmap.build.r{radius}")
+        def _build() -> tuple[Callable[[], Any], int]:
+            return lambda: HexMap(radius), 1
+
+        def _map() -> HexMap:
+            m = HexMap(radius)
+            rng = random.Random(radius)
+            for _ in range(m.size // 10):
+                q = rng.randint(-radius, radius)
+                r = rng.randint(max(-radius, -q - radius), min(radius, -q + radius))
+                m.set_terrain(q, r, rng.choice(["forest", "hill", "water", "mountain"]))
+            return m
+
+        @benchmark(f"hexmap.get.r{radius}")
+        def _get() -> tuple[Callable[[], Any], int]:
+            m = _map()
+            rng = random.Random(f"get.r{radius}")
+            coords = [(rng.randint(-radius, radius), rng.randint(-radius, radius)) for _ in range(10_000)]
+            return lambda: [m.get(q, r) for q, r in coords], len(coords)
+
+        @benchmark(f"hexmap.range.r{radius}")
+        def _range() -> tuple[Callable[[], Any], int]:
+            m = _map()
+            return lambda: m.hexes_in_range((1, -1), 10), 1
+
+        @benchmark(f"hexmap.line_of_sight.r{radius}")
+        def _los() -> tuple[Callable[[], Any], int]:
+            m = _map()
+            rng = random.Random(f"line_of_sight.r{radius}")
+            pairs = [((0, 0), (rng.randint(-radius, radius) // 2, 0)) for _ in range(100)]
+            return lambda: [m.line_of_sight(a, b) for a, b in pairs], len(pairs)
+
+        @benchmark(f"hexmap.find_path.r{radius}")
+        def _path() -> tuple[Callable[[], Any], int]:
+            m = _map()
+
+            def find() -> Any:
+                m.touch(occupancy=False)  # bez cache cest
+                return m.find_path((-radius // 2, 0), (radius // 2, 0))
+            return find, 1
+
+    _setups(_radius)
+del _radius
+
+
+def _synthetic_image(width: int, height: int) -> str:
+    from PIL import Image
+    path = os.path.join(tempfile.gettempdir(), f"bench_{width}x{height}.png")
+    if not os.path.exists(path):
+        y, x = np.mgrid[0:height, 0:width]
+        pixels = (np.sin(x / 17.0) * np.cos(y / 11.0) * 127 + 128).astype(np.uint8)
+        Image.fromarray(pixels).save(path)
+    return path
+
+
+@benchmark("ascii.from_file")
+def _ascii_from_file() -> tuple[Callable[[], Any], int]:
+    from data_structures import AsciiImage
+    path = _synthetic_image(640, 480)
+
+    def convert() -> None:
+        AsciiImage().from_file(path, max_height=120)
+    return convert, 1
+
+
+@benchmark("ascii.render")
+def _ascii_render() -> tuple[Callable[[], Any], int]:
+    from data_structures import AsciiImage
+    image = AsciiImage()
+    image.from_file(_synthetic_image(640, 480))
+
+    def render() -> str:
+        image._rendered = None  # měří se vykreslení, ne cache
+        return str(image)
+    return render, 1
+
+
+def run_benchmark(setup: Setup, min_time: float = 0.2, rounds: int = 5) -> dict[str, Any]:
+    """
+    Nejlepší z `rounds` měření (každé aspoň `min_time` s) a jedno volání pod
+    tracemalloc: bloky alokované voláním a živé na jeho konci (včetně
+    výsledku) a špička paměti nad výchozí stav.
+    """
+    op, items = setup()
+    op()  # zahřátí (cache, lazy importy)
+    repeat = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            op()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / rounds or repeat >= 1 << 20:
+            break
+        repeat *= 2
+    best = elapsed
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            op()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    baseline, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    result = op()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del result
+    blocks = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, "filename"))
+    return {
+        "ops_per_sec": repeat / best,
+        "items_per_sec": repeat * items / best,
+        "alloc_blocks": blocks,
+        "peak_bytes": peak - baseline,
+        "repeat": repeat,
+    }
+
+
+def run_suite(pattern: str = "", min_time: float = 0.2, rounds: int = 5) -> dict[str, Any]:
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if pattern in name:
+            results[name] = run_benchmark(setup, min_time, rounds)
+    return {
+        "_format": RESULTS_FORMAT,
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], tolerance: float = 0.1) -> list[str]:
+    """
+    Regrese oproti uloženému baseline: pokles ops/sec nebo nárůst špičky
+    paměti o víc než `tolerance` (poměrně).
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        speed = result["ops_per_sec"] / base["ops_per_sec"]
+        if speed < 1 - tolerance:
+            regressions.append(f"{name}: {speed:.2f}x ops/sec")
+        if result["peak_bytes"] > max(base["peak_bytes"] * (1 + tolerance), MIN_PEAK_BYTES):
+            regressions.append(f"{name}: peak memory {result['peak_bytes'] / 1024:,.0f} KB "
+                               f"(baseline {base['peak_bytes'] / 1024:,.0f} KB)")
+    return regressions
+
+
+def print_results(current: dict[str, Any], baseline: Optional[dict[str, Any]] = None) -> None:
+    print(f"{'benchmark':32} {'ops/s':>12} {'items/s':>14} {'allocs':>9} {'peak KB':>10} {'vs base':>8}")
+    for name, row in current["results"].items():
+        base = (baseline or {}).get("results", {}).get(name)
+        ratio = f"{row['ops_per_sec'] / base['ops_per_sec']:.2f}x" if base else ""
+        print(f"{name:32} {row['ops_per_sec']:>12,.1f} {row['items_per_sec']:>14,.0f} "
+              f"{row['alloc_blocks']:>9,} {row['peak_bytes'] / 1024:>10,.1f} {ratio:>8}")
+
+
+def print_memory_report() -> None:
+    print("Bytes per instance:")
+    for name, size in bench_object_memory().items():
+        print(f"  {name:30} {size:8.0f}")
+    print()
+    print(f"{'impl':6} {'radius':>6} {'memory MB':>10} {'build s':>8} {'get/s':>12} {'neighbors/s':>12}")
+    for row in bench_hexmap():
+        print(f"{row['impl']:6} {row['radius']:>6} {row['memory_bytes'] / 2**20:>10.2f} {row['build_s']:>8.3f} "
+              f"{row['get_ops']:>12,.0f} {row['neighbors_ops']:>12,.0f}")
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarky my_little_rpg.")
+    parser.add_argument("-k", "--filter", default="", help="jen benchmarky obsahující tento text")
+    parser.add_argument("-o", "--output", help="uložit výsledky jako JSON")
+    parser.add_argument("-b", "--baseline", help="porovnat s uloženými výsledky")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--list", action="store_true", help="vypsat benchmarky")
+    parser.add_argument("--memory-report", action="store_true",
+                        help="paměť na instanci a srovnání s dict HexMap")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(name for name in BENCHMARKS if args.filter in name))
+        return 0
+    if args.memory_report:
+        print_memory_report()
+        return 0
+
+    current = run_suite(args.filter, args.min_time)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(current, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+    if baseline is not None:
+        regressions = compare(current, baseline, args.tolerance)
+        for line in regressions:
+            print("REGRESSION", line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+import json
+import logging
+import os
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, Optional
+from behaviour import BEHAVIOUR_DIR, load_definition
+from data_structures import decode_value
+from world_io import iter_json_array
+
+
+FORMAT = "my_little_rpg/catalog"
+VERSION = 1
+INDEX_PATH = os.path.join(".cache", "catalog.json")
+DEFAULT_SOURCES = ("races.json", BEHAVIOUR_DIR)
+CACHE_SIZE = 256
+
+
+class CatalogEntry:
+    """Jedna položka indexu: kde v kterém souboru leží JSON objektu (offset a délka v bajtech)."""
+    __slots__ = ("type", "name", "tags", "path", "offset", "length")
+
+    def __init__(self, type: str, name: str, tags: Iterable[str], path: str, offset: int, length: int) -> None:
+        self.type = type
+        self.name = name
+        self.tags = tuple(tags)
+        self.path = path
+        self.offset = offset
+        self.length = length
+
+    def to_list(self) -> list[Any]:
+        return [self.type, self.name, list(self.tags), self.path, self.offset, self.length]
+
+    def __repr__(self) -> str:
+        return f"CatalogEntry({self.type!r}, {self.name!r}, tags={self.tags!r}, {self.path!r}@{self.offset})"
+
+
+def _text(value: Any) -> Any:
+    # soubory se při skenování čtou jako latin-1 (znak = bajt, offsety sedí);
+    # řetězce z indexu se vrací do UTF-8
+    return value.encode("latin-1").decode("utf-8") if isinstance(value, str) else value
+
+
+def _tags(data: dict[str, Any]) -> list[str]:
+    tags = data.get("tags")
+    if isinstance(tags, dict):
+        tags = list(tags)
+    if not isinstance(tags, list):
+        return []
+    return [_text(t) for t in tags if isinstance(t, str)]
+
+
+def scan_file(path: str) -> list[CatalogEntry]:
+    """
+    Položky jednoho JSON souboru: pole objektů (races.json) nebo jeden objekt
+    (definice chování, jméno podle souboru). Objekty se zde nedekódují.
+    """
+    size = os.path.getsize(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    with open(path, "r", encoding="latin-1") as f:
+        start = f.read(1 << 12).lstrip()
+        f.seek(0)
+        if start.startswith("["):
+            found = [(offset, value) for offset, value in iter_json_array(f) if isinstance(value, dict)]
+        else:
+            text = f.read()
+            found = [(len(text) - len(text.lstrip()), json.loads(text))]
+    entries = []
+    for i, (offset, data) in enumerate(found):
+        # délka sahá k dalšímu prvku; raw_decode zbytek za objektem ignoruje
+        end = found[i + 1][0] if i + 1 < len(found) else size
+        type_name = _text(data.get("_object"))
+        if not type_name and "states" in data:
+            type_name = "Behaviour"
+        if not isinstance(type_name, str) or not type_name:
+            continue
+        name = _text(data.get("name")) if isinstance(data.get("name"), str) else stem
+        entries.append(CatalogEntry(type_name, name, _tags(data), path, offset, end - offset))
+    return entries
+
+
+def _single_object(path: str) -> bool:
+    """Je v souboru jeden objekt (definice chování), ne pole?"""
+    with open(path, "rb") as f:
+        return f.read(1 << 12).lstrip().startswith(b"{")
+
+
+def _source_files(sources: Iterable[str]) -> list[str]:
+    files = []
+    for source in sources:
+        if os.path.isdir(source):
+            files += sorted(os.path.join(source, n) for n in os.listdir(source) if n.endswith(".json"))
+        elif os.path.exists(source):
+            files.append(source)
+    return files
+
+
+class Catalog:
+    """
+    Index obsahu hry (rasy, definice chování, ...) podle typu `_object` a jména.
+
+    Při vytvoření se načte index z `index_path` a znovu se projdou jen soubory,
+    jejichž mtime se od posledního běhu změnil. Objekty se dekódují až při
+    get() a posledních `cache_size` se drží v LRU cache; vrácené objekty jsou
+    sdílené, měnit se mají jen jejich kopie. Soubory s definicí chování se
+    načítají přes load_definition(), takže BehaviourDefinition je tatáž
+    jako u tvorů.
+    """
+
+    def __init__(self, sources: Iterable[str] = DEFAULT_SOURCES, index_path: Optional[str] = INDEX_PATH,
+                 cache_size: int = CACHE_SIZE) -> None:
+        self.sources = tuple(sources)
+        self.index_path = index_path
+        self._files: dict[str, int] = {}  # cesta -> mtime_ns při skenování
+        self._entries: dict[str, list[CatalogEntry]] = {}  # cesta -> položky
+        self._by_key: dict[tuple[str, str], CatalogEntry] = {}
+        self._by_type: dict[str, list[CatalogEntry]] = {}
+        self._by_tag: dict[str, list[CatalogEntry]] = {}
+        self._decode = lru_cache(maxsize=cache_size)(self._load)
+        self._read_index()
+        self.refresh()
+
+    def _read_index(self) -> None:
+        if not self.index_path or not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring catalog index {self.index_path}: {e}")
+            return
+        if index.get("_format") != FORMAT or index.get("_version") != VERSION:
+            return
+        for path, (mtime, entries) in index["files"].items():
+            self._files[path] = mtime
+            self._entries[path] = [CatalogEntry(*e) for e in entries]
+
+    def _write_index(self) -> None:
+        if not self.index_path:
+            return
+        directory = os.path.dirname(self.index_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        index = {"_format": FORMAT, "_version": VERSION, "files": {
+            path: [self._files[path], [e.to_list() for e in entries]] for path, entries in self._entries.items()
+        }}
+        tmp = f"{self.index_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, self.index_path)
+
+    def refresh(self) -> int:
+        """Projde zdroje znovu; vrací počet přeskenovaných (nových či změněných) souborů."""
+        files = _source_files(self.sources)
+        changed = 0
+        for path in files:
+            mtime = os.stat(path).st_mtime_ns
+            if self._files.get(path) == mtime:
+                continue
+            try:
+                self._entries[path] = scan_file(path)
+            except (OSError, ValueError) as e:
+                logging.error(f"[Catalog] {path}: {e}")
+                self._entries[path] = []
+            self._files[path] = mtime
+            changed += 1
+        for path in set(self._files) - set(files):
+            del self._files[path], self._entries[path]
+            changed += 1
+        if changed or not self._by_key:
+            self._build_lookups()
+            self._decode.cache_clear()
+        if changed:
+            self._write_index()
+        return changed
+
+    def _build_lookups(self) -> None:
+        self._by_key.clear()
+        self._by_type.clear()
+        self._by_tag.clear()
+        for entries in self._entries.values():
+            for entry in entries:
+                key = (entry.type, entry.name)
+                if key in self._by_key:
+                    previous = self._by_key[key]
+                    logging.warning(f"[Catalog] {entry.type} '{entry.name}' in {entry.path} "
+                                    f"overrides the one in {previous.path}")
+                    self._by_type[entry.type].remove(previous)
+                    for tag in previous.tags:
+                        self._by_tag[tag].remove(previous)
+                self._by_key[key] = entry
+                self._by_type.setdefault(entry.type, []).append(entry)
+                for tag in entry.tags:
+                    self._by_tag.setdefault(tag, []).append(entry)
+
+    def __len__(self) -> int:
+        return len(self._by_key)
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        return key in self._by_key
+
+    def types(self) -> list[str]:
+        return sorted(self._by_type)
+
+    def names(self, type: str) -> list[str]:
+        return [e.name for e in self._by_type.get(type, ())]
+
+    def entry(self, type: str, name: str) -> Optional[CatalogEntry]:
+        return self._by_key.get((type, name))
+
+    def find(self, type: Optional[str] = None, tag: Optional[str] = None,
+             prefix: Optional[str] = None) -> list[CatalogEntry]:
+        """Položky podle typu, tagu a začátku jména (vše volitelné) - bez dekódování."""
+        if tag is not None:
+            entries = self._by_tag.get(tag, [])
+            if type is not None:
+                entries = [e for e in entries if e.type == type]
+        elif type is not None:
+            entries = self._by_type.get(type, [])
+        else:
+            entries = list(self._by_key.values())
+        if prefix is not None:
+            entries = [e for e in entries if e.name.startswith(prefix)]
+        return list(entries)
+
+    def raw(self, entry: CatalogEntry) -> dict[str, Any]:
+        """JSON položky přečtený přímo z jejího místa v souboru."""
+        with open(entry.path, "rb") as f:
+            f.seek(entry.offset)
+            data = f.read(entry.length)
+        value, _ = json.JSONDecoder().raw_decode(data.decode("utf-8"))
+        return value
+
+    def _load(self, type: str, name: str) -> Any:
+        entry = self._by_key[(type, name)]
+        if type == "Behaviour" and _single_object(entry.path):
+            # soubor s definicí: sdílená instance z load_definition (stejná jako u tvorů z loadfile)
+            stem = os.path.splitext(os.path.basename(entry.path))[0]
+            return load_definition(stem, os.path.dirname(entry.path))
+        return decode_value(self.raw(entry))
+
+    def get(self, type: str, name: str) -> Any:
+        """Dekódovaný objekt (sdílený, z LRU cache); KeyError, pokud v katalogu není."""
+        entry = self._by_key.get((type, name))
+        if entry is not None:
+            try:
+                changed = os.stat(entry.path).st_mtime_ns != self._files[entry.path]
+            except OSError:
+                changed = True
+            if changed:
+                # soubor se změnil od skenování - offsety ani cache už neplatí
+                self.refresh()
+                entry = self._by_key.get((type, name))
+        if entry is None:
+            raise KeyError(f"{type} '{name}' is not in the catalog")
+        return self._decode(type, name)
+
+    def load(self, type: Optional[str] = None, tag: Optional[str] = None) -> Iterator[Any]:
+        """Dekódované objekty pro find(type, tag)."""
+        for entry in self.find(type, tag):
+            yield self.get(entry.type, entry.name)
+
+    def cache_info(self) -> Any:
+        return self._decode.cache_info()
+
+
+def main() -> None:
+    import random
+    import shutil
+    import tempfile
+    import time
+
+    rng = random.Random(3)
+    root = tempfile.mkdtemp()
+    tags = ["undead", "flying", "aquatic", "giant", "fey", "construct"]
+    races = [{"_object": "Race", "name": f"Race {i}", "tags": rng.sample(tags, 2)} for i in range(20000)]
+    races_path = os.path.join(root, "races.json")
+    with open(races_path, "w", encoding="utf-8") as f:
+        json.dump(races, f, indent=4)
+    behaviours = os.path.join(root, "behaviours")
+    shutil.copytree(BEHAVIOUR_DIR, behaviours)
+    index_path = os.path.join(root, "catalog.json")
+    try:
+        start = time.perf_counter()
+        with open(races_path, "r", encoding="utf-8") as f:
+            everything = [decode_value(r) for r in json.load(f)]
+        print(f"Decode everything: {time.perf_counter() - start:.3f} s ({len(everything)} races)")
+
+        start = time.perf_counter()
+        catalog = Catalog([races_path, behaviours], index_path)
+        print(f"Cold catalog: {time.perf_counter() - start:.3f} s, {len(catalog)} entries, types {catalog.types()}")
+        start = time.perf_counter()
+        catalog = Catalog([races_path, behaviours], index_path)
+        print(f"Warm catalog: {time.perf_counter() - start:.3f} s")
+
+        start = time.perf_counter()
+        race = catalog.get("Race", "Race 12345")
+        flying = catalog.find("Race", tag="flying")
+        print(f"Lookup: {race!r}, {len(flying)} flying races, {time.perf_counter() - start:.4f} s")
+        print("Same object:", catalog.get("Race", "Race 12345") is race, catalog.cache_info())
+        print("Behaviour:", catalog.get("Behaviour", "dragon"))
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import ast
+import math
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Optional
+
+
+SAFE_GLOBALS: Dict[str, Any] = {"__builtins__": {}, "min": min, "max": max, "abs": abs, "math": math}
+SAFE_CALLS = frozenset({"min", "max", "abs"})
+ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+    ast.IfExp, ast.Call, ast.Attribute, ast.Name, ast.Load, ast.Constant, ast.Tuple, ast.List,
+)
+
+
+def _validate_condition(tree: ast.AST, expr: str) -> None:
+    """Odmítne vše, co není jednoduchý aritmetický/logický výraz."""
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_NODES):
+            raise ValueError(f"Unsupported syntax '{type(node).__name__}' in condition '{expr}'.")
+        if isinstance(node, ast.Name) and node.id.startswith("_"):
+            raise ValueError(f"Unsafe name '{node.id}' in condition '{expr}'.")
+        if isinstance(node, ast.Attribute):
+            if not (isinstance(node.value, ast.Name) and node.value.id == "math") or node.attr.startswith("_"):
+                raise ValueError(f"Unsafe attribute '{node.attr}' in condition '{expr}'.")
+        if isinstance(node, ast.Call):
+            if node.keywords:
+                raise ValueError(f"Keyword arguments are not allowed in condition '{expr}'.")
+            if not (isinstance(node.func, ast.Attribute)
+                    or isinstance(node.func, ast.Name) and node.func.id in SAFE_CALLS):
+                raise ValueError(f"Call not allowed in condition '{expr}'.")
+
+
+class _ContextView:
+    """
+    Pohled na živý kontext, který propustí jen číselné hodnoty (bez kopie).
+    Behaviour.step() používá jeden pohled pro všechny podmínky kroku.
+    """
+    __slots__ = ("context",)
+
+    def __init__(self, context: Optional[Dict[str, Any]]) -> None:
+        self.context = context
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.context[key]
+        if isinstance(value, (int, float)):
+            return value
+        raise KeyError(key)
+
+
+class Condition:
+    """Podmínka zkompilovaná jednou při načtení chování."""
+    __slots__ = ("source", "tree", "code", "names", "constant")
+
+    def __init__(self, source: str) -> None:
+        if isinstance(source, bool):
+            source = str(source)
+        self.source = source
+        try:
+            self.tree: ast.Expression = ast.parse(source.strip(), mode="eval")
+        except SyntaxError as e:
+            raise ValueError(f"Invalid condition '{source}': {e.msg}") from None
+        _validate_condition(self.tree, source)
+        self.code = compile(self.tree, f"<condition {source!r}>", "eval")
+        self.names: FrozenSet[str] = frozenset(
+            node.id for node in ast.walk(self.tree)
+            if isinstance(node, ast.Name) and node.id not in SAFE_GLOBALS
+        )
+        body = self.tree.body
+        self.constant: Optional[bool] = bool(body.value) if isinstance(body, ast.Constant) else None
+
+    def __call__(self, context: Dict[str, Any]) -> bool:
+        if self.constant is not None:
+            return self.constant
+        try:
+            view = context if type(context) is _ContextView else _ContextView(context)
+            return bool(eval(self.code, SAFE_GLOBALS, view))
+        except Exception:
+            return False
+
+    def __repr__(self) -> str:
+        return f"Condition({self.source!r})"
+
+
+@lru_cache(maxsize=1024)
+def compile_condition(expr: str) -> Condition:
+    """Vrátí zkompilovanou podmínku, stejné řetězce sdílí jeden objekt."""
+    return Condition(expr)
+
+
+def safe_eval(expr: str, context: Dict[str, Any]) -> bool:
+    """Vyhodnotí výraz v bezpečném omezeném prostředí."""
+    try:
+        condition = compile_condition(expr)
+    except ValueError:
+        return False
+    return condition(context)
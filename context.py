@@ -0,0 +1,213 @@
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Sequence, Set
+
+
+_MISSING = object()
+
+
+class ContextLayer(Mapping[str, Any]):
+    """
+    Sdílené hodnoty kontextu pro mnoho tvorů (time_of_day, weather, ...).
+
+    Každá změna zvýší `version` a zapamatuje si, ve které verzi se klíč
+    změnil, takže CreatureContext zjistí změněné klíče bez kopírování vrstvy.
+    """
+
+    def __init__(self, values: Optional[Mapping[str, Any]] = None) -> None:
+        self._values: Dict[str, Any] = dict(values or {})
+        self._changed: Dict[str, int] = {}
+        self.version = 0
+
+    def __getitem__(self, key: str) -> Any:
+        return self._values[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._values
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def set(self, key: str, value: Any) -> None:
+        old = self._values.get(key, _MISSING)
+        if old is not _MISSING and type(old) is type(value) and old == value:
+            return
+        self._values[key] = value
+        self.version += 1
+        self._changed[key] = self.version
+
+    def update(self, values: Mapping[str, Any]) -> None:
+        for key, value in values.items():
+            self.set(key, value)
+
+    def delete(self, key: str) -> None:
+        del self._values[key]
+        self.version += 1
+        self._changed[key] = self.version
+
+    def changed_since(self, version: int) -> Set[str]:
+        return {key for key, changed in self._changed.items() if changed > version}
+
+
+class CreatureContext(dict):
+    """
+    Trvalý kontext jednoho tvora, který si pamatuje změněné klíče.
+
+    Vlastní hodnoty jsou v dictu samotném (čtení je stejně rychlé jako
+    u obyčejného dictu), chybějící klíče se hledají ve sdílených vrstvách.
+    Zápis hodnoty, která se nezměnila, klíč neoznačí. Behaviour.step()
+    si změněné klíče vyzvedne přes consume_dirty() a krok přeskočí, pokud
+    se nezměnil žádný klíč, na kterém aktuální stav závisí.
+
+    Iterace, len() a dict(ctx) vidí jen vlastní hodnoty; flatten() vrací
+    i hodnoty vrstev.
+    """
+    __slots__ = ("layers", "_dirty", "_seen")
+
+    def __init__(self, values: Optional[Mapping[str, Any]] = None, layers: Sequence[ContextLayer] = ()) -> None:
+        super().__init__()
+        self.layers = tuple(layers)
+        self._dirty: Set[str] = set()
+        self._seen = [layer.version for layer in self.layers]
+        self._dirty.update(key for layer in self.layers for key in layer)
+        if values:
+            self.update(values)
+
+    def __missing__(self, key: str) -> Any:
+        for layer in self.layers:
+            value = layer._values.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: object) -> bool:
+        return dict.__contains__(self, key) or any(key in layer for layer in self.layers)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        old = dict.get(self, key, _MISSING)
+        if old is not _MISSING and type(old) is type(value) and old == value:
+            return
+        dict.__setitem__(self, key, value)
+        self._dirty.add(key)
+
+    def __delitem__(self, key: str) -> None:
+        dict.__delitem__(self, key)
+        self._dirty.add(key)
+
+    def update(self, values: Mapping[str, Any] | Iterable[tuple[str, Any]] = (), **kwargs: Any) -> None:
+        # dict napřed: isinstance s typing.Mapping je pomalý a update() se volá každé kolo
+        items = values.items() if isinstance(values, (dict, Mapping)) else values
+        for key, value in items:
+            self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key: str, *default: Any) -> Any:
+        if dict.__contains__(self, key):
+            self._dirty.add(key)
+        return dict.pop(self, key, *default)
+
+    def popitem(self) -> tuple[str, Any]:
+        key, value = dict.popitem(self)
+        self._dirty.add(key)
+        return key, value
+
+    def clear(self) -> None:
+        self._dirty.update(dict.keys(self))
+        dict.clear(self)
+
+    def dirty(self) -> Set[str]:
+        """Klíče změněné od posledního consume_dirty() (vlastní i z vrstev)."""
+        dirty = set(self._dirty)
+        for layer, seen in zip(self.layers, self._seen):
+            if layer.version != seen:
+                dirty |= layer.changed_since(seen)
+        return dirty
+
+    def consume_dirty(self) -> Set[str]:
+        dirty = self._dirty
+        for i, layer in enumerate(self.layers):
+            if layer.version != self._seen[i]:
+                dirty |= layer.changed_since(self._seen[i])
+                self._seen[i] = layer.version
+        self._dirty = set()
+        return dirty
+
+    def mark_dirty(self, keys: Optional[Iterable[str]] = None) -> None:
+        """Označí klíče (bez argumentu všechny) jako změněné, např. po výměně vrstev."""
+        self._dirty.update(self.flatten() if keys is None else keys)
+
+    def flatten(self) -> Dict[str, Any]:
+        """Obyčejný dict se všemi hodnotami (vlastní mají přednost před vrstvami)."""
+        result: Dict[str, Any] = {}
+        for layer in reversed(self.layers):
+            result.update(layer._values)
+        result.update(self)
+        return result
+
+    def __repr__(self) -> str:
+        return f"CreatureContext({dict.__repr__(self)}, layers={len(self.layers)})"
+
+
+def main() -> None:
+    import random
+    import time
+    from benchmark import _dragons
+    # při spuštění jako skript je tento modul __main__; Behaviour.step() ale
+    # pozná jen CreatureContext z modulu context
+    from context import ContextLayer, CreatureContext
+
+    rng = random.Random(1)
+    world = ContextLayer({"time_of_day": 12, "weather": 0, "enemy_behind": False})
+    dragons = _dragons(500)
+    contexts = [CreatureContext({"enemies_in_sight": 0, "health_ratio": 1.0, "stamina": 10}, [world])
+                for _ in dragons]
+    # pro srovnání: stejný stav jako obyčejné dicty, do kterých se kopíruje i svět
+    plain = _dragons(500)
+    plain_contexts = [ctx.flatten() for ctx in contexts]
+
+    incremental = full = 0.0
+    mismatches = 0
+    for t in range(100):
+        if t % 25 == 0:
+            world.set("time_of_day", (t // 25) * 6)
+        changes = []
+        for _ in contexts:
+            # většina tvorů se mezi koly nemění
+            change: Dict[str, Any] = {}
+            if rng.random() < 0.1:
+                change["enemies_in_sight"] = rng.randint(0, 2)
+                change["distance_to_nearest_enemy"] = rng.randint(1, 9)
+            if rng.random() < 0.05:
+                change["health_ratio"] = rng.choice([0.5, 1.0])
+            changes.append(change)
+
+        start = time.perf_counter()
+        for ctx, change, dragon in zip(contexts, changes, dragons):
+            ctx.update(change)
+            dragon.think(ctx)
+        incremental += time.perf_counter() - start
+        start = time.perf_counter()
+        for ctx, change, dragon in zip(plain_contexts, changes, plain):
+            ctx.update(world)
+            ctx.update(change)
+            dragon.think(ctx)
+        full += time.perf_counter() - start
+        mismatches += sum(a.behaviour.current != b.behaviour.current for a, b in zip(dragons, plain))
+    print(f"Incremental: {incremental:.3f} s, full: {full:.3f} s, mismatches: {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
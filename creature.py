@@ -1,12 +1,24 @@
-from data_structures import JSONObject, register_object
-from typing import Any, Optional, Dict, List
+from data_structures import Field, JSONObject, register_object
+from typing import Any, Optional, Dict, List, Tuple
 from abilityscore import AbilityScore
 from behaviour import Behaviour
 
 
 @register_object
 class Creature(JSONObject):
+    __slots__ = ("_object", "_flags", "name", "race", "ability_score", "inventory", "behaviour", "tags", "reactions")
+    _schema = (
+        Field("name"),
+        Field("race"),
+        Field("ability_score", AbilityScore),
+        Field("inventory"),
+        Field("behaviour", Behaviour),
+        Field("tags"),
+        Field("reactions"),
+    )
+
     def __init__(self, json_data: dict[str, Any] | None = None) -> None:
+        # ability_score a behaviour se dekódují podle schématu i bez "_object"
         super().__init__(json_data)
         self.complete([
             "name",
@@ -18,19 +30,13 @@ class Creature(JSONObject):
             "reactions"
         ])
 
-        if isinstance(self.behaviour, dict):
-            self.behaviour = Behaviour(self.behaviour)
-
-        if isinstance(self.ability_score, dict):
-            self.ability_score = AbilityScore(self.ability_score)
-
-    def think(self, context: Dict[str, Any]) -> List[str]:
+    def think(self, context: Dict[str, Any]) -> Tuple[str, ...]:
         """
         Simulace jednoho rozhodovacího kroku tvora.
-        Vrací seznam akcí, které chce tvor provést.
+        Vrací n-tici akcí, které chce tvor provést.
         """
         if not self.behaviour:
-            return []
+            return ()
 
         actions = self.behaviour.step(context)
         # Zde můžeš doplnit logiku "post-processing" – např. převod akce na konkrétní příkaz v enginu
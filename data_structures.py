@@ -1,48 +1,298 @@
 from __future__ import annotations
-from typing import Any, Type, Optional
+from typing import Any, Callable, ClassVar, Iterator, Type, Optional
 from abc import abstractmethod, ABC
+from contextlib import contextmanager
+from contextvars import ContextVar
 import logging
+from functools import lru_cache
 from PIL import Image
-from numpy import array
+import numpy as np
 
 
 OBJECT_REGISTRY: dict[str, Type["JSONObject"]] = {}
+_MISSING = object()
+# nastavuje lazy_decoding(); čte se jednou na vytvářený objekt
+_LAZY_DECODING: ContextVar[bool] = ContextVar("lazy_decoding", default=False)
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
 
 def register_object(cls: Type["JSONObject"]):
     OBJECT_REGISTRY[cls.__name__] = cls
+    if "_schema" in cls.__dict__ and cls._schema is not None:
+        cls._fast_init = _build_fast_init(cls)
     return cls
 
 
+class Field:
+    """
+    Jeden deklarovaný atribut schématu JSONObject.
+
+    `type` je podtřída JSONObject (nebo její registrované jméno, pokud ještě
+    není definovaná), na kterou se dekóduje vnořený dict i bez `_object`.
+    """
+    __slots__ = ("name", "type", "required")
+
+    def __init__(self, name: str, type: Type["JSONObject"] | str | None = None, required: bool = True) -> None:
+        self.name = name
+        self.type = type
+        self.required = required
+
+    def __repr__(self) -> str:
+        type_name = self.type if isinstance(self.type, str) or self.type is None else self.type.__name__
+        return f"Field({self.name!r}, type={type_name!r}, required={self.required})"
+
+
+def decode_value(value: Any) -> Any:
+    """Dekóduje vnořené dicty s `_object` (i v seznamech) na registrované objekty."""
+    if isinstance(value, dict):
+        object_type = value.get("_object")
+        if object_type and object_type in OBJECT_REGISTRY:
+            return OBJECT_REGISTRY[object_type](value)
+        elif object_type:
+            logging.warning(f"Skipping unknown object type: {object_type}")
+    elif isinstance(value, list):
+        return [
+            OBJECT_REGISTRY[v["_object"]](v)
+            if isinstance(v, dict) and "_object" in v and v["_object"] in OBJECT_REGISTRY
+            else v
+            for v in value
+        ]
+    return value
+
+
+def _decode_as(value: dict[str, Any], cls: Type["JSONObject"] | str) -> Any:
+    name = cls if isinstance(cls, str) else cls.__name__
+    object_type = value.get("_object")
+    if object_type is None or object_type == name:
+        return OBJECT_REGISTRY[name](value) if isinstance(cls, str) else cls(value)
+    return decode_value(value)
+
+
+@contextmanager
+def lazy_decoding(enabled: bool = True) -> Iterator[None]:
+    """
+    V tomto bloku konstruktor rodiče vnořené objekty nevytváří: ponechá
+    syrový dict (či seznam), který se dekóduje až při prvním přístupu
+    k atributu, a to_dict() nedotčené hodnoty vrátí beze změny.
+
+        with lazy_decoding():
+            creatures = [Creature(d) for d in records]
+        names = [c.name for c in creatures]  # žádné AbilityScore/Behaviour nevznikne
+    """
+    token = _LAZY_DECODING.set(enabled)
+    try:
+        yield
+    finally:
+        _LAZY_DECODING.reset(token)
+
+
+def _defer(obj: "JSONObject", name: str, value: Any, cls: Type["JSONObject"] | str | None) -> bool:
+    """Uloží `value` do `obj` nedekódovanou; False, pokud není co dekódovat."""
+    if cls is None and not (
+            type(value) is dict and "_object" in value
+            or type(value) is list and any(type(v) is dict for v in value)):
+        return False
+    try:
+        lazy = _LAZY_SLOT.__get__(obj)
+    except AttributeError:
+        lazy = {}
+        _LAZY_SLOT.__set__(obj, lazy)
+    lazy[name] = (value, cls)
+    return True
+
+
+def _missing_fields(obj: "JSONObject", missing: list[str]) -> None:
+    logging.error(f"Missing attributes {missing} in '{obj.__class__.__name__}'.")
+    raise AttributeError("Missing attribute")
+
+
+def _extra_fields(obj: "JSONObject", data: dict[str, Any], known: frozenset[str]) -> None:
+    extra = [k for k in data if k not in known]
+    logging.warning(f"Extra attributes {extra} in '{obj.__class__.__name__}'.")
+    for key in extra:
+        value = data[key]
+        try:
+            setattr(obj, key, decode_value(value) if type(value) is dict or type(value) is list else value)
+        except Exception as e:
+            logging.error(f"[Object creation error] key={key}, error={e}")
+
+
+def _build_fast_init(cls: Type["JSONObject"]) -> Callable[["JSONObject", dict[str, Any]], None]:
+    """
+    Vygeneruje konstruktor na míru `cls._schema`: jeden průchod deklarovanými
+    poli, bez ošetřování výjimek u každého klíče a s vnořenými objekty
+    dekódovanými rovnou na deklarovaný typ.
+    """
+    fields: tuple[Field, ...] = cls._schema
+    known = frozenset(["_object", "_flags", *(f.name for f in fields)])
+    namespace: dict[str, Any] = {
+        "MISSING": _MISSING, "decode_value": decode_value, "_decode_as": _decode_as,
+        "_missing_fields": _missing_fields, "_extra_fields": _extra_fields, "known": known,
+        "SET": object.__setattr__, "LAZY": _LAZY_DECODING, "DEFER": _defer,
+    }
+    # třídy s vlastním __setattr__ (Metadata) dostanou deklarovaná pole
+    # zapsaná přímo, mimo pythonovský hook
+    direct = cls.__setattr__ is not object.__setattr__
+
+    def assign(name: str) -> str:
+        return f"SET(self, {name!r}, v)" if direct else f"self.{name} = v"
+
+    lines = [
+        "def _fast_init(self, data):",
+        "    get = data.get",
+        "    lazy = LAZY.get()",
+        "    missing = None",
+        "    seen = 1 if '_object' in data else 0",
+        "    v = get('_flags', MISSING)",
+        "    if v is not MISSING:",
+        "        seen += 1",
+        f"        {assign('_flags')}",
+    ]
+    for n, f in enumerate(fields):
+        namespace[f"T{n}"] = f.type
+        lines += [
+            f"    v = get({f.name!r}, MISSING)",
+            "    if v is MISSING:",
+            f"        {'missing = (missing or []) + [' + repr(f.name) + ']' if f.required else 'pass'}",
+            "    else:",
+            "        seen += 1",
+        ]
+        if f.type is not None:
+            lines += [
+                "        if type(v) is dict:",
+                f"            if not (lazy and DEFER(self, {f.name!r}, v, T{n})):",
+                f"                v = _decode_as(v, T{n})",
+                f"                {assign(f.name)}",
+            ]
+        else:
+            lines += [
+                "        if type(v) is dict or type(v) is list:",
+                f"            if not (lazy and DEFER(self, {f.name!r}, v, None)):",
+                "                v = decode_value(v)",
+                f"                {assign(f.name)}",
+            ]
+        lines += [
+            "        else:",
+            f"            {assign(f.name)}",
+        ]
+    lines += [
+        "    if missing:",
+        "        _missing_fields(self, missing)",
+    ]
+    if cls._open_schema:
+        # volné objekty (Metadata): nedeklarované klíče jsou v pořádku
+        lines += [
+            "    if seen != len(data):",
+            "        for k, v in data.items():",
+            "            if k not in known:",
+            "                if type(v) is dict or type(v) is list: v = decode_value(v)",
+            "                setattr(self, k, v)",
+        ]
+    else:
+        lines += [
+            "    if seen != len(data):",
+            "        _extra_fields(self, data, known)",
+        ]
+    exec("\n".join(lines), namespace)
+    return namespace["_fast_init"]
+
+
 class JSONObject(ABC):
+    # podtřídy si mohou zvolit úsporné rozložení deklarací __slots__
+    # (včetně "_object" a "_flags"); bez nich mají __dict__.
+    # `_lazy` drží {jméno: (syrová hodnota, typ)} dosud nedekódovaných polí.
+    __slots__ = ("_lazy",)
+
+    # volitelné schéma třídy; registrované třídy, které ho deklarují, dostanou
+    # vygenerovaný konstruktor (viz _build_fast_init)
+    _schema: ClassVar[Optional[tuple[Field, ...]]] = None
+    _open_schema: ClassVar[bool] = False
+    _fast_init: ClassVar[Optional[Callable[["JSONObject", dict[str, Any]], None]]] = None
+    _slot_names: ClassVar[tuple[str, ...]] = ()
+    # atributy instance, které jsou jen běhové cache a neukládají se
+    _transient: ClassVar[frozenset[str]] = frozenset()
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        names: list[str] = []
+        for klass in reversed(cls.__mro__):
+            slots = klass.__dict__.get("__slots__", ())
+            for name in (slots,) if isinstance(slots, str) else slots:
+                if name not in ("__dict__", "__weakref__", "_lazy") and name not in names:
+                    names.append(name)
+        cls._slot_names = tuple(names)
+
+    def _deferred(self) -> dict[str, tuple[Any, Any]] | None:
+        try:
+            return _LAZY_SLOT.__get__(self)
+        except AttributeError:
+            return None
+
+    def __getattr__(self, name: str) -> Any:
+        # volá se jen pro nenastavené atributy: dekóduje odložené pole
+        lazy = self._deferred()
+        if not lazy or name not in lazy:
+            raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
+        value, cls = lazy[name]
+        token = _LAZY_DECODING.set(True)  # i jeho potomci zůstanou odložení
+        try:
+            value = _decode_as(value, cls) if cls is not None else decode_value(value)
+        finally:
+            _LAZY_DECODING.reset(token)
+        # syrová hodnota se zahodí až po úspěšném dekódování, takže neúspěšný
+        # přístup (nebo hasattr()) pole neztratí
+        del lazy[name]
+        object.__setattr__(self, name, value)
+        return value
+
+    def _items(self) -> Iterator[tuple[str, Any]]:
+        """
+        Nastavené atributy v pořadí deklarace (ve slotech i v __dict__).
+        Dosud odložená pole se vrací jako syrová hodnota.
+        """
+        lazy = self._deferred()
+        get = object.__getattribute__
+        for name in self._slot_names:
+            try:
+                yield name, get(self, name)
+            except AttributeError:
+                if lazy and name in lazy:
+                    yield name, lazy[name][0]
+        if hasattr(self, "__dict__"):
+            if self._transient:
+                for name, value in self.__dict__.items():
+                    if name not in self._transient:
+                        yield name, value
+            else:
+                yield from self.__dict__.items()
+            if lazy:
+                for name, (value, _) in lazy.items():
+                    if name not in self.__dict__:
+                        yield name, value
+
     def __init__(self, json_data: dict[str, Any] | None = None) -> None:
         self._object = self.__class__.__name__
         if not json_data:
             return
+        if self._fast_init is not None:
+            self._fast_init(json_data)
+            return
+        lazy = _LAZY_DECODING.get()
         for key, value in json_data.items():
+            if lazy and _defer(self, key, value, None):
+                continue
             try:
-                if isinstance(value, dict):
-                    object_type = value.get("_object")
-                    if object_type and object_type in OBJECT_REGISTRY:
-                        value = OBJECT_REGISTRY[object_type](value)
-                    elif object_type:
-                        logging.warning(f"Skipping unknown object type: {object_type}")
-                elif isinstance(value, list):
-                    value = [
-                        OBJECT_REGISTRY[v["_object"]](v)
-                        if isinstance(v, dict) and "_object" in v and v["_object"] in OBJECT_REGISTRY
-                        else v
-                        for v in value
-                    ]
-                setattr(self, key, value)
+                setattr(self, key, decode_value(value))
             except Exception as e:
                 logging.error(f"[Object creation error] key={key}, error={e}")
 
     def to_dict(self) -> dict[str, Any]:
-        """Rekurzivní převod zpět do dict (např. před uložením)."""
+        """
+        Rekurzivní převod zpět do dict (např. před uložením).
+        Dosud nedekódovaná pole (lazy_decoding) se vrátí tak, jak byla načtena.
+        """
         result = {}
-        for key, value in self.__dict__.items():
+        for key, value in self._items():
             if isinstance(value, JSONObject):
                 result[key] = value.to_dict()
             elif isinstance(value, list):
@@ -56,11 +306,33 @@ class JSONObject(ABC):
 
     def __repr__(self) -> str:
         cls = self.__class__.__name__
-        attrs = ', '.join(f"{k}={v!r}" for k, v in self.__dict__.items())
+        attrs = ', '.join(f"{k}={v!r}" for k, v in self._items())
         return f"{cls}({attrs})"
 
     def complete(self, required: list[str]) -> None:
-        existing = set(self.__dict__.keys()) - {"_object", "_flags"}
+        if self._fast_init is not None:
+            # nedeklarované klíče už ohlásilo schéma; deklarovaná pole se
+            # kontrolují zde, aniž by se odložená dekódovala
+            lazy = self._deferred() or {}
+            get = object.__getattribute__
+            present = []
+            for field in self._schema:
+                if field.name in lazy:
+                    present.append(field.name)
+                    continue
+                try:
+                    get(self, field.name)
+                except AttributeError:
+                    continue
+                present.append(field.name)
+            missing = [r for r in required if r not in present and not hasattr(self, r)]
+            if missing:
+                _missing_fields(self, missing)
+            extra = [name for name in present if name not in required]
+            if extra:
+                logging.warning(f"Extra attributes {extra} in '{self.__class__.__name__}'.")
+            return
+        existing = {k for k, _ in self._items()} - {"_object", "_flags"}
         missing = [r for r in required if r not in existing]
         extra = [k for k in existing if k not in required]
 
@@ -87,19 +359,56 @@ class JSONObject(ABC):
         return
 
 
+_LAZY_SLOT = JSONObject.__dict__["_lazy"]
+
+
 @register_object
 class Metadata(JSONObject):
+    # běžné klíče jsou ve slotech, ostatní v `_extra` vytvořeném až při potřebě,
+    # takže obyčejné Metadata {min, max} nemají žádný dict
+    __slots__ = ("_object", "_flags", "min", "max", "width", "height", "_extra")
+    _schema = tuple(Field(name, required=False) for name in ("min", "max", "width", "height"))
+    _open_schema = True
+
     def __init__(self, json_data: dict[str, Any] | None = None) -> None:
+        object.__setattr__(self, "_extra", None)
         super().__init__(json_data)
 
+    def __getattr__(self, attr: str) -> Any:
+        if attr != "_extra":
+            extra = self._extra
+            if extra is not None and attr in extra:
+                return extra[attr]
+        return super().__getattr__(attr)
+
+    def __setattr__(self, attr: str, val: Any) -> None:
+        try:
+            object.__setattr__(self, attr, val)
+        except AttributeError:
+            if self._extra is None:
+                object.__setattr__(self, "_extra", {})
+            self._extra[attr] = val
+
+    def __delattr__(self, attr: str) -> None:
+        try:
+            object.__delattr__(self, attr)
+        except AttributeError:
+            if not self._extra or attr not in self._extra:
+                raise
+            del self._extra[attr]
+
+    def _items(self) -> Iterator[tuple[str, Any]]:
+        for name, value in super()._items():
+            if name != "_extra":
+                yield name, value
+        if self._extra:
+            yield from self._extra.items()
+
     def validate(self) -> None:
         return
 
     def get(self, attr: str) -> Any | None:
-        try:
-            return self.__getattribute__(attr)
-        except AttributeError:
-            return None
+        return getattr(self, attr, None)
 
     def set(self, attr: str, val: Any) -> None:
         self.__setattr__(attr, val)
@@ -111,14 +420,30 @@ class Metadata(JSONObject):
             logging.warning(f"Tried to remove non-existent attribute '{attr}'")
 
 
+@lru_cache(maxsize=32)
+def charset_table(charset: str) -> np.ndarray:
+    """
+    Tabulka odstín šedi (0-255) -> kód znaku z `charset`; indexace polem
+    pixelů a dekódování jako UTF-32 dá rovnou řádky ASCII obrázku.
+    """
+    scale_factor = max(255 // max(len(charset) - 1, 1), 1)  # Scale factor for pixel values
+    indices = np.minimum(np.arange(256) // scale_factor, len(charset) - 1)
+    table = np.array([ord(c) for c in charset], dtype="<u4")[indices]
+    table.flags.writeable = False
+    return table
+
+
 @register_object
 class AsciiImage(JSONObject):
     data: str
     metadata: Metadata
+    _schema = (Field("data"), Field("metadata", Metadata))
+    _transient = frozenset({"_rendered"})
 
     def __init__(self, json_data: dict[str, Any] | None = None) -> None:
         super().__init__(json_data)
         self.__charset: str = " .:-=+*#%@"
+        self._rendered: tuple[str, int, int, str] | None = None
         if json_data:
             self.complete(["data", "metadata"])
             if not isinstance(self.metadata, Metadata):
@@ -129,6 +454,7 @@ class AsciiImage(JSONObject):
 
     def charset(self, new_charset: str | None = None) -> Optional[str]:
         if new_charset:
+            # vykreslený text na znakové sadě nezávisí, platí jen pro další převod
             self.__charset = new_charset
             return
         return self.__charset
@@ -150,8 +476,7 @@ class AsciiImage(JSONObject):
         except Exception as e:
             logging.error(f"{e}")
             return
-        height: int
-        width: int
+        width, height = img.width, img.height
         aspect_ratio = img.width / img.height
         if max_width is not None or max_height is not None:
             if max_height is not None and max_width is None:
@@ -165,17 +490,11 @@ class AsciiImage(JSONObject):
                 height = max_height
             img = img.resize((width, height), Image.LANCZOS)
         img = img.convert("L")
-        pixels = array(img)
-        ascii_image = []
-        scale_factor = 255 // (len(self.__charset) - 1)  # Scale factor for pixel values
-
-        for row in pixels:
-            ascii_image_row = ''.join(self.__charset[pixel // scale_factor] for pixel in row)
-            ascii_image.append(ascii_image_row)
+        pixels = np.asarray(img, dtype=np.uint8)
 
         self.metadata.set("width", width)
         self.metadata.set("height", height)
-        self.data = "".join(ascii_image)
+        self.data = charset_table(self.__charset)[pixels].tobytes().decode("utf-32-le")
 
     @property
     def width(self) -> int:
@@ -190,17 +509,33 @@ class AsciiImage(JSONObject):
         h = self.height
         if not isinstance(w, int) or not isinstance(h, int) or w <= 0 or h <= 0:
             return "<Invalid AsciiImage>"
-        return "\n".join([self.data[i * w : (i + 1) * w] for i in range(h)])
+        # vykreslený text platí, dokud se nezmění data (podle identity) nebo rozměry
+        cached = self._rendered
+        if cached is not None and cached[0] is self.data and cached[1] == w and cached[2] == h:
+            return cached[3]
+        text = "\n".join([self.data[i * w : (i + 1) * w] for i in range(h)])
+        self._rendered = (self.data, w, h, text)
+        return text
 
 
 @register_object
 class Race(JSONObject):
+    _schema = (Field("name"), Field("tags", required=False))
+
     def __init__(self, json_data: dict[str, Any] | None = None) -> None:
         super().__init__(json_data)
         if json_data:
-            self.complete(["name"])
+            attr_list = ["name"]
+            if "tags" in json_data:
+                attr_list.append("tags")  # volitelné
+            self.complete(attr_list)
+            self.validate()
             self.name: str
 
+    def validate(self) -> None:
+        if not isinstance(self.name, str) or not self.name:
+            raise ValueError("Race name must be a non-empty string.")
+
 
 @register_object
 class Creature(JSONObject):
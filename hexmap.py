@@ -1,42 +1,981 @@
+import heapq
+import math
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional
+import numpy as np
+
+
+# kódy terénů (uint8), index v seznamu = kód
+TERRAIN_TYPES: list[str] = ["plain", "forest", "hill", "mountain", "water", "swamp", "road", "wall"]
+TERRAIN_CODES: dict[str, int] = {name: code for code, name in enumerate(TERRAIN_TYPES)}
+
+# cena vstupu do buňky podle terénu, math.inf = neprůchodné
+MOVE_COSTS: dict[str, float] = {
+    "plain": 1, "forest": 2, "hill": 2, "mountain": 4,
+    "water": math.inf, "swamp": 3, "road": 1, "wall": math.inf,
+}
+# kolik sousedních nepřátel znamená "surrounded"
+SURROUNDED_THRESHOLD = 3
+# terén, přes který není vidět
+OPAQUE_TERRAIN: set[str] = {"mountain", "wall"}
+PATH_CACHE_SIZE = 4096
+# dohled occupanta bez atributu `sight`
+SIGHT_RADIUS = 6
+FOV_CACHE_SIZE = 4096
+# úrovně mlhy války
+UNEXPLORED, EXPLORED, VISIBLE = 0, 1, 2
+
+Coords = tuple[int, int]
+
+
+def terrain_code(name: str) -> int:
+    """Vrátí kód terénu; neznámý terén se zaregistruje."""
+    code = TERRAIN_CODES.get(name)
+    if code is None:
+        code = len(TERRAIN_TYPES)
+        if code > np.iinfo(np.uint8).max:
+            raise ValueError("Too many terrain types.")
+        TERRAIN_TYPES.append(name)
+        TERRAIN_CODES[name] = code
+    return code
+
+
 class Hex:
-    """Hexagonální buňka."""
+    """
+    Hexagonální buňka.
+
+    Buňka vrácená z HexMap je jen pohled do polí mapy - terén a occupant se
+    čtou i zapisují přímo v mapě.
+    """
     DIRECTIONS = [
         (1, 0), (1, -1), (0, -1),
         (-1, 0), (-1, 1), (0, 1)
     ]
+    __slots__ = ("q", "r", "_map", "_index", "_terrain", "_occupant")
 
-    def __init__(self, q: int, r: int, terrain: str = "plain"):
+    def __init__(self, q: int, r: int, terrain: str = "plain",
+                 hexmap: "HexMap | None" = None, index: int = -1):
         self.q = q  # column
         self.r = r  # row
-        self.terrain = terrain
-        self.occupant = None  # například Creature
+        self._map = hexmap
+        self._index = index
+        if hexmap is None:
+            self._terrain = terrain
+            self._occupant = None  # například Creature
+
+    @property
+    def terrain(self) -> str:
+        if self._map is None:
+            return self._terrain
+        return TERRAIN_TYPES[self._map.terrain[self._index]]
+
+    @terrain.setter
+    def terrain(self, value: str) -> None:
+        if self._map is None:
+            self._terrain = value
+        else:
+            self._map.set_terrain(self.q, self.r, value)
+
+    @property
+    def occupant(self) -> Any:
+        if self._map is None:
+            return self._occupant
+        return self._map.occupants[self._index]
+
+    @occupant.setter
+    def occupant(self, value: Any) -> None:
+        if self._map is None:
+            self._occupant = value
+        else:
+            self._map.set_occupant(self.q, self.r, value)
 
     def neighbors(self):
         return [(self.q + dq, self.r + dr) for dq, dr in Hex.DIRECTIONS]
 
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Hex):
+            return NotImplemented
+        return self.q == other.q and self.r == other.r and self._map is other._map
+
+    def __hash__(self) -> int:
+        return hash((self.q, self.r))
+
     def __repr__(self):
         return f"Hex(q={self.q}, r={self.r}, terrain={self.terrain})"
 
 
+def _readonly(*arrays: np.ndarray) -> tuple[np.ndarray, ...]:
+    for a in arrays:
+        a.setflags(write=False)
+    return arrays
+
+
+@lru_cache(maxsize=64)
+def range_offsets(radius: int) -> tuple[np.ndarray, np.ndarray]:
+    """Posuny (dq, dr) všech hexů do vzdálenosti `radius`, seřazené podle vzdálenosti."""
+    dq, dr = np.meshgrid(np.arange(-radius, radius + 1), np.arange(-radius, radius + 1), indexing="ij")
+    dq, dr = dq.ravel(), dr.ravel()
+    dist = (np.abs(dq) + np.abs(dr) + np.abs(dq + dr)) // 2
+    keep = np.flatnonzero(dist <= radius)
+    keep = keep[np.argsort(dist[keep], kind="stable")]
+    return _readonly(dq[keep].astype(np.int32), dr[keep].astype(np.int32))
+
+
+@lru_cache(maxsize=64)
+def ring_offsets(radius: int) -> tuple[np.ndarray, np.ndarray]:
+    """Posuny (dq, dr) hexů přesně ve vzdálenosti `radius`."""
+    dq, dr = range_offsets(radius)
+    start = 3 * radius * (radius - 1) + 1 if radius else 0
+    return _readonly(dq[start:].copy(), dr[start:].copy())
+
+
+@lru_cache(maxsize=4096)
+def line_offsets(dq: int, dr: int) -> tuple[np.ndarray, np.ndarray]:
+    """Posuny hexů na úsečce z (0, 0) do (dq, dr); úsečka je invariantní vůči posunu."""
+    n = (abs(dq) + abs(dr) + abs(dq + dr)) // 2
+    if n == 0:
+        return _readonly(np.zeros(1, np.int32), np.zeros(1, np.int32))
+    t = np.arange(n + 1) / n
+    # malý posun, aby se na hranách buněk zaokrouhlovalo konzistentně
+    x = dq * t + 1e-6
+    z = dr * t + 2e-6
+    y = -x - z
+    rx, ry, rz = np.round(x), np.round(y), np.round(z)
+    dx, dy, dz = np.abs(rx - x), np.abs(ry - y), np.abs(rz - z)
+    fix_x = (dx > dy) & (dx > dz)
+    fix_z = ~fix_x & (dz >= dy)
+    rx = np.where(fix_x, -ry - rz, rx)
+    rz = np.where(fix_z, -rx - ry, rz)
+    return _readonly(rx.astype(np.int32), rz.astype(np.int32))
+
+
+@lru_cache(maxsize=64)
+def sight_lines(radius: int) -> tuple[np.ndarray, ...]:
+    """
+    Posuny (dq, dr) hexů do vzdálenosti `radius` a mezilehlé buňky úseček
+    k nim: pole (k × radius-1) posunů a maska platných (kratší úsečky jsou
+    doplněné). Slouží k výpočtu výhledu jedním vektorovým dotazem.
+    """
+    dq, dr = range_offsets(radius)
+    width = max(radius - 1, 1)
+    line_dq = np.zeros((len(dq), width), np.int32)
+    line_dr = np.zeros((len(dq), width), np.int32)
+    valid = np.zeros((len(dq), width), bool)
+    for k, (q, r) in enumerate(zip(dq.tolist(), dr.tolist())):
+        lq, lr = line_offsets(q, r)
+        n = len(lq) - 2
+        if n > 0:
+            line_dq[k, :n] = lq[1:-1]
+            line_dr[k, :n] = lr[1:-1]
+            valid[k, :n] = True
+    return _readonly(dq, dr, line_dq, line_dr, valid)
+
+
+def hex_distances(q: int, r: int, qs: np.ndarray, rs: np.ndarray) -> np.ndarray:
+    """Vzdálenosti z (q, r) do mnoha hexů najednou."""
+    dq = np.asarray(qs) - q
+    dr = np.asarray(rs) - r
+    return (np.abs(dq) + np.abs(dr) + np.abs(dq + dr)) // 2
+
+
+def _coords(pos: "Hex | Coords") -> Coords:
+    if isinstance(pos, tuple):
+        return pos
+    return pos.q, pos.r
+
+
+class FlowField:
+    """
+    Mapa vzdáleností k jednomu cíli (Dijkstra od cíle). Všichni tvorové
+    mířící ke stejnému cíli sdílí jeden výpočet a jen čtou `next_step`.
+    """
+
+    def __init__(self, hexmap: "HexMap", target: int, dist: np.ndarray, cost: np.ndarray) -> None:
+        self.map = hexmap
+        self.target = target
+        self.dist = dist
+        self._cost = cost
+
+    def distance_from(self, pos: "Hex | Coords") -> float:
+        i = self.map.index(*_coords(pos))
+        return float(self.dist[i]) if i >= 0 else math.inf
+
+    def next_step(self, pos: "Hex | Coords") -> Optional[Coords]:
+        """Soused, kterým se z `pos` pokračuje k cíli (None = v cíli nebo nedosažitelné)."""
+        i = self.map.index(*_coords(pos))
+        if i < 0 or i == self.target or not math.isfinite(self.dist[i]):
+            return None
+        neighbors = self.map.neighbor_table[i]
+        neighbors = neighbors[neighbors >= 0]
+        total = self._cost[neighbors] + self.dist[neighbors]
+        best = int(neighbors[np.argmin(total)])
+        return int(self.map.q_of[best]), int(self.map.r_of[best])
+
+    def path_from(self, pos: "Hex | Coords") -> Optional[list[Coords]]:
+        start = _coords(pos)
+        if not math.isfinite(self.distance_from(start)):
+            return None
+        path = [start]
+        step = self.next_step(start)
+        while step is not None:
+            path.append(step)
+            step = self.next_step(step)
+        return path
+
+
+def default_faction(occupant: Any) -> Any:
+    """Frakce occupanta: atribut `faction`, jinak `tags["faction"]`."""
+    faction = getattr(occupant, "faction", None)
+    if faction is None:
+        tags = getattr(occupant, "tags", None)
+        if isinstance(tags, dict):
+            faction = tags.get("faction")
+    return faction
+
+
+def default_sight(occupant: Any) -> int:
+    """Dohled occupanta: atribut `sight`, jinak `tags["sight"]`, jinak SIGHT_RADIUS."""
+    sight = getattr(occupant, "sight", None)
+    if sight is None:
+        tags = getattr(occupant, "tags", None)
+        if isinstance(tags, dict):
+            sight = tags.get("sight")
+    return SIGHT_RADIUS if sight is None else int(sight)
+
+
+class _FactionPositions:
+    """Pozice členů jedné frakce v souvislých polích (odebrání prohozením s posledním)."""
+
+    def __init__(self) -> None:
+        self.q = np.zeros(16, np.int32)
+        self.r = np.zeros(16, np.int32)
+        self.members: list[Any] = []
+
+    def add(self, occupant: Any, q: int, r: int) -> int:
+        slot = len(self.members)
+        if slot == len(self.q):
+            self.q = np.resize(self.q, 2 * slot)
+            self.r = np.resize(self.r, 2 * slot)
+        self.q[slot] = q
+        self.r[slot] = r
+        self.members.append(occupant)
+        return slot
+
+    def remove(self, slot: int) -> Any:
+        """Odebere slot; vrátí occupanta, který se přesunul na jeho místo (nebo None)."""
+        last = len(self.members) - 1
+        moved = None
+        if slot != last:
+            moved = self.members[last]
+            self.members[slot] = moved
+            self.q[slot] = self.q[last]
+            self.r[slot] = self.r[last]
+        self.members.pop()
+        return moved
+
+
+class OccupancyIndex:
+    """
+    Index occupantů mapy podle frakcí. Udržuje ho HexMap při set_occupant;
+    po zápisu přímo do `HexMap.occupants` se obnoví celý (rebuild).
+    """
+
+    def __init__(self, faction_of: Callable[[Any], Any] = default_faction) -> None:
+        self.faction_of = faction_of
+        self.factions: dict[Any, _FactionPositions] = {}
+        self._where: dict[int, tuple[Any, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, occupant: Any) -> bool:
+        return id(occupant) in self._where
+
+    def position(self, occupant: Any) -> Optional[Coords]:
+        where = self._where.get(id(occupant))
+        if where is None:
+            return None
+        positions = self.factions[where[0]]
+        return int(positions.q[where[1]]), int(positions.r[where[1]])
+
+    def place(self, occupant: Any, q: int, r: int) -> None:
+        """Přidá occupanta, nebo ho přesune (O(1))."""
+        where = self._where.get(id(occupant))
+        if where is not None:
+            positions = self.factions[where[0]]
+            positions.q[where[1]] = q
+            positions.r[where[1]] = r
+            return
+        faction = self.faction_of(occupant)
+        positions = self.factions.setdefault(faction, _FactionPositions())
+        self._where[id(occupant)] = (faction, positions.add(occupant, q, r))
+
+    def remove(self, occupant: Any) -> None:
+        where = self._where.pop(id(occupant), None)
+        if where is None:
+            return
+        faction, slot = where
+        moved = self.factions[faction].remove(slot)
+        if moved is not None:
+            self._where[id(moved)] = (faction, slot)
+
+    def rebuild(self, hexmap: "HexMap") -> None:
+        """Hromadné obnovení z pole occupantů mapy (např. jednou za tick)."""
+        self.factions.clear()
+        self._where.clear()
+        for i in np.flatnonzero(np.not_equal(hexmap.occupants, None)).tolist():
+            self.place(hexmap.occupants[i], int(hexmap.q_of[i]), int(hexmap.r_of[i]))
+
+    def _candidates(self, q: int, r: int, factions: Optional[Iterable[Any]]):
+        keys = list(self.factions) if factions is None else [f for f in factions if f in self.factions]
+        for faction in keys:
+            positions = self.factions[faction]
+            n = len(positions.members)
+            if n:
+                yield positions, hex_distances(q, r, positions.q[:n], positions.r[:n])
+
+    def within(self, pos: Hex | Coords, radius: int, factions: Optional[Iterable[Any]] = None,
+               exclude: Any = None) -> list[tuple[Any, int]]:
+        """Occupanti do vzdálenosti `radius` jako [(occupant, vzdálenost)], od nejbližšího."""
+        q, r = _coords(pos)
+        found: list[tuple[Any, int]] = []
+        for positions, dist in self._candidates(q, r, factions):
+            for slot in np.flatnonzero(dist <= radius).tolist():
+                member = positions.members[slot]
+                if member is not exclude:
+                    found.append((member, int(dist[slot])))
+        found.sort(key=lambda item: item[1])
+        return found
+
+    def nearest(self, pos: Hex | Coords, k: int = 1, factions: Optional[Iterable[Any]] = None,
+                exclude: Any = None) -> list[tuple[Any, int]]:
+        """k nejbližších occupantů jako [(occupant, vzdálenost)]."""
+        q, r = _coords(pos)
+        found: list[tuple[Any, int]] = []
+        for positions, dist in self._candidates(q, r, factions):
+            take = min(k + 1, len(dist))
+            for slot in np.argpartition(dist, take - 1)[:take].tolist():
+                member = positions.members[slot]
+                if member is not exclude:
+                    found.append((member, int(dist[slot])))
+        found.sort(key=lambda item: item[1])
+        return found[:k]
+
+    def context(self, pos: Hex | Coords, faction: Any, radius: int = 5, exclude: Any = None) -> dict[str, Any]:
+        """
+        Hodnoty tagů `distance_to_nearest_enemy`, `enemies_nearby`,
+        `allies_nearby` a `surrounded`. Nepřítel je kdokoli s jinou frakcí
+        (occupanti bez frakce jsou neutrální).
+        """
+        enemies = [f for f in self.factions if f is not None and f != faction]
+        nearby = self.within(pos, radius, enemies + [faction], exclude)
+        enemy_dist = [d for occupant, d in nearby if self.faction_of(occupant) != faction]
+        nearest = enemy_dist[:1] or [d for _, d in self.nearest(pos, 1, enemies, exclude)]
+        context: dict[str, Any] = {
+            "enemies_nearby": len(enemy_dist),
+            "allies_nearby": len(nearby) - len(enemy_dist),
+            "surrounded": sum(d == 1 for d in enemy_dist) >= SURROUNDED_THRESHOLD,
+        }
+        # bez nepřátel klíč chybí, podmínky s ním se pak nesplní
+        if nearest:
+            context["distance_to_nearest_enemy"] = nearest[0]
+        return context
+
+
+class _Viewer:
+    __slots__ = ("occupant", "faction", "index", "radius", "fov")
+
+    def __init__(self, occupant: Any, faction: Any) -> None:
+        self.occupant = occupant
+        self.faction = faction
+        self.index = -1
+        self.radius = 0
+        self.fov: np.ndarray = np.zeros(0, np.int64)
+
+
+class VisibilityLayers:
+    """
+    Mlha války po frakcích. Každá frakce má pro každou buňku počet svých
+    occupantů, kteří ji vidí, a masku už prozkoumaných buněk; dotaz
+    "vidí frakce X buňku?" je jedno čtení z pole.
+
+    Udržuje ji HexMap při set_occupant: přesun occupanta se zapíše až při
+    dalším dotazu (víc kroků za kolo = jeden přepočet) a odečte se jen jeho
+    starý výhled a přičte nový. Výhledy se cachují podle (buňka, dosah).
+    Změna terénu (i zápisem přímo do pole a touch()) se pozná porovnáním
+    masky neprůhledných buněk a přepočítají se jen výhledy, do jejichž
+    dosahu změna padla.
+    """
+
+    def __init__(self, hexmap: "HexMap", faction_of: Callable[[Any], Any] = default_faction,
+                 sight_of: Callable[[Any], int] = default_sight, cache_size: int = FOV_CACHE_SIZE) -> None:
+        self.map = hexmap
+        self.faction_of = faction_of
+        self.sight_of = sight_of
+        self.cache_size = cache_size
+        self._seen: dict[Any, np.ndarray] = {}
+        self._explored: dict[Any, np.ndarray] = {}
+        self._last_seen: dict[Any, dict[int, tuple[Any, Coords]]] = {}
+        self._viewers: dict[int, _Viewer] = {}
+        self._pending: dict[int, tuple[Any, int]] = {}  # id -> (occupant, nový index, -1 = odebrat)
+        self._enemies: dict[Any, list[tuple[Any, Coords]]] = {}  # seen_enemies do další změny
+        self._fov: dict[tuple[int, int], np.ndarray] = {}
+        self._opaque = hexmap.opaque
+        self._terrain_version = hexmap.terrain_version
+        self._occupancy_version = -1  # vynutí rebuild při prvním dotazu
+
+    def __len__(self) -> int:
+        self._sync()
+        return len(self._viewers)
+
+    @property
+    def factions(self) -> list[Any]:
+        self._sync()
+        return list(self._seen)
+
+    def occupant_changed(self, index: int, previous: Any, occupant: Any) -> None:
+        """Volá HexMap.set_occupant po zápisu (verze obsazení už je zvýšená)."""
+        version = self.map.occupancy_version
+        if self._occupancy_version != version - 1:
+            return  # mezitím zápis mimo set_occupant - při dotazu se obnoví celé
+        if previous is not None and previous is not occupant and self._index_of(previous) == index:
+            self._pending[id(previous)] = (previous, -1)
+        if occupant is not None:
+            self._pending[id(occupant)] = (occupant, index)
+        self._occupancy_version = version
+
+    def _index_of(self, occupant: Any) -> int:
+        pending = self._pending.get(id(occupant))
+        if pending is not None:
+            return pending[1]
+        viewer = self._viewers.get(id(occupant))
+        return viewer.index if viewer is not None else -1
+
+    def rebuild(self) -> None:
+        """Srovná pozorovatele s polem occupantů mapy; přepočítají se jen ti, kdo se pohnuli."""
+        hexmap = self.map
+        self._pending.clear()
+        present = set()
+        for i in np.flatnonzero(np.not_equal(hexmap.occupants, None)).tolist():
+            occupant = hexmap.occupants[i]
+            present.add(id(occupant))
+            self._pending[id(occupant)] = (occupant, i)
+        for key, viewer in self._viewers.items():
+            if key not in present:
+                self._pending[key] = (viewer.occupant, -1)
+        self._occupancy_version = hexmap.occupancy_version
+
+    def field_of_view(self, index: int, radius: int) -> np.ndarray:
+        """Výhled z buňky `index` (indexy buněk, jen pro čtení), z cache."""
+        key = (index, radius)
+        fov = self._fov.get(key)
+        if fov is None:
+            if len(self._fov) >= self.cache_size:
+                del self._fov[next(iter(self._fov))]
+            fov = self._fov[key] = _readonly(
+                self.map.field_of_view((int(self.map.q_of[index]), int(self.map.r_of[index])), radius))[0]
+        return fov
+
+    def _layer(self, faction: Any) -> np.ndarray:
+        seen = self._seen.get(faction)
+        if seen is None:
+            seen = self._seen[faction] = np.zeros(self.map.size, np.uint16)
+            self._explored[faction] = np.zeros(self.map.size, bool)
+        return seen
+
+    def _sync(self) -> None:
+        hexmap = self.map
+        if hexmap.occupancy_version != self._occupancy_version:
+            self.rebuild()
+        if hexmap.terrain_version != self._terrain_version:
+            self._refresh_terrain()
+            self._enemies.clear()
+        if self._pending:
+            self._apply(self._pending)
+            self._pending = {}
+            self._enemies.clear()
+
+    def _apply(self, pending: dict[int, tuple[Any, int]]) -> None:
+        for key, (occupant, index) in pending.items():
+            viewer = self._viewers.get(key)
+            radius = self.sight_of(occupant) if index >= 0 else 0
+            if viewer is not None:
+                if viewer.index == index and viewer.radius == radius:
+                    continue
+                self._seen[viewer.faction][viewer.fov] -= 1
+                if index < 0:
+                    del self._viewers[key]
+                    continue
+            elif index < 0:
+                continue
+            else:
+                viewer = self._viewers[key] = _Viewer(occupant, self.faction_of(occupant))
+            viewer.index, viewer.radius = index, radius
+            viewer.fov = self.field_of_view(index, radius)
+            self._layer(viewer.faction)[viewer.fov] += 1
+            self._explored[viewer.faction][viewer.fov] = True
+
+    def _refresh_terrain(self) -> None:
+        hexmap = self.map
+        opaque = hexmap.opaque
+        changed = np.flatnonzero(opaque != self._opaque)
+        self._opaque = opaque
+        self._terrain_version = hexmap.terrain_version
+        if not changed.size:
+            return
+        keys = list(self._fov.keys() | {(v.index, v.radius) for v in self._viewers.values()})
+        if not keys:
+            return
+        centers = np.array([k[0] for k in keys])
+        radii = np.array([k[1] for k in keys])
+        # úsečky vedou přes buňky ve vzdálenosti 1 .. dosah-1 od středu
+        dist = hex_distances(hexmap.q_of[centers][:, None], hexmap.r_of[centers][:, None],
+                             hexmap.q_of[changed][None, :], hexmap.r_of[changed][None, :])
+        hit = ((dist > 0) & (dist < radii[:, None])).any(axis=1)
+        stale = {keys[k] for k in np.flatnonzero(hit).tolist()}
+        for key in stale:
+            self._fov.pop(key, None)
+        # přepočet stejnou cestou jako přesun: odečíst starý výhled, přičíst nový
+        refresh = {}
+        for key, viewer in self._viewers.items():
+            if (viewer.index, viewer.radius) in stale:
+                refresh[key] = (viewer.occupant, viewer.index)
+                viewer.index = -1
+        self._apply(refresh)
+
+    def visible(self, faction: Any, pos: Hex | Coords) -> bool:
+        """Vidí frakce buňku právě teď?"""
+        self._sync()
+        i = self.map.index(*_coords(pos))
+        seen = self._seen.get(faction)
+        return i >= 0 and seen is not None and bool(seen[i])
+
+    def explored(self, faction: Any, pos: Hex | Coords) -> bool:
+        """Viděla frakce buňku někdy?"""
+        self._sync()
+        i = self.map.index(*_coords(pos))
+        explored = self._explored.get(faction)
+        return i >= 0 and explored is not None and bool(explored[i])
+
+    def level(self, faction: Any, pos: Hex | Coords) -> int:
+        """UNEXPLORED, EXPLORED nebo VISIBLE."""
+        if self.visible(faction, pos):
+            return VISIBLE
+        return EXPLORED if self.explored(faction, pos) else UNEXPLORED
+
+    def mask(self, faction: Any) -> np.ndarray:
+        """Maska buněk, které frakce právě vidí."""
+        self._sync()
+        seen = self._seen.get(faction)
+        return seen > 0 if seen is not None else np.zeros(self.map.size, bool)
+
+    def levels(self, faction: Any) -> np.ndarray:
+        """Úrovně mlhy (uint8) pro všechny buňky."""
+        self._sync()
+        if faction not in self._seen:
+            return np.zeros(self.map.size, np.uint8)
+        return self._explored[faction].astype(np.uint8) + (self._seen[faction] > 0)
+
+    def in_cover(self, faction: Any, pos: Hex | Coords) -> bool:
+        """Nevidí buňku žádná jiná frakce (occupanti bez frakce se nepočítají)?"""
+        self._sync()
+        i = self.map.index(*_coords(pos))
+        return i >= 0 and not any(seen[i] for f, seen in self._seen.items() if f is not None and f != faction)
+
+    def seen_enemies(self, faction: Any) -> list[tuple[Any, Coords]]:
+        """Occupanti jiných frakcí na buňkách, které frakce vidí, jako [(occupant, (q, r))]."""
+        self._sync()
+        found = self._enemies.get(faction)
+        if found is None:
+            seen = self._seen.get(faction)
+            found = self._enemies[faction] = [] if seen is None else [
+                (v.occupant, (int(self.map.q_of[v.index]), int(self.map.r_of[v.index])))
+                for v in self._viewers.values()
+                if v.faction is not None and v.faction != faction and seen[v.index]
+            ]
+        return list(found)
+
+    def context(self, pos: Hex | Coords, faction: Any) -> dict[str, Any]:
+        """
+        Hodnoty tagů `enemies_in_sight`, `enemy_last_seen_pos` a `is_in_cover`
+        (výhled je sdílený celou frakcí). Poslední známá pozice se pamatuje
+        i pro nepřátele, kteří se mezitím ztratili z dohledu.
+        """
+        seen = self.seen_enemies(faction)
+        memory = self._last_seen.setdefault(faction, {})
+        for occupant, at in seen:
+            memory[id(occupant)] = (occupant, at)
+        q, r = _coords(pos)
+        context: dict[str, Any] = {
+            "enemies_in_sight": len(seen),
+            "is_in_cover": self.in_cover(faction, (q, r)),
+        }
+        candidates = [at for _, at in seen] or [at for _, at in memory.values()]
+        # bez nepřítele v paměti klíč chybí, podmínky s ním se pak nesplní
+        if candidates:
+            context["enemy_last_seen_pos"] = min(
+                candidates, key=lambda at: (abs(at[0] - q) + abs(at[1] - r) + abs(at[0] + at[1] - q - r)) // 2)
+        return context
+
+    def forget(self, occupant: Any) -> None:
+        """Smaže occupanta z paměti posledních známých pozic (např. po smrti)."""
+        for memory in self._last_seen.values():
+            memory.pop(id(occupant), None)
+
+
+class _HexView(Mapping):
+    """Zpětně kompatibilní `HexMap.hexes`: (q, r) -> Hex, buňky vznikají až při přístupu."""
+
+    def __init__(self, hexmap: "HexMap") -> None:
+        self._map = hexmap
+
+    def __getitem__(self, key: tuple[int, int]) -> Hex:
+        hex_ = self._map.get(*key)
+        if hex_ is None:
+            raise KeyError(key)
+        return hex_
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, tuple) and len(key) == 2 and self._map.index(*key) >= 0
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        return zip(self._map.q_of.tolist(), self._map.r_of.tolist())
+
+    def __len__(self) -> int:
+        return self._map.size
+
+
 class HexMap:
+    """
+    Hex mapa uložená v polích: terén jako uint8 kódy, occupanti v paralelním
+    poli objektů. Axiální souřadnice (q, r) se mapují na index řádek po
+    řádku: index = row_start[q] + (r - r_min[q]).
+    """
+
     def __init__(self, radius: int):
         """Vytvoří hex mapu s daným poloměrem (hexy kolem centra)."""
-        self.hexes: dict[tuple[int,int], Hex] = {}
-        for q in range(-radius, radius + 1):
-            r1 = max(-radius, -q - radius)
-            r2 = min(radius, -q + radius)
-            for r in range(r1, r2 + 1):
-                self.hexes[(q, r)] = Hex(q, r)
+        self.radius = radius
+        q = np.arange(-radius, radius + 1)
+        r_min = np.maximum(-radius, -q - radius)
+        r_max = np.minimum(radius, -q + radius)
+        lengths = r_max - r_min + 1
+        row_start = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        self.size = int(lengths.sum())
+        self._r_min: list[int] = r_min.tolist()
+        self._row_start: list[int] = row_start.tolist()
+        self._r_min_arr = r_min
+        self._row_start_arr = row_start
+        self.q_of = np.repeat(q, lengths).astype(np.int32)
+        self.r_of = (np.arange(self.size) - np.repeat(row_start, lengths)
+                     + np.repeat(r_min, lengths)).astype(np.int32)
+        self.terrain = np.zeros(self.size, np.uint8)
+        self.occupants = np.full(self.size, None, dtype=object)
+        # verze pro invalidaci cache cest; zápis přímo do polí volá touch()
+        self.terrain_version = 0
+        self.occupancy_version = 0
+        self._neighbor_table: np.ndarray | None = None
+        self._path_cache: dict[tuple, Any] = {}
+        self._path_cache_versions = (0, 0)
+        self._occupancy: OccupancyIndex | None = None
+        self._occupancy_stale = False
+        self._visibility: VisibilityLayers | None = None
+
+    @property
+    def neighbor_table(self) -> np.ndarray:
+        """Indexy šesti sousedů každé buňky (size × 6, -1 mimo mapu)."""
+        if self._neighbor_table is None:
+            dq = np.array([d[0] for d in Hex.DIRECTIONS])
+            dr = np.array([d[1] for d in Hex.DIRECTIONS])
+            self._neighbor_table = self.indices(self.q_of[:, None] + dq, self.r_of[:, None] + dr).astype(np.int32)
+        return self._neighbor_table
+
+    def touch(self, terrain: bool = True, occupancy: bool = True) -> None:
+        """Ohlásí změnu provedenou přímo v polích `terrain` / `occupants`."""
+        if terrain:
+            self.terrain_version += 1
+        if occupancy:
+            self.occupancy_version += 1
+            self._occupancy_stale = True
+
+    @property
+    def occupancy(self) -> OccupancyIndex:
+        """Index occupantů podle frakcí (vytvoří se při prvním použití)."""
+        if self._occupancy is None:
+            self._occupancy = OccupancyIndex()
+            self._occupancy_stale = True
+        if self._occupancy_stale:
+            self._occupancy.rebuild(self)
+            self._occupancy_stale = False
+        return self._occupancy
+
+    @property
+    def visibility(self) -> VisibilityLayers:
+        """Mlha války po frakcích (vytvoří se při prvním použití)."""
+        if self._visibility is None:
+            self._visibility = VisibilityLayers(self)
+        return self._visibility
+
+    @property
+    def hexes(self) -> Mapping[tuple[int, int], Hex]:
+        return _HexView(self)
+
+    def contains(self, q: int, r: int) -> bool:
+        return max(abs(q), abs(r), abs(q + r)) <= self.radius
+
+    def index(self, q: int, r: int) -> int:
+        """Index buňky v polích mapy, -1 pokud leží mimo mapu."""
+        if max(abs(q), abs(r), abs(q + r)) > self.radius:
+            return -1
+        i = q + self.radius
+        return self._row_start[i] + r - self._r_min[i]
+
+    def indices(self, q: np.ndarray, r: np.ndarray) -> np.ndarray:
+        """Vektorová verze `index` (-1 pro souřadnice mimo mapu)."""
+        q = np.asarray(q)
+        r = np.asarray(r)
+        inside = np.maximum(np.maximum(np.abs(q), np.abs(r)), np.abs(q + r)) <= self.radius
+        i = np.clip(q + self.radius, 0, 2 * self.radius)
+        return np.where(inside, self._row_start_arr[i] + r - self._r_min_arr[i], -1)
+
+    def hex_at(self, index: int) -> Hex:
+        return Hex(int(self.q_of[index]), int(self.r_of[index]), hexmap=self, index=index)
 
     def get(self, q: int, r: int) -> Hex | None:
-        return self.hexes.get((q, r))
+        i = self.index(q, r)
+        if i < 0:
+            return None
+        return Hex(q, r, hexmap=self, index=i)
+
+    def terrain_at(self, q: int, r: int) -> str | None:
+        i = self.index(q, r)
+        return TERRAIN_TYPES[self.terrain[i]] if i >= 0 else None
+
+    def set_terrain(self, q: int, r: int, terrain: str) -> None:
+        i = self.index(q, r)
+        if i < 0:
+            raise KeyError((q, r))
+        self.terrain[i] = terrain_code(terrain)
+        self.terrain_version += 1
+
+    def occupant_at(self, q: int, r: int) -> Any:
+        i = self.index(q, r)
+        return self.occupants[i] if i >= 0 else None
+
+    def set_occupant(self, q: int, r: int, occupant: Any) -> None:
+        i = self.index(q, r)
+        if i < 0:
+            raise KeyError((q, r))
+        previous = self.occupants[i]
+        self.occupants[i] = occupant
+        self.occupancy_version += 1
+        if self._occupancy is not None and not self._occupancy_stale:
+            if previous is not None and previous is not occupant \
+                    and self._occupancy.position(previous) == (q, r):
+                self._occupancy.remove(previous)
+            if occupant is not None:
+                self._occupancy.place(occupant, q, r)
+        if self._visibility is not None:
+            self._visibility.occupant_changed(i, previous, occupant)
+
+    def move_occupant(self, occupant: Any, q: int, r: int) -> None:
+        """Přesune occupanta na (q, r) a uvolní jeho předchozí buňku."""
+        old = self.occupancy.position(occupant)
+        if old is not None and self.occupant_at(*old) is occupant:
+            self.occupants[self.index(*old)] = None
+        self.set_occupant(q, r, occupant)
 
     def distance(self, a: Hex, b: Hex) -> int:
         """Vzdálenost mezi dvěma hexy (axial coords)."""
         return (abs(a.q - b.q) + abs(a.q + a.r - b.q - b.r) + abs(a.r - b.r)) // 2
 
     def neighbors(self, hex_: Hex):
-        return [self.hexes.get(n) for n in hex_.neighbors() if n in self.hexes]
+        result = []
+        for q, r in hex_.neighbors():
+            i = self.index(q, r)
+            if i >= 0:
+                result.append(Hex(q, r, hexmap=self, index=i))
+        return result
+
+    def coords(self, indices: np.ndarray) -> np.ndarray:
+        """Axiální souřadnice buněk jako pole (k, 2)."""
+        return np.stack((self.q_of[indices], self.r_of[indices]), axis=-1)
+
+    def _offset_indices(self, center: Hex | Coords, offsets: tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+        q, r = _coords(center)
+        idx = self.indices(q + offsets[0], r + offsets[1])
+        return idx[idx >= 0]
+
+    def hexes_in_range(self, center: Hex | Coords, radius: int) -> np.ndarray:
+        """Indexy buněk do vzdálenosti `radius` od středu (od nejbližších)."""
+        return self._offset_indices(center, range_offsets(radius))
+
+    def ring(self, center: Hex | Coords, radius: int) -> np.ndarray:
+        """Indexy buněk přesně ve vzdálenosti `radius`."""
+        return self._offset_indices(center, ring_offsets(radius))
+
+    def line(self, a: Hex | Coords, b: Hex | Coords) -> np.ndarray:
+        """Indexy buněk na úsečce z `a` do `b` (včetně obou konců)."""
+        (qa, ra), (qb, rb) = _coords(a), _coords(b)
+        return self._offset_indices((qa, ra), line_offsets(qb - qa, rb - ra))
+
+    @staticmethod
+    def _opaque_table() -> np.ndarray:
+        return np.array([name in OPAQUE_TERRAIN for name in TERRAIN_TYPES])
+
+    @property
+    def opaque(self) -> np.ndarray:
+        """Maska buněk, přes které není vidět."""
+        return self._opaque_table()[self.terrain]
+
+    def line_of_sight(self, a: Hex | Coords, b: Hex | Coords) -> bool:
+        """Je z `a` vidět na `b`? Koncové buňky výhled neblokují."""
+        (qa, ra), (qb, rb) = _coords(a), _coords(b)
+        dq, dr = line_offsets(qb - qa, rb - ra)
+        idx = self.indices(qa + dq[1:-1], ra + dr[1:-1])
+        if (idx < 0).any():
+            return False
+        return not self._opaque_table()[self.terrain[idx]].any()
+
+    def field_of_view(self, center: Hex | Coords, radius: int) -> np.ndarray:
+        """Indexy buněk do vzdálenosti `radius`, na které je ze `center` vidět (jako line_of_sight)."""
+        q, r = _coords(center)
+        if self.index(q, r) < 0:
+            return np.zeros(0, np.int64)
+        dq, dr, line_dq, line_dr, valid = sight_lines(radius)
+        target = self.indices(q + dq, r + dr)
+        between = self.indices(q + line_dq, r + line_dr)
+        blocked = ((between < 0) | self._opaque_table()[self.terrain[between]]) & valid
+        return target[(target >= 0) & ~blocked.any(axis=1)]
+
+    def distances(self, a: Hex | Coords, many: Any) -> np.ndarray:
+        """
+        Vzdálenosti z `a` do mnoha hexů: pole souřadnic (k, 2), pole indexů
+        buněk (1D int) nebo seznam Hex.
+        """
+        q, r = _coords(a)
+        if isinstance(many, np.ndarray) and many.ndim == 1:
+            return hex_distances(q, r, self.q_of[many], self.r_of[many])
+        if not isinstance(many, np.ndarray):
+            many = np.array([_coords(h) for h in many], np.int64).reshape(-1, 2)
+        return hex_distances(q, r, many[:, 0], many[:, 1])
+
+    def move_costs(self, costs: dict[str, float] | None = None, ignore_occupants: bool = False,
+                   allow: int = -1) -> np.ndarray:
+        """
+        Cena vstupu do každé buňky. Obsazené buňky jsou neprůchodné, kromě
+        buňky s indexem `allow` (cíl, na kterém stojí nepřítel).
+        """
+        costs = MOVE_COSTS if costs is None else costs
+        table = np.array([costs.get(name, MOVE_COSTS.get(name, 1)) for name in TERRAIN_TYPES], np.float64)
+        cost = table[self.terrain]
+        if not ignore_occupants:
+            blocked = np.flatnonzero(np.not_equal(self.occupants, None))
+            cost[blocked[blocked != allow]] = math.inf
+        return cost
+
+    def _cached(self, key: tuple, compute) -> Any:
+        versions = (self.terrain_version, self.occupancy_version)
+        if versions != self._path_cache_versions:
+            if versions[0] != self._path_cache_versions[0]:
+                self._path_cache.clear()
+            else:
+                # změna obsazení se netýká dotazů, které occupanty ignorují
+                self._path_cache = {k: v for k, v in self._path_cache.items() if k[-1]}
+            self._path_cache_versions = versions
+        if key in self._path_cache:
+            return self._path_cache[key]
+        if len(self._path_cache) >= PATH_CACHE_SIZE:
+            del self._path_cache[next(iter(self._path_cache))]
+        result = self._path_cache[key] = compute()
+        return result
+
+    def find_path(self, start: Hex | Coords, goal: Hex | Coords,
+                  costs: dict[str, float] | None = None, ignore_occupants: bool = False) -> Optional[list[Coords]]:
+        """
+        A* cesta ze `start` do `goal` (včetně obou konců), None když cesta není.
+        Heuristikou je `distance` násobená nejmenší cenou kroku. Cíl smí být
+        obsazený (např. nepřítel), ostatní obsazené buňky blokují.
+        """
+        s = self.index(*_coords(start))
+        g = self.index(*_coords(goal))
+        if s < 0 or g < 0:
+            return None
+        key = ("path", s, g, None if costs is None else tuple(sorted(costs.items())), ignore_occupants)
+        path = self._cached(key, lambda: self._astar(s, g, self.move_costs(costs, ignore_occupants, g)))
+        return None if path is None else list(path)
+
+    def _astar(self, start: int, goal: int, cost: np.ndarray) -> Optional[tuple[Coords, ...]]:
+        finite = cost[np.isfinite(cost)]
+        scale = float(finite.min()) if finite.size else 1.0
+        table = self.neighbor_table
+        q_of, r_of = self.q_of, self.r_of
+        gq, gr = int(q_of[goal]), int(r_of[goal])
+
+        def h(i: int) -> float:
+            q, r = int(q_of[i]), int(r_of[i])
+            return scale * ((abs(q - gq) + abs(q + r - gq - gr) + abs(r - gr)) // 2)
+
+        best = {start: 0.0}
+        came_from: dict[int, int] = {}
+        open_heap = [(h(start), 0.0, start)]
+        while open_heap:
+            _, g_cost, current = heapq.heappop(open_heap)
+            if current == goal:
+                path = [goal]
+                while path[-1] != start:
+                    path.append(came_from[path[-1]])
+                return tuple((int(q_of[i]), int(r_of[i])) for i in reversed(path))
+            if g_cost > best[current]:
+                continue
+            for n in table[current].tolist():
+                if n < 0:
+                    continue
+                new_cost = g_cost + cost[n]
+                if new_cost < best.get(n, math.inf):
+                    best[n] = new_cost
+                    came_from[n] = current
+                    heapq.heappush(open_heap, (new_cost + h(n), new_cost, n))
+        return None
+
+    def distance_field(self, target: Hex | Coords, costs: dict[str, float] | None = None,
+                       ignore_occupants: bool = False) -> Optional[FlowField]:
+        """Flow field k cíli - sdílený výpočet pro všechny tvory se stejným cílem."""
+        t = self.index(*_coords(target))
+        if t < 0:
+            return None
+        key = ("field", t, None if costs is None else tuple(sorted(costs.items())), ignore_occupants)
+        return self._cached(key, lambda: self._dijkstra(t, self.move_costs(costs, ignore_occupants, t)))
+
+    def _dijkstra(self, target: int, cost: np.ndarray) -> FlowField:
+        dist = np.full(self.size, math.inf)
+        dist[target] = 0.0
+        table = self.neighbor_table
+        heap = [(0.0, target)]
+        while heap:
+            d, v = heapq.heappop(heap)
+            if d > dist[v]:
+                continue
+            # krok u -> v stojí cenu vstupu do v
+            step = d + cost[v]
+            if math.isinf(step):
+                continue
+            for u in table[v].tolist():
+                if u >= 0 and step < dist[u]:
+                    dist[u] = step
+                    heapq.heappush(heap, (step, u))
+        return FlowField(self, target, dist, cost)
+
+    def path_context(self, start: Hex | Coords, target: Hex | Coords,
+                     costs: dict[str, float] | None = None) -> dict[str, Any]:
+        """Hodnoty tagů `target_pos`, `target_reached` a `path_blocked` pro kontext tvora."""
+        start, target = _coords(start), _coords(target)
+        d = self.distance(Hex(*start), Hex(*target))
+        reached = d == 0 or (d == 1 and self.occupant_at(*target) is not None)
+        return {
+            "target_pos": target,
+            "target_reached": reached,
+            "path_blocked": not reached and self.find_path(start, target, costs) is None,
+        }
 
 
 def main() -> None:
@@ -51,6 +990,84 @@ def main() -> None:
     h2 = m.get(5, -2)
     print("Distance:", m.distance(h1, h2))
 
+    # cesta kolem zdi
+    for r in range(-3, 4):
+        m.set_terrain(1, r, "wall")
+    print("Path:", m.find_path(h1, h2))
+    print("Path context:", m.path_context(h1, h2))
+    print("In range 2:", m.coords(m.hexes_in_range(center, 2)).tolist())
+    print("Line:", m.coords(m.line(h1, h2)).tolist())
+    print("Line of sight:", m.line_of_sight(h1, h2), m.line_of_sight(h1, (-2, 5)))
+    print("Distances:", m.distances(center, [h1, h2, (3, 3)]))
+
+    # occupanti a kontext z indexu
+    class Unit:
+        def __init__(self, name: str, faction: str) -> None:
+            self.name = name
+            self.faction = faction
+
+        def __repr__(self) -> str:
+            return self.name
+
+    dragon = Unit("dragon", "monsters")
+    m.set_occupant(0, 0, dragon)
+    for i, (q, r) in enumerate([(1, 0), (0, 1), (-1, 1), (4, 0)]):
+        m.set_occupant(q, r, Unit(f"knight{i}", "humans"))
+    print("Nearest to dragon:", m.occupancy.nearest((0, 0), 2, exclude=dragon))
+    print("Dragon context:", m.occupancy.context((0, 0), "monsters", exclude=dragon))
+    m.move_occupant(dragon, -3, 0)
+    print("After move:", m.occupancy.context((-3, 0), "monsters", exclude=dragon))
+
+    # mlha války
+    print("Knights see (-3, 0):", m.visibility.visible("humans", (-3, 0)),
+          "level of (9, -9):", m.visibility.level("humans", (9, -9)))
+    print("Dragon fog context:", m.visibility.context((-3, 0), "monsters"))
+
+    # velká bitva: přepočet výhledu všech tvorů každé kolo vs. inkrementální vrstvy
+    import random
+    import time
+    rng = random.Random(7)
+    big = HexMap(radius=60)
+    cells = list(big.hexes)
+    for q, r in rng.sample(cells, len(cells) // 10):
+        big.set_terrain(q, r, rng.choice(["wall", "mountain"]))
+    free = [c for c in cells if big.terrain_at(*c) == "plain"]
+    units = [Unit(f"u{i}", rng.choice(["humans", "monsters"])) for i in range(2000)]
+    for unit, (q, r) in zip(units, rng.sample(free, len(units))):
+        big.set_occupant(q, r, unit)
+    moves = []
+    for _ in range(20):
+        tick = []
+        for unit in rng.sample(units, len(units) // 10):
+            dq, dr = rng.choice(Hex.DIRECTIONS)
+            tick.append((unit, dq, dr))
+        moves.append(tick)
+
+    def run(recompute: bool) -> float:
+        start = time.perf_counter()
+        for tick in moves:
+            for unit, dq, dr in tick:
+                q, r = big.occupancy.position(unit)
+                if big.terrain_at(q + dq, r + dr) == "plain" and big.occupant_at(q + dq, r + dr) is None:
+                    big.move_occupant(unit, q + dq, r + dr)
+            if recompute:
+                masks = {f: np.zeros(big.size, bool) for f in ("humans", "monsters")}
+                for unit in units:
+                    masks[unit.faction][big.field_of_view(big.occupancy.position(unit), SIGHT_RADIUS)] = True
+            else:
+                big.visibility.mask("humans")
+        return time.perf_counter() - start
+
+    big.visibility.mask("humans")
+    full = run(True)
+    incremental = run(False)
+    start = time.perf_counter()
+    for q, r in cells[:10000]:
+        big.visibility.visible("humans", (q, r))
+    query = (time.perf_counter() - start) / 10000
+    print(f"20 ticks, 2000 units, 10% moving: full recompute {full:.2f} s, incremental {incremental:.2f} s, "
+          f"visible() {query * 1e6:.2f} us")
+
 
 if __name__ == "__main__":
     main()
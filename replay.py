@@ -0,0 +1,318 @@
+import json
+from typing import Any, Dict, Hashable, IO, Iterator, List, Optional, Tuple
+from behaviour import Behaviour
+from context import CreatureContext
+from world_io import _default
+
+
+FORMAT = "my_little_rpg/replay"
+VERSION = 1
+SNAPSHOT_EVERY = 100
+
+
+class _Track:
+    __slots__ = ("key", "unchanged", "behaviour", "context", "previous", "state", "actions")
+
+    def __init__(self, key: Hashable, behaviour: Behaviour, context: Dict[str, Any]) -> None:
+        self.key = key
+        self.unchanged = json.dumps([key])  # zakódovaný záznam kroku beze změny
+        self.behaviour = behaviour
+        self.context = context
+        self.previous: Optional[Dict[str, Any]] = None  # kopie kontextu po minulém kroku (jen u dictů)
+        self.state: Optional[str] = None
+        self.actions: Optional[Tuple[str, ...]] = None
+
+
+def _flat(context: Dict[str, Any]) -> Dict[str, Any]:
+    return context.flatten() if isinstance(context, CreatureContext) else dict(context)
+
+
+class ReplayRecorder:
+    """
+    Append-only záznam kroků chování do JSON Lines.
+
+    Každé kolo je jeden řádek {"t": kolo, "r": [záznam, ...]} (nejdřív kroky
+    beze změny), záznam tvora je [id] (krok beze změny vstupu, stavu i akcí) nebo
+    [id, stav po kroku, akce, změněné klíče kontextu, smazané klíče].
+    Změny kontextu se u CreatureContext berou z dirty(), u obyčejného dictu
+    porovnáním s kopií z minulého kroku. Na začátku kola dělitelného
+    `snapshot_every` a při prvním kroku tvora se zapíše snímek
+    {"s": kolo, "id": id, "behaviour": ..., "context": ...}, od kterého jde
+    tvora přehrát (ReplayLog.rewind/replay) bez simulace ostatních.
+    """
+
+    def __init__(self, target: str | IO[str], snapshot_every: int = SNAPSHOT_EVERY, **header: Any) -> None:
+        self._owns = isinstance(target, str)
+        self._fp: IO[str] = open(target, "w", encoding="utf-8") if isinstance(target, str) else target
+        self.snapshot_every = snapshot_every
+        self.tick = 0
+        self._tracks: Dict[Hashable, _Track] = {}
+        self._records: List[List[Any]] = []  # záznamy kola se změnou
+        self._unchanged: List[str] = []  # zakódované záznamy kola beze změny
+        # jeden encoder pro všechny řádky (json.dumps s parametry si ho pokaždé staví znovu)
+        self._encode = json.JSONEncoder(separators=(",", ":"), default=_default).encode
+        self._fp.write(json.dumps({"_format": FORMAT, "_version": VERSION, **header}, default=_default) + "\n")
+
+    def _write(self, line: Dict[str, Any]) -> None:
+        self._fp.write(self._encode(line) + "\n")
+
+    def _snapshot_line(self, key: Hashable, track: _Track) -> Dict[str, Any]:
+        context = track.previous if track.previous is not None else _flat(track.context)
+        return {"s": self.tick, "id": key, "behaviour": track.behaviour.to_dict(), "context": context}
+
+    def begin_tick(self, tick: Optional[int] = None) -> None:
+        """Začne kolo (výchozí: následující); případně zapíše snímky všech tvorů."""
+        self.end_tick()
+        self.tick = self.tick + 1 if tick is None else tick
+        if self.snapshot_every and self.tick % self.snapshot_every == 0 and self._tracks:
+            encode = self._encode
+            self._fp.write("\n".join(encode(self._snapshot_line(key, track))
+                                     for key, track in self._tracks.items()) + "\n")
+
+    def end_tick(self) -> None:
+        records, unchanged = self._records, self._unchanged
+        if not records and not unchanged:
+            return
+        # kroky beze změny jsou zakódované předem, ostatní se kódují jedním voláním
+        if records:
+            unchanged.append(self._encode(records)[1:-1])
+        self._fp.write(f'{{"t":{self.tick},"r":[{",".join(unchanged)}]}}\n')
+        self._records, self._unchanged = [], []
+
+    def step(self, key: Hashable, behaviour: Behaviour, context: Dict[str, Any]) -> Tuple[str, ...]:
+        """behaviour.step(context) se záznamem; `key` musí jít uložit do JSON (int, str)."""
+        track = self._tracks.get(key)
+        if track is None or track.behaviour is not behaviour:
+            track = self._tracks[key] = _Track(key, behaviour, context)
+            self._write(self._snapshot_line(key, track))
+        elif type(context) is CreatureContext and not context._dirty and not context.layers:
+            # rychlá cesta: vstup se nezměnil, kontext se vůbec neprochází
+            track.context = context
+            actions = behaviour.step(context)
+            if actions == track.actions and behaviour.current == track.state:
+                self._unchanged.append(track.unchanged)
+                return actions
+            return self._record(track, behaviour.current, actions, None, None)
+        track.context = context
+        changed: Optional[Dict[str, Any]] = None
+        deleted: Optional[List[str]] = None
+        if isinstance(context, CreatureContext):
+            # bez vrstev stačí nahlédnout do vlastní množiny (dirty() ji kopíruje)
+            dirty = context.dirty() if context.layers else context._dirty
+            if dirty:
+                changed, deleted = {}, []
+                for k in dirty:
+                    if k in context:
+                        changed[k] = context[k]
+                    else:
+                        deleted.append(k)
+            actions = behaviour.step(context)
+        else:
+            previous = track.previous
+            if previous is None:
+                changed = dict(context)
+            else:
+                changed = {k: v for k, v in context.items() if previous.get(k, previous) != v}
+                if len(previous) + len(changed) > len(context):
+                    deleted = [k for k in previous if k not in context]
+            actions = behaviour.step(context)
+            track.previous = dict(context)
+        return self._record(track, behaviour.current, actions, changed, deleted)
+
+    def _record(self, track: _Track, state: str, actions: Tuple[str, ...],
+                changed: Optional[Dict[str, Any]], deleted: Optional[List[str]]) -> Tuple[str, ...]:
+        if not changed and not deleted and state == track.state and actions == track.actions:
+            self._unchanged.append(track.unchanged)
+        else:
+            record = [track.key, state, actions, changed or {}, deleted or []]
+            while not record[-1]:
+                record.pop()
+            self._records.append(record)
+            track.state, track.actions = state, actions
+        return actions
+
+    def forget(self, key: Hashable) -> None:
+        self._tracks.pop(key, None)
+
+    def close(self) -> None:
+        self.end_tick()
+        if self._owns:
+            self._fp.close()
+        else:
+            self._fp.flush()
+
+    def __enter__(self) -> "ReplayRecorder":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def _apply(context: Dict[str, Any], record: List[Any]) -> None:
+    if len(record) > 3:
+        context.update(record[3])
+    for k in (record[4] if len(record) > 4 else ()):
+        context.pop(k, None)
+
+
+class ReplayStep:
+    """Jeden přehraný krok: vstupní kontext, výsledek a zda sedí se záznamem."""
+    __slots__ = ("tick", "context", "start_state", "state", "actions", "matches")
+
+    def __init__(self, tick: int, context: Dict[str, Any], start_state: str, state: str,
+                 actions: Tuple[str, ...], matches: bool) -> None:
+        self.tick = tick
+        self.context = context
+        self.start_state = start_state
+        self.state = state
+        self.actions = actions
+        self.matches = matches
+
+    def __repr__(self) -> str:
+        mark = "" if self.matches else " MISMATCH"
+        return f"ReplayStep({self.tick}: {self.start_state} -> {self.state}, {self.actions}{mark})"
+
+
+class ReplayLog:
+    """
+    Načtený záznam z ReplayRecorder, rozdělený podle tvorů.
+
+    rewind() obnoví chování a vstupní kontext tvora v daném kole
+    z nejbližšího dřívějšího snímku a přehraje jen jeho kroky.
+    """
+
+    def __init__(self, source: str | IO[str]) -> None:
+        if isinstance(source, str):
+            with open(source, "r", encoding="utf-8") as f:
+                self.__init__(f)
+            return
+        self.header = json.loads(source.readline())
+        if self.header.get("_format") != FORMAT:
+            raise ValueError("Not a replay log (missing header).")
+        if self.header.get("_version", 0) > VERSION:
+            raise ValueError(f"Unsupported replay log version {self.header['_version']}.")
+        # id -> [(kolo, chování, kontext)] a [(kolo, záznam)]; json klíče jsou vždy řetězce,
+        # id se proto drží tak, jak byla v záznamu (int zůstane int)
+        self.snapshots: Dict[Any, List[Tuple[int, Dict[str, Any], Dict[str, Any]]]] = {}
+        self.records: Dict[Any, List[Tuple[int, List[Any]]]] = {}
+        for line in source:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if "s" in entry:
+                self.snapshots.setdefault(entry["id"], []).append((entry["s"], entry["behaviour"], entry["context"]))
+                continue
+            tick = entry["t"]
+            for record in entry["r"]:
+                self.records.setdefault(record[0], []).append((tick, record))
+
+    def creatures(self) -> List[Any]:
+        return list(self.records)
+
+    def ticks(self, key: Any) -> List[int]:
+        return [tick for tick, _ in self.records.get(key, ())]
+
+    def _start(self, key: Any, tick: int) -> Tuple[int, Dict[str, Any], Dict[str, Any]]:
+        best = None
+        for snapshot in self.snapshots.get(key, ()):
+            if snapshot[0] <= tick:
+                best = snapshot
+        if best is None:
+            raise KeyError(f"No snapshot of {key!r} at or before tick {tick}.")
+        return best
+
+    def replay(self, key: Any, start: Optional[int] = None, end: Optional[int] = None) -> Iterator[ReplayStep]:
+        """Přehraje kroky tvora v kolech [start, end] od nejbližšího snímku a porovná je se záznamem."""
+        first = start if start is not None else (self.ticks(key) or [0])[0]
+        snapshot_tick, behaviour_data, context = self._start(key, first)
+        behaviour = Behaviour(behaviour_data)
+        context = dict(context)
+        state, actions = None, None
+        for tick, record in self.records.get(key, ()):
+            if end is not None and tick > end:
+                break
+            if len(record) > 1:
+                state, actions = record[1], tuple(record[2]) if len(record) > 2 else ()
+            if tick < snapshot_tick:
+                continue  # snímek už tyto změny obsahuje
+            _apply(context, record)
+            start_state = behaviour.current
+            inputs = dict(context) if tick >= first else None
+            result = behaviour.step(context)
+            if inputs is not None:
+                yield ReplayStep(tick, inputs, start_state, behaviour.current, result,
+                                 behaviour.current == state and result == actions)
+
+    def rewind(self, key: Any, tick: int) -> Tuple[Behaviour, Dict[str, Any]]:
+        """Chování a vstupní kontext tvora těsně před krokem v kole `tick`."""
+        snapshot_tick, behaviour_data, context = self._start(key, tick)
+        behaviour = Behaviour(behaviour_data)
+        context = dict(context)
+        for t, record in self.records.get(key, ()):
+            if t > tick:
+                break
+            if t < snapshot_tick:
+                continue
+            _apply(context, record)
+            if t == tick:
+                break
+            behaviour.step(context)
+        return behaviour, context
+
+
+def main() -> None:
+    import io
+    import random
+    import time
+    from benchmark import _dragons
+
+    rng = random.Random(11)
+    dragons = _dragons(1000)
+    contexts = [CreatureContext({"enemies_in_sight": 0, "distance_to_nearest_enemy": 5,
+                                 "health_ratio": 1.0, "stamina": 10}) for _ in dragons]
+    changes = [[{"enemies_in_sight": rng.randint(0, 3), "distance_to_nearest_enemy": rng.randint(1, 9),
+                 "stamina": rng.randint(0, 10)} if rng.random() < 0.1 else {} for _ in dragons]
+               for _ in range(200)]
+
+    def run(recorder: Optional[ReplayRecorder]) -> float:
+        for dragon in dragons:
+            dragon.behaviour.current, dragon.behaviour.cooldown_tracker = dragon.behaviour.initial, {}
+            dragon.behaviour._settled = None
+        for ctx in contexts:
+            ctx.update({"enemies_in_sight": 0, "distance_to_nearest_enemy": 5, "stamina": 10})
+            ctx.mark_dirty()
+        start = time.perf_counter()
+        for tick, tick_changes in enumerate(changes):
+            if recorder is not None:
+                recorder.begin_tick(tick)
+            for i, (dragon, ctx, change) in enumerate(zip(dragons, contexts, tick_changes)):
+                ctx.update(change)
+                if recorder is not None:
+                    recorder.step(i, dragon.behaviour, ctx)
+                else:
+                    dragon.behaviour.step(ctx)
+        if recorder is not None:
+            recorder.close()
+        return time.perf_counter() - start
+
+    # nejlepší ze tří běhů, střídavě bez záznamu a se záznamem
+    plain = recorded = float("inf")
+    for _ in range(3):
+        plain = min(plain, run(None))
+        buffer = io.StringIO()
+        recorded = min(recorded, run(ReplayRecorder(buffer, snapshot_every=50)))
+    print(f"200 ticks x 1000 creatures: {plain:.2f} s plain, {recorded:.2f} s recorded "
+          f"(+{(recorded / plain - 1) * 100:.0f}%), log {len(buffer.getvalue()) / 2**20:.2f} MB")
+
+    log = ReplayLog(io.StringIO(buffer.getvalue()))
+    steps = list(log.replay(7, start=120, end=140))
+    print("Replay creature 7, ticks 120-140:", all(s.matches for s in steps))
+    for s in steps[:3]:
+        print(" ", s)
+    behaviour, context = log.rewind(7, 150)
+    print("Rewind to tick 150:", behaviour.current, context)
+    print("All creatures match:", all(s.matches for key in log.creatures() for s in log.replay(key, 0, 199)))
+
+
+if __name__ == "__main__":
+    main()
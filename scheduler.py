@@ -0,0 +1,300 @@
+import asyncio
+import heapq
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+from behaviour import Behaviour
+from context import CreatureContext
+from hexmap import HexMap
+
+
+ContextSource = Union[Mapping[str, Any], Callable[[Any], Mapping[str, Any]]]
+ActionsCallback = Callable[[Any, Tuple[str, ...]], Any]
+
+IDLE_INTERVAL = 4  # klidní tvorové (stav typu "idle") myslí jen každé 4. kolo
+SLICE_SIZE = 256
+TICK_BUDGET = 0.005  # s na kolo
+
+
+def state_interval(creature: Any) -> int:
+    """Po kolika kolech má tvor znovu přemýšlet podle typu aktuálního stavu."""
+    behaviour = getattr(creature, "behaviour", None)
+    if not behaviour:
+        return IDLE_INTERVAL
+    return IDLE_INTERVAL if behaviour.state_objects[behaviour.current].type == "idle" else 1
+
+
+def state_priority(creature: Any) -> float:
+    """Výchozí priorita (menší = dřív): klidní tvorové až za ostatními."""
+    return float(state_interval(creature))
+
+
+def distance_priority(hexmap: HexMap, player_faction: Any, far: float = 1e9) -> Callable[[Any], float]:
+    """Priorita podle vzdálenosti k nejbližšímu hráči na mapě (tvorové mimo mapu jsou poslední)."""
+    def priority(creature: Any) -> float:
+        occupancy = hexmap.occupancy
+        position = occupancy.position(creature)
+        if position is None:
+            return far
+        nearest = occupancy.nearest(position, 1, [player_faction], exclude=creature)
+        return float(nearest[0][1]) if nearest else far
+    return priority
+
+
+class _Entry:
+    __slots__ = ("creature", "context", "on_actions", "due", "order")
+
+    def __init__(self, creature: Any, context: ContextSource, on_actions: Optional[ActionsCallback],
+                 due: int, order: int) -> None:
+        self.creature = creature
+        self.context = context
+        self.on_actions = on_actions
+        self.due = due
+        self.order = order
+
+
+class TickReport:
+    __slots__ = ("tick", "due", "stepped", "deferred", "offloaded", "elapsed")
+
+    def __init__(self, tick: int) -> None:
+        self.tick = tick
+        self.due = 0
+        self.stepped = 0
+        self.deferred = 0
+        self.offloaded = 0
+        self.elapsed = 0.0
+
+    def __repr__(self) -> str:
+        return (f"TickReport(tick={self.tick}, due={self.due}, stepped={self.stepped}, "
+                f"deferred={self.deferred}, offloaded={self.offloaded}, elapsed={self.elapsed * 1e3:.2f} ms)")
+
+
+def _context_for(entry: _Entry) -> Mapping[str, Any]:
+    return entry.context(entry.creature) if callable(entry.context) else entry.context
+
+
+def _think_remote(batch: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> List[Tuple[Tuple[str, ...], Dict[str, Any], Dict[str, Any]]]:
+    """Krok chování v jiném procesu: (behaviour.to_dict(), kontext) -> (akce, stav chování, kontext po kroku)."""
+    results = []
+    for data, context in batch:
+        behaviour = Behaviour(data)
+        actions = behaviour.step(context)
+        results.append((actions, {"current": behaviour.current, "cooldown_tracker": dict(behaviour.cooldown_tracker)},
+                        context))
+    return results
+
+
+class TickScheduler:
+    """
+    Rozděluje volání `think` mnoha tvorů do kol tak, aby jedno kolo nezabralo
+    víc než `budget` sekund a event loop nezamrzl.
+
+    Tvorové čekají v přihrádkách podle kola, kdy mají znovu myslet
+    (`interval`), takže kolo sahá jen na ty, kdo jsou na řadě. `priority`
+    (menší = dřív) se spočte jednou, když tvor na řadu přijde, a k ní se
+    přičte kolo, od kterého čeká; každé kolo čekání ji tedy zlepší o 1.
+    Výpočet priorit i kroky běží po `slice_size` a do rozpočtu se počítá
+    obojí; mezi dávkami se předá řízení event loopu. Co se do rozpočtu
+    nevejde, přijde na řadu v dalším kole.
+
+    Při alespoň `offload_threshold` tvorech v kole se dávky posílají do
+    `executor`: ve vláknech se volá přímo think(), procesům se posílá jen
+    stav chování a kontext a výsledek se zapíše zpět. Sestavení dávek
+    i zápis výsledků běží po `slice_size` s předáním řízení mezi dávkami.
+    """
+
+    def __init__(self, budget: float = TICK_BUDGET, slice_size: int = SLICE_SIZE,
+                 priority: Callable[[Any], float] = state_priority,
+                 interval: Callable[[Any], int] = state_interval,
+                 executor: Optional[Executor] = None, offload_threshold: int = 10_000) -> None:
+        self.budget = budget
+        self.slice_size = slice_size
+        self.priority = priority
+        self.interval = interval
+        self.executor = executor
+        self.offload_threshold = offload_threshold
+        self.tick_count = 0
+        self._entries: Dict[int, _Entry] = {}
+        self._order = 0
+        # kolo -> tvorové, kteří v něm přijdou na řadu
+        self._buckets: Dict[int, List[_Entry]] = {}
+        # na řadě, ale bez spočtené priority (v pořadí, jak přišli na řadu)
+        self._incoming: Deque[_Entry] = deque()
+        # na řadě se spočtenou prioritou: halda (due + priorita, pořadí, záznam)
+        self._ready: List[Tuple[float, int, _Entry]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, creature: Any, context: ContextSource, on_actions: Optional[ActionsCallback] = None) -> None:
+        """`context` je trvalý kontext (např. CreatureContext), nebo funkce creature -> kontext."""
+        self._order += 1
+        entry = self._entries[id(creature)] = _Entry(creature, context, on_actions, self.tick_count, self._order)
+        self._incoming.append(entry)
+
+    def remove(self, creature: Any) -> None:
+        # z přihrádek a haldy se záznam vyřadí, až na něj přijde řada
+        self._entries.pop(id(creature), None)
+
+    def _live(self, entry: _Entry) -> bool:
+        return self._entries.get(id(entry.creature)) is entry
+
+    def _prioritize(self, count: int) -> int:
+        """Spočte prioritu nejvýš `count` tvorům z _incoming; vrací počet vyřazených."""
+        incoming, ready, priority = self._incoming, self._ready, self.priority
+        dropped = 0
+        for _ in range(min(count, len(incoming))):
+            entry = incoming.popleft()
+            if self._live(entry):
+                heapq.heappush(ready, (entry.due + priority(entry.creature), entry.order, entry))
+            else:
+                dropped += 1
+        return dropped
+
+    def _pop_ready(self, count: int) -> Tuple[List[_Entry], int]:
+        """Nejvýš `count` tvorů s nejlepší prioritou a počet vyřazených."""
+        ready = self._ready
+        part: List[_Entry] = []
+        dropped = 0
+        while ready and len(part) < count:
+            entry = heapq.heappop(ready)[2]
+            if self._live(entry):
+                part.append(entry)
+            else:
+                dropped += 1
+        return part, dropped
+
+    def _take_all(self) -> List[_Entry]:
+        """Všichni tvorové na řadě (pro offload, kde přijdou na řadu všichni)."""
+        due = [entry for _, _, entry in self._ready] + list(self._incoming)
+        self._ready, self._incoming = [], deque()
+        return [entry for entry in due if self._live(entry)]
+
+    def _finish(self, entry: _Entry, actions: Tuple[str, ...]) -> None:
+        entry.due = self.tick_count + max(1, self.interval(entry.creature))
+        self._buckets.setdefault(entry.due, []).append(entry)
+        if entry.on_actions is not None:
+            entry.on_actions(entry.creature, actions)
+
+    def _run_slice(self, entries: Iterable[_Entry]) -> List[Tuple[str, ...]]:
+        return [entry.creature.think(_context_for(entry)) for entry in entries]
+
+    async def _offload(self, entries: List[_Entry]) -> None:
+        loop = asyncio.get_running_loop()
+        slices = [entries[i:i + self.slice_size] for i in range(0, len(entries), self.slice_size)]
+        if isinstance(self.executor, ProcessPoolExecutor):
+            contexts, futures = [], []
+            for part in slices:
+                ctx = [_context_for(e) for e in part]
+                payload = [(e.creature.behaviour.to_dict(),
+                            c.flatten() if isinstance(c, CreatureContext) else dict(c)) for e, c in zip(part, ctx)]
+                contexts.append(ctx)
+                futures.append(loop.run_in_executor(self.executor, _think_remote, payload))
+                await asyncio.sleep(0)
+            for part, ctx, future in zip(slices, contexts, futures):
+                for entry, context, (actions, state, after) in zip(part, ctx, await future):
+                    behaviour = entry.creature.behaviour
+                    behaviour.current = state["current"]
+                    behaviour.cooldown_tracker = state["cooldown_tracker"]
+                    behaviour._settled = None
+                    if isinstance(context, dict):
+                        # zaplacený cost se propíše do trvalého kontextu
+                        context.update({k: v for k, v in after.items() if context.get(k) != v})
+                    self._finish(entry, actions)
+                await asyncio.sleep(0)  # hotové dávky se jinak zapíšou všechny najednou
+        else:
+            futures = [loop.run_in_executor(self.executor, self._run_slice, part) for part in slices]
+            for part, future in zip(slices, futures):
+                for entry, actions in zip(part, await future):
+                    self._finish(entry, actions)
+                await asyncio.sleep(0)
+
+    async def tick(self) -> TickReport:
+        """Jedno kolo: projde tvory na řadě v pořadí priority, dokud nedojde rozpočet."""
+        report = TickReport(self.tick_count)
+        start = time.perf_counter()
+        self._incoming.extend(self._buckets.pop(self.tick_count, ()))
+        report.due = len(self._incoming) + len(self._ready)
+        if self.executor is not None and report.due >= self.offload_threshold:
+            due = self._take_all()
+            report.due = len(due)
+            await self._offload(due)
+            report.stepped = report.offloaded = len(due)
+        else:
+            size = self.slice_size
+            while self._incoming or self._ready:
+                report.due -= self._prioritize(size)
+                part, dropped = self._pop_ready(size)
+                report.due -= dropped
+                for entry, actions in zip(part, self._run_slice(part)):
+                    self._finish(entry, actions)
+                report.stepped += len(part)
+                if time.perf_counter() - start >= self.budget:
+                    break
+                await asyncio.sleep(0)
+        report.deferred = report.due - report.stepped
+        report.elapsed = time.perf_counter() - start
+        self.tick_count += 1
+        return report
+
+    async def run(self, period: float, ticks: Optional[int] = None,
+                  on_tick: Optional[Callable[[TickReport], Any]] = None) -> None:
+        """Spouští tick() každých `period` sekund (nebo hned, pokud se kolo protáhlo)."""
+        loop = asyncio.get_running_loop()
+        next_time = loop.time()
+        count = 0
+        while ticks is None or count < ticks:
+            report = await self.tick()
+            if on_tick is not None:
+                on_tick(report)
+            count += 1
+            next_time += period
+            await asyncio.sleep(max(0.0, next_time - loop.time()))
+
+
+def main() -> None:
+    import gc
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+    from benchmark import _dragons
+
+    rng = random.Random(5)
+    dragons = _dragons(5000)
+    contexts = [CreatureContext({"enemies_in_sight": rng.randint(0, 1), "distance_to_nearest_enemy": rng.randint(1, 9),
+                                 "health_ratio": 1.0, "stamina": 10}) for _ in dragons]
+    # trvalé objekty světa úplný průchod GC nepotřebují; jinak by každá jeho
+    # desítky ms dlouhá pauza vypadala jako zaseknutý event loop
+    gc.freeze()
+
+    async def heartbeat(stop: asyncio.Event) -> List[float]:
+        # měří, jak dlouho event loop nereagoval
+        gaps = []
+        loop = asyncio.get_running_loop()
+        while not stop.is_set():
+            before = loop.time()
+            await asyncio.sleep(0.001)
+            gaps.append(loop.time() - before)
+        return gaps
+
+    async def demo(scheduler: TickScheduler, name: str) -> None:
+        for dragon, context in zip(dragons, contexts):
+            scheduler.add(dragon, context)
+        stop = asyncio.Event()
+        watcher = asyncio.create_task(heartbeat(stop))
+        reports = []
+        await scheduler.run(0.01, ticks=20, on_tick=reports.append)
+        stop.set()
+        gaps = await watcher
+        print(f"{name}: stepped {sum(r.stepped for r in reports)}, deferred at end {reports[-1].deferred}, "
+              f"longest tick {max(r.elapsed for r in reports) * 1e3:.1f} ms, longest loop stall {max(gaps) * 1e3:.1f} ms")
+
+    asyncio.run(demo(TickScheduler(budget=0.004), "budgeted"))
+    with ThreadPoolExecutor(2) as executor:
+        asyncio.run(demo(TickScheduler(executor=executor, offload_threshold=1000), "thread offload"))
+    with ProcessPoolExecutor(2) as executor:
+        asyncio.run(demo(TickScheduler(executor=executor, offload_threshold=1000), "process offload"))
+
+
+if __name__ == "__main__":
+    main()
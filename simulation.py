@@ -0,0 +1,157 @@
+import multiprocessing
+import os
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+import numpy as np
+from behaviour import export_definitions, install_definitions
+from creature import Creature
+
+
+ContextFactory = Callable[[np.random.Generator, int, int], Dict[str, Any]]
+
+
+def skirmish_context(rng: np.random.Generator, tick: int, creature: int) -> Dict[str, Any]:
+    """Náhodná situace jako ve scénářích z creature.main()."""
+    return {
+        "enemies_in_sight": int(rng.integers(0, 4)),
+        "distance_to_nearest_enemy": int(rng.integers(1, 10)),
+        "health_ratio": float(rng.choice([0.5, 1.0])),
+        "stamina": int(rng.integers(0, 11)),
+        "surrounded": bool(rng.random() < 0.2),
+    }
+
+
+class Encounter:
+    """
+    Jedno nezávislé střetnutí: tvorové v JSON podobě, počet kol a funkce
+    vytvářející kontext (musí jít picklovat, tj. být definovaná na úrovni modulu).
+    """
+    __slots__ = ("creatures", "ticks", "context")
+
+    def __init__(self, creatures: Sequence[Dict[str, Any]], ticks: int,
+                 context: ContextFactory = skirmish_context) -> None:
+        self.creatures = list(creatures)
+        self.ticks = ticks
+        self.context = context
+
+    def behaviour_files(self) -> set[str]:
+        files = set()
+        for data in self.creatures:
+            behaviour = data.get("behaviour") or {}
+            if "to_load" in behaviour.get("_flags", ()):
+                files.add(behaviour["loadfile"])
+        return files
+
+
+class TickStats:
+    """Počty akcí a stavů tvorů v jednom kole jednoho střetnutí."""
+    __slots__ = ("encounter", "tick", "actions", "states")
+
+    def __init__(self, encounter: int, tick: int, actions: Counter, states: Counter) -> None:
+        self.encounter = encounter
+        self.tick = tick
+        self.actions = actions
+        self.states = states
+
+
+def run_encounter(index: int, encounter: Encounter, seed: np.random.SeedSequence) -> List[TickStats]:
+    """Odsimuluje jedno střetnutí; výsledek závisí jen na vstupu a `seed`."""
+    rng = np.random.default_rng(seed)
+    creatures = [Creature(data) for data in encounter.creatures]
+    stats = []
+    for tick in range(encounter.ticks):
+        actions: Counter = Counter()
+        states: Counter = Counter()
+        for i, creature in enumerate(creatures):
+            actions.update(creature.think(encounter.context(rng, tick, i)))
+            if creature.behaviour:
+                states[creature.behaviour.current] += 1
+        stats.append(TickStats(index, tick, actions, states))
+    return stats
+
+
+def _init_worker(definitions: Dict[str, Any], cwd: str) -> None:
+    # definice chování se posílají jednou na proces, ne s každou úlohou
+    os.chdir(cwd)
+    install_definitions(definitions)
+
+
+def _run_task(task: tuple[int, Encounter, np.random.SeedSequence]) -> List[TickStats]:
+    return run_encounter(*task)
+
+
+def run(encounters: Sequence[Encounter], seed: int = 0, workers: Optional[int] = None,
+        chunksize: int = 1) -> Iterator[TickStats]:
+    """
+    Spustí střetnutí paralelně v procesech a průběžně vrací statistiky kol.
+
+    Každé střetnutí dostane vlastní potomka SeedSequence(seed), takže výsledky
+    nezávisí na počtu procesů ani pořadí dokončení. Statistiky přicházejí po
+    dokončených střetnutích (v libovolném pořadí). `workers=0` běží v tomto procesu.
+    """
+    seeds = np.random.SeedSequence(seed).spawn(len(encounters))
+    tasks = [(i, encounter, s) for i, (encounter, s) in enumerate(zip(encounters, seeds))]
+    if workers == 0:
+        for task in tasks:
+            yield from _run_task(task)
+        return
+    files = set().union(*(e.behaviour_files() for e in encounters)) if encounters else set()
+    with multiprocessing.Pool(workers, _init_worker, (export_definitions(files), os.getcwd())) as pool:
+        for result in pool.imap_unordered(_run_task, tasks, chunksize):
+            yield from result
+
+
+class SimulationStats:
+    """Souhrn přes všechna střetnutí: počty akcí a stavů pro každé kolo."""
+
+    def __init__(self) -> None:
+        self.actions: Dict[int, Counter] = {}
+        self.states: Dict[int, Counter] = {}
+        self.encounters: set[int] = set()
+
+    def add(self, stats: TickStats) -> None:
+        self.actions.setdefault(stats.tick, Counter()).update(stats.actions)
+        self.states.setdefault(stats.tick, Counter()).update(stats.states)
+        self.encounters.add(stats.encounter)
+
+    def update(self, stream: Iterable[TickStats]) -> "SimulationStats":
+        for stats in stream:
+            self.add(stats)
+        return self
+
+    def total_actions(self) -> Counter:
+        return sum(self.actions.values(), Counter())
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, SimulationStats) and \
+            (self.actions, self.states, self.encounters) == (other.actions, other.states, other.encounters)
+
+
+def simulate(encounters: Sequence[Encounter], seed: int = 0, workers: Optional[int] = None) -> SimulationStats:
+    return SimulationStats().update(run(encounters, seed, workers))
+
+
+def main() -> None:
+    import time
+
+    dragon = {
+        "_object": "Creature", "name": "Dragon", "race": "Dragon",
+        "ability_score": None, "inventory": [],
+        "behaviour": {"_flags": ["to_load"], "loadfile": "dragon"},
+        "tags": {}, "reactions": {},
+    }
+    encounters = [Encounter([{**dragon, "name": f"Dragon {i}"} for i in range(20)], ticks=50) for _ in range(64)]
+
+    results = {}
+    for workers in (0, os.cpu_count()):
+        start = time.perf_counter()
+        results[workers] = simulate(encounters, seed=42, workers=workers)
+        print(f"workers={workers}: {time.perf_counter() - start:.2f} s")
+    stats = results[0]
+    print("Deterministic:", all(r == stats for r in results.values()))
+    print("Actions:", dict(stats.total_actions().most_common(5)))
+    print("States at tick 10:", dict(stats.states[10]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+import json
+import mmap
+import struct
+from typing import Any, Iterable, Iterator, Optional
+import numpy as np
+from data_structures import JSONObject, decode_value
+from hexmap import HexMap, TERRAIN_TYPES, terrain_code
+from world_io import _default
+
+
+MAGIC = b"MLRPGSNP"
+VERSION = 1
+ALIGN = 64
+PREAMBLE = struct.Struct("<8sIIQ")  # magic, version, header length, data start
+
+ABILITIES = ("str", "dex", "con", "int", "wis", "chr")
+# pole Creature, která nejdou do sloupců; ukládají se jako JSON pole hodnot
+RESIDUAL_FIELDS = ("_flags", "name", "race", "ability_score", "inventory", "behaviour",
+                   "tags", "reactions", "_cooldowns")
+CREATURE_KEYS = frozenset(["_object", *RESIDUAL_FIELDS]) - {"_cooldowns"}
+
+# bity sloupce creature.ability_mask
+ABILITY_COLUMNS = 1
+ABILITY_EXTRA = 2
+ABILITY_FLAGS = 4
+ABILITY_EXTRA_FLAG = 8
+
+INT16 = np.iinfo(np.int16)
+
+
+def _bounds(metadata: Any) -> Optional[tuple[int, int]]:
+    if not isinstance(metadata, dict) or set(metadata) != {"_object", "min", "max"} \
+            or metadata["_object"] != "Metadata":
+        return None
+    lo, hi = metadata["min"], metadata["max"]
+    if not all(type(v) is int and INT16.min <= v <= INT16.max for v in (lo, hi)):
+        return None
+    return lo, hi
+
+
+def _scores(data: dict[str, Any]) -> Optional[list[int]]:
+    values = [data.get(a) for a in ABILITIES]
+    if all(type(v) is int and INT16.min <= v <= INT16.max for v in values):
+        return values
+    return None
+
+
+def _ability_row(data: Any) -> Optional[tuple[int, list[int], tuple[int, int], list[int], tuple[int, int]]]:
+    """Rozloží AbilityScore (v JSON podobě) na pevné sloupce, nebo None, když nemá běžný tvar."""
+    if not isinstance(data, dict) or data.get("_object") != "AbilityScore":
+        return None
+    keys = set(data) - {"_object", "_flags", "extra", "metadata", *ABILITIES}
+    base, bounds = _scores(data), _bounds(data.get("metadata"))
+    if keys or base is None or bounds is None:
+        return None
+    mask = ABILITY_COLUMNS
+    if "_flags" in data:
+        flags = list(data["_flags"])
+        if flags not in ([], ["extra_ability_score"]):
+            return None
+        mask |= ABILITY_FLAGS | (ABILITY_EXTRA_FLAG if flags else 0)
+    extra, extra_bounds = [0] * 6, (0, 0)
+    if "extra" in data:
+        nested = data["extra"]
+        if not isinstance(nested, dict) or set(nested) != {"_object", "metadata", *ABILITIES} \
+                or nested["_object"] != "AbilityScore":
+            return None
+        extra, extra_bounds = _scores(nested), _bounds(nested["metadata"])
+        if extra is None or extra_bounds is None:
+            return None
+        mask |= ABILITY_EXTRA
+    return mask, base, bounds, extra, extra_bounds
+
+
+def _ability_dict(mask: int, base: np.ndarray, bounds: np.ndarray,
+                  extra: np.ndarray, extra_bounds: np.ndarray) -> dict[str, Any]:
+    result: dict[str, Any] = {"_object": "AbilityScore"}
+    if mask & ABILITY_FLAGS:
+        result["_flags"] = ["extra_ability_score"] if mask & ABILITY_EXTRA_FLAG else []
+    result.update(zip(ABILITIES, base.tolist()))
+    if mask & ABILITY_EXTRA:
+        result["extra"] = {
+            "_object": "AbilityScore",
+            **dict(zip(ABILITIES, extra.tolist())),
+            "metadata": {"_object": "Metadata", "min": int(extra_bounds[0]), "max": int(extra_bounds[1])},
+        }
+    result["metadata"] = {"_object": "Metadata", "min": int(bounds[0]), "max": int(bounds[1])}
+    return result
+
+
+def _behaviour_row(data: Any) -> Optional[tuple[str, str, dict[str, int]]]:
+    """Behaviour načtené ze souboru -> (soubor, stav, cooldowny)."""
+    if not isinstance(data, dict) or set(data) != {"_object", "_flags", "loadfile", "current", "cooldown_tracker"}:
+        return None
+    if data["_object"] != "Behaviour" or list(data["_flags"]) != ["to_load"]:
+        return None
+    return data["loadfile"], data["current"], data["cooldown_tracker"]
+
+
+class _Strings:
+    def __init__(self) -> None:
+        self.items: list[str] = []
+        self.index: dict[str, int] = {}
+
+    def add(self, value: str) -> int:
+        if value not in self.index:
+            self.index[value] = len(self.items)
+            self.items.append(value)
+        return self.index[value]
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def _blob(rows: list[bytes]) -> tuple[np.ndarray, np.ndarray]:
+    offsets = np.zeros(len(rows) + 1, np.int64)
+    np.cumsum([len(r) for r in rows], out=offsets[1:])
+    return np.frombuffer(b"".join(rows), np.uint8), offsets
+
+
+def write_snapshot(path: str, creatures: Iterable[Any] = (), hexmap: HexMap | None = None,
+                   objects: Iterable[JSONObject | dict[str, Any]] = ()) -> None:
+    """
+    Uloží binární snapshot: hlavička se schématem jednou, skóre vlastností a
+    terén jako sloupce pevné šířky, zbytek jako kompaktní JSON bez jmen polí.
+    """
+    creatures = list(creatures)
+    n = len(creatures)
+    strings = _Strings()
+    arrays: dict[str, np.ndarray] = {
+        "creature.ability_mask": np.zeros(n, np.uint8),
+        "creature.ability": np.zeros((n, 6), np.int16),
+        "creature.ability_bounds": np.zeros((n, 2), np.int16),
+        "creature.extra": np.zeros((n, 6), np.int16),
+        "creature.extra_bounds": np.zeros((n, 2), np.int16),
+        "creature.behaviour_file": np.full(n, -1, np.int32),
+        "creature.behaviour_state": np.full(n, -1, np.int32),
+        "creature.present": np.zeros(n, np.uint16),
+    }
+    residual: list[bytes] = []
+    position: dict[int, int] = {}
+    for i, creature in enumerate(creatures):
+        position[id(creature)] = i
+        data = creature.to_dict() if isinstance(creature, JSONObject) else dict(creature)
+        row = _ability_row(data.get("ability_score"))
+        if row is not None:
+            mask, base, bounds, extra, extra_bounds = row
+            arrays["creature.ability_mask"][i] = mask
+            arrays["creature.ability"][i] = base
+            arrays["creature.ability_bounds"][i] = bounds
+            arrays["creature.extra"][i] = extra
+            arrays["creature.extra_bounds"][i] = extra_bounds
+            del data["ability_score"]
+        behaviour = _behaviour_row(data.get("behaviour"))
+        if behaviour is not None:
+            arrays["creature.behaviour_file"][i] = strings.add(behaviour[0])
+            arrays["creature.behaviour_state"][i] = strings.add(behaviour[1])
+            del data["behaviour"]
+            if behaviour[2]:
+                data["_cooldowns"] = behaviour[2]
+        present = 0
+        values = []
+        for bit, field in enumerate(RESIDUAL_FIELDS):
+            if field in data:
+                present |= 1 << bit
+                values.append(data[field])
+            else:
+                values.append(None)
+        extra_keys = {k: v for k, v in data.items() if k not in CREATURE_KEYS and k != "_cooldowns"}
+        values.append(extra_keys or None)
+        arrays["creature.present"][i] = present
+        residual.append(_encode(values))
+    arrays["creature.residual"], arrays["creature.residual_offsets"] = _blob(residual)
+
+    header: dict[str, Any] = {
+        "schema": {
+            "Creature": {"residual": list(RESIDUAL_FIELDS), "count": n},
+            "AbilityScore": list(ABILITIES),
+        },
+        "strings": strings.items,
+    }
+    other = [_encode(o.to_dict() if isinstance(o, JSONObject) else o) for o in objects]
+    arrays["objects.data"], arrays["objects.offsets"] = _blob(other)
+    if hexmap is not None:
+        header["map"] = {"radius": hexmap.radius, "terrain_types": list(TERRAIN_TYPES)}
+        arrays["map.terrain"] = hexmap.terrain
+        occupants = np.full(hexmap.size, -1, np.int32)
+        for cell in np.flatnonzero(np.not_equal(hexmap.occupants, None)).tolist():
+            occupants[cell] = position.get(id(hexmap.occupants[cell]), -1)
+        arrays["map.occupants"] = occupants
+
+    sections = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        sections[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+    header["sections"] = sections
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    data_start = -(-(PREAMBLE.size + len(header_bytes)) // ALIGN) * ALIGN
+
+    with open(path, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, len(header_bytes), data_start))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            f.seek(data_start + sections[name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+
+
+class Snapshot:
+    """
+    Otevřený binární snapshot. Sekce jsou pohledy do mmapu - soubor se
+    neparsuje celý, tvorové se dekódují až při přístupu.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, header_len, self._data_start = PREAMBLE.unpack(f.read(PREAMBLE.size))
+            if magic != MAGIC:
+                raise ValueError("Not a snapshot file.")
+            if version > VERSION:
+                raise ValueError(f"Unsupported snapshot version {version}.")
+            self.header: dict[str, Any] = json.loads(f.read(header_len))
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._sections: dict[str, np.ndarray] = {}
+        self.strings: list[str] = self.header["strings"]
+        self.residual_fields: list[str] = self.header["schema"]["Creature"]["residual"]
+
+    def section(self, name: str) -> np.ndarray:
+        """Kopie sekce; zůstane platná i po close()."""
+        return self._section(name).copy()
+
+    def _section(self, name: str) -> np.ndarray:
+        # pohled do mmapu; nesmí opustit Snapshot, jinak by close() selhal (BufferError)
+        if name in self._sections:
+            return self._sections[name]
+        info = self.header["sections"][name]
+        dtype = np.dtype(info["dtype"])
+        count = int(np.prod(info["shape"], dtype=np.int64))
+        array = np.frombuffer(self._mmap, dtype, count, self._data_start + info["offset"]) \
+            if count else np.zeros(0, dtype)
+        self._sections[name] = array = array.reshape(info["shape"])
+        return array
+
+    def __len__(self) -> int:
+        return self.header["schema"]["Creature"]["count"]
+
+    def creature_dict(self, i: int) -> dict[str, Any]:
+        """Tvor i v JSON podobě (stejné jako Creature.to_dict())."""
+        values = self._residual(i)
+        present = int(self._section("creature.present")[i])
+        fields = dict(
+            (field, value) for bit, (field, value) in enumerate(zip(self.residual_fields, values))
+            if present >> bit & 1
+        )
+        result: dict[str, Any] = {"_object": "Creature"}
+        mask = int(self._section("creature.ability_mask")[i])
+        cooldowns = fields.pop("_cooldowns", {})
+        for field in self.residual_fields:
+            if field == "ability_score" and mask & ABILITY_COLUMNS:
+                result[field] = _ability_dict(
+                    mask, self._section("creature.ability")[i], self._section("creature.ability_bounds")[i],
+                    self._section("creature.extra")[i], self._section("creature.extra_bounds")[i])
+            elif field == "behaviour" and self._section("creature.behaviour_file")[i] >= 0:
+                result[field] = {
+                    "_object": "Behaviour", "_flags": ["to_load"],
+                    "loadfile": self.strings[self._section("creature.behaviour_file")[i]],
+                    "current": self.strings[self._section("creature.behaviour_state")[i]],
+                    "cooldown_tracker": cooldowns,
+                }
+            elif field in fields:
+                result[field] = fields[field]
+        if values[-1]:
+            result.update(values[-1])
+        return result
+
+    def _residual(self, i: int) -> list[Any]:
+        offsets = self._section("creature.residual_offsets")
+        data = self._section("creature.residual")
+        return json.loads(data[offsets[i]:offsets[i + 1]].tobytes())
+
+    def creature(self, i: int) -> Any:
+        return decode_value(self.creature_dict(i))
+
+    def creatures(self, decode: bool = True) -> Iterator[Any]:
+        for i in range(len(self)):
+            yield self.creature(i) if decode else self.creature_dict(i)
+
+    def objects(self, decode: bool = True) -> Iterator[Any]:
+        # generátor nedržet pohledy do mmapu (nedočtený by blokoval close())
+        offsets = self._section("objects.offsets").tolist()
+        for i in range(len(offsets) - 1):
+            record = json.loads(self._section("objects.data")[offsets[i]:offsets[i + 1]].tobytes())
+            yield decode_value(record) if decode else record
+
+    def hexmap(self, creatures: Optional[list[Any]] = None) -> Optional[HexMap]:
+        """
+        Mapa ze snapshotu. Terén je copy-on-write pohled do souboru, takže se
+        velká mapa otevře bez čtení. Occupanti se doplní z `creatures`
+        (indexy tvorů ve snapshotu), pokud jsou předány.
+        """
+        info = self.header.get("map")
+        if info is None:
+            return None
+        m = HexMap(info["radius"])
+        codes = np.array([terrain_code(name) for name in info["terrain_types"]], np.uint8)
+        terrain = self._section("map.terrain")
+        if np.array_equal(codes, np.arange(len(codes))) and terrain.size:
+            offset = self._data_start + self.header["sections"]["map.terrain"]["offset"]
+            m.terrain = np.memmap(self.path, np.uint8, "c", offset, terrain.shape)
+        else:
+            m.terrain = codes[terrain]
+        if creatures is not None:
+            occupants = self._section("map.occupants")
+            for cell in np.flatnonzero(occupants >= 0).tolist():
+                m.occupants[cell] = creatures[occupants[cell]]
+        m.touch()
+        return m
+
+    def occupant_indices(self) -> np.ndarray:
+        return self.section("map.occupants")
+
+    def close(self) -> None:
+        self._sections.clear()
+        self._mmap.close()
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def main() -> None:
+    import os
+    import tempfile
+    import time
+    from benchmark import CREATURE_DATA
+    from creature import Creature
+    from world_io import dump_stream
+
+    rng = np.random.default_rng(0)
+    creatures = [Creature({**CREATURE_DATA, "name": f"Dragon {i}"}) for i in range(10_000)]
+    m = HexMap(200)
+    m.terrain[:] = rng.integers(0, 4, m.size)
+    for i, creature in enumerate(creatures[:500]):
+        m.set_occupant(int(m.q_of[i * 7]), int(m.r_of[i * 7]), creature)
+
+    directory = tempfile.gettempdir()
+    binary, text = os.path.join(directory, "world.snap"), os.path.join(directory, "world.jsonl")
+    start = time.perf_counter()
+    write_snapshot(binary, creatures, m)
+    print(f"Snapshot: {os.path.getsize(binary) / 2**20:.2f} MB in {time.perf_counter() - start:.2f} s")
+    dump_stream(creatures, text)
+    print(f"JSON Lines: {os.path.getsize(text) / 2**20:.2f} MB")
+
+    with Snapshot(binary) as snap:
+        start = time.perf_counter()
+        loaded = list(snap.creatures())
+        restored = snap.hexmap(loaded)
+        print(f"Loaded {len(loaded)} creatures and a radius {restored.radius} map "
+              f"in {time.perf_counter() - start:.2f} s")
+        print("Lossless:", all(a.to_dict() == b.to_dict() for a, b in zip(creatures, loaded)),
+              bool((restored.terrain == m.terrain).all()), restored.hex_at(7).occupant.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+from archetype import register_archetype
+from benchmark import CREATURE_DATA
+
+
+def test_spawned_flags_are_not_shared():
+    dragon = register_archetype("test_dragon", CREATURE_DATA)
+    a, b = dragon.spawn(), dragon.spawn()
+    a._flags.append("x")
+    assert a.have_flag("x")
+    assert not b.have_flag("x")
+    assert "x" not in dragon.prototype._flags
+
+
+def test_spawned_metadata_is_not_shared():
+    dragon = register_archetype("test_dragon", CREATURE_DATA)
+    a, b = dragon.spawn(), dragon.spawn()
+    limit = dragon.prototype.ability_score.metadata.max
+    a.ability_score.metadata.max = 99
+    assert b.ability_score.metadata.max == limit
+    assert dragon.prototype.ability_score.metadata.max == limit
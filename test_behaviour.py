@@ -0,0 +1,33 @@
+from behaviour import Behaviour, BehaviourDefinition, BehaviourState
+from context import CreatureContext
+
+STRIKE = {
+    "initial": "wait", "extra": {}, "global_triggers": [],
+    "states": {
+        "wait": {"type": "idle", "actions": ["wait"], "transitions": [{"to": "strike", "condition": "enemy > 0"}]},
+        "strike": {"type": "action", "actions": ["strike"], "context": {"cooldown": 5},
+                   "transitions": [{"to": "wait", "condition": "True"}]},
+    },
+}
+
+
+def test_settled_skip_while_target_cools_down(monkeypatch):
+    evaluations = []
+    get_next_state = BehaviourState.get_next_state
+    monkeypatch.setattr(BehaviourState, "get_next_state",
+                        lambda self, *args: evaluations.append(self.name) or get_next_state(self, *args))
+    incremental, plain = Behaviour(BehaviourDefinition(STRIKE)), Behaviour(BehaviourDefinition(STRIKE))
+    context = CreatureContext({"enemy": 1})
+    steps = [incremental.step(context) for _ in range(30)]
+    skipped = 30 - len(evaluations)
+    assert steps == [plain.step({"enemy": 1}) for _ in range(30)]
+    assert skipped > 0
+
+
+def test_cooldown_change_invalidates_settled_step():
+    behaviour = Behaviour(BehaviourDefinition(STRIKE))
+    context = CreatureContext({"enemy": 1})
+    behaviour.step(context)
+    behaviour.step(context)
+    behaviour.cooldown_tracker = {}
+    assert behaviour.step(context) == ("strike",)
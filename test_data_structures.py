@@ -0,0 +1,29 @@
+import copy
+import pytest
+from benchmark import CREATURE_DATA
+from creature import Creature
+from data_structures import lazy_decoding
+
+
+def _lazy_creature(data):
+    with lazy_decoding():
+        return Creature(data)
+
+
+def test_failed_lazy_decode_keeps_field():
+    data = copy.deepcopy(CREATURE_DATA)
+    data["ability_score"]["str"] = 10 ** 6
+    creature = _lazy_creature(data)
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            creature.ability_score
+    assert creature.to_dict()["ability_score"] == data["ability_score"]
+
+
+def test_hasattr_keeps_field_missing_required_attribute():
+    data = copy.deepcopy(CREATURE_DATA)
+    del data["ability_score"]["metadata"]
+    creature = _lazy_creature(data)
+    assert not hasattr(creature, "ability_score")
+    assert not hasattr(creature, "ability_score")
+    assert creature.to_dict()["ability_score"] == data["ability_score"]
@@ -0,0 +1,49 @@
+import asyncio
+from scheduler import TickScheduler
+
+
+class _Creature:
+    def __init__(self, interval: int = 1) -> None:
+        self.interval = interval
+        self.steps = 0
+
+    def think(self, context):
+        self.steps += 1
+        return ()
+
+
+def _run(scheduler: TickScheduler, ticks: int) -> None:
+    async def go() -> None:
+        for _ in range(ticks):
+            await scheduler.tick()
+    asyncio.run(go())
+
+
+def test_creatures_think_once_per_interval():
+    scheduler = TickScheduler(budget=10.0, priority=lambda c: 1.0, interval=lambda c: c.interval)
+    fast, slow = _Creature(1), _Creature(4)
+    scheduler.add(fast, {})
+    scheduler.add(slow, {})
+    _run(scheduler, 8)
+    assert (fast.steps, slow.steps) == (8, 2)
+
+
+def test_removed_creature_is_not_stepped():
+    scheduler = TickScheduler(budget=10.0, priority=lambda c: 1.0, interval=lambda c: c.interval)
+    kept, removed = _Creature(), _Creature()
+    scheduler.add(kept, {})
+    scheduler.add(removed, {})
+    _run(scheduler, 2)
+    scheduler.remove(removed)
+    _run(scheduler, 3)
+    assert (kept.steps, removed.steps) == (5, 2)
+    assert len(scheduler) == 1
+
+
+def test_deferred_creatures_go_first_next_tick():
+    scheduler = TickScheduler(budget=0.0, slice_size=1, priority=lambda c: 1.0, interval=lambda c: 100)
+    creatures = [_Creature() for _ in range(3)]
+    for creature in creatures:
+        scheduler.add(creature, {})
+    _run(scheduler, 3)
+    assert [c.steps for c in creatures] == [1, 1, 1]
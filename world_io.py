@@ -0,0 +1,224 @@
+import json
+from typing import Any, IO, Iterable, Iterator
+from data_structures import JSONObject, decode_value, lazy_decoding
+
+
+FORMAT = "my_little_rpg/jsonl"
+VERSION = 1
+CHUNK_SIZE = 1 << 16
+
+
+def _default(value: Any) -> Any:
+    """Záložní převod pro hodnoty, které to_dict() nechává beze změny (např. množiny `_flags`)."""
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if isinstance(value, JSONObject):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_record(obj: JSONObject | dict[str, Any]) -> str:
+    """Jeden objekt jako jeden řádek JSON (bez konce řádku)."""
+    data = obj.to_dict() if isinstance(obj, JSONObject) else obj
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=_default)
+
+
+class WorldWriter:
+    """
+    Zapisuje registrované objekty jako JSON Lines, záznam po záznamu.
+
+    První řádek je hlavička ({"_format", "_version", ...}), každý další
+    jeden objekt nejvyšší úrovně, takže paměť omezuje největší záznam,
+    ne celý svět.
+    """
+
+    def __init__(self, target: str | IO[str], **header: Any) -> None:
+        self._owns = isinstance(target, str)
+        self._fp: IO[str] = open(target, "w", encoding="utf-8") if isinstance(target, str) else target
+        self.count = 0
+        self._fp.write(json.dumps({"_format": FORMAT, "_version": VERSION, **header},
+                                  default=_default) + "\n")
+
+    def write(self, obj: JSONObject | dict[str, Any]) -> None:
+        self._fp.write(encode_record(obj))
+        self._fp.write("\n")
+        self.count += 1
+
+    def write_many(self, objects: Iterable[JSONObject | dict[str, Any]]) -> int:
+        for obj in objects:
+            self.write(obj)
+        return self.count
+
+    def close(self) -> None:
+        if self._owns:
+            self._fp.close()
+        else:
+            self._fp.flush()
+
+    def __enter__(self) -> "WorldWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def dump_stream(objects: Iterable[JSONObject | dict[str, Any]], target: str | IO[str], **header: Any) -> int:
+    """Zapíše všechny objekty do souboru světa (JSON Lines); vrací počet záznamů."""
+    with WorldWriter(target, **header) as writer:
+        return writer.write_many(objects)
+
+
+def _check_header(line: str) -> dict[str, Any]:
+    header = json.loads(line) if line.strip() else {}
+    if header.get("_format") != FORMAT:
+        raise ValueError("Not a streamed world file (missing header).")
+    if header.get("_version", 0) > VERSION:
+        raise ValueError(f"Unsupported world file version {header['_version']}.")
+    return header
+
+
+def read_header(source: str | IO[str]) -> dict[str, Any]:
+    if isinstance(source, str):
+        with open(source, "r", encoding="utf-8") as f:
+            return _check_header(f.readline())
+    return _check_header(source.readline())
+
+
+def _decode(record: Any, lazy: bool) -> Any:
+    if not lazy:
+        return decode_value(record)
+    with lazy_decoding():
+        return decode_value(record)
+
+
+def iter_load(source: str | IO[str], decode: bool = True,
+              types: Iterable[str] | None = None, lazy: bool = False) -> Iterator[Any]:
+    """
+    Postupně vrací záznamy ze souboru světa (JSON Lines).
+
+    S `decode` se záznamy vytvoří jako registrované třídy, jinak se vrací
+    syrové dicty. `types` ponechá jen záznamy s uvedeným `_object`, ostatní
+    se přeskočí bez dekódování. `lazy` vytvoří jen objekty nejvyšší úrovně,
+    vnořené se dekódují až při prvním přístupu (viz data_structures.lazy_decoding).
+    """
+    if isinstance(source, str):
+        with open(source, "r", encoding="utf-8") as f:
+            yield from iter_load(f, decode, types, lazy)
+        return
+    _check_header(source.readline())
+    wanted = None if types is None else frozenset(types)
+    for line in source:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if wanted is not None and record.get("_object") not in wanted:
+            continue
+        yield _decode(record, lazy) if decode else record
+
+
+def record_offsets(path: str) -> list[int]:
+    """Bajtové offsety všech záznamů pro náhodný přístup přes load_record()."""
+    offsets = []
+    with open(path, "rb") as f:
+        f.readline()
+        position = f.tell()
+        for line in f:
+            if line.strip():
+                offsets.append(position)
+            position += len(line)
+    return offsets
+
+
+def load_record(path: str, offset: int, decode: bool = True, lazy: bool = False) -> Any:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        record = json.loads(f.readline())
+    return _decode(record, lazy) if decode else record
+
+
+def iter_json_array(fp: IO[str], chunk_size: int = CHUNK_SIZE) -> Iterator[tuple[int, Any]]:
+    """
+    Postupně parsuje JSON pole nejvyšší úrovně (races.json, starší uložené hry).
+
+    Vrací dvojice (offset, prvek), kde `offset` je pozice znaku prvku
+    v proudu. V paměti se drží jen právě parsovaný prvek.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    consumed = 0  # znaky už odebrané ze začátku bufferu
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buffer, pos, consumed, eof
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        consumed += pos
+        pos = 0
+        return True
+
+    def skip(chars: str) -> None:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            if pos < len(buffer) or not fill():
+                return
+
+    skip(" \t\r\n")
+    if pos >= len(buffer) or buffer[pos] != "[":
+        raise ValueError("Expected a JSON array.")
+    pos += 1
+    while True:
+        skip(" \t\r\n,")
+        if pos >= len(buffer):
+            raise ValueError("Unterminated JSON array.")
+        if buffer[pos] == "]":
+            return
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if not fill():
+                    raise
+                continue
+            # číslo rozdělené hranicí bloku by se dekódovalo předčasně
+            if (isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and (end == len(buffer) or buffer[end] not in " \t\r\n,]")
+                    and not eof and fill()):
+                continue
+            break
+        yield consumed + pos, value
+        pos = end
+
+
+def main() -> None:
+    import os
+    import tempfile
+    import time
+    from benchmark import CREATURE_DATA
+    from creature import Creature
+
+    path = os.path.join(tempfile.gettempdir(), "world.jsonl")
+    creatures = (Creature({**CREATURE_DATA, "name": f"Dragon {i}"}) for i in range(1000))
+    print("Written:", dump_stream(creatures, path, world="demo"), "records")
+    print("Header:", read_header(path))
+    start = time.perf_counter()
+    names = [c.name for c in iter_load(path)]
+    eager = time.perf_counter() - start
+    start = time.perf_counter()
+    lazy_names = [c.name for c in iter_load(path, lazy=True)]
+    print("Loaded:", len(names), names[:3], f"(eager {eager:.3f} s, lazy {time.perf_counter() - start:.3f} s,",
+          f"same: {names == lazy_names})")
+    offsets = record_offsets(path)
+    print("Record 500:", load_record(path, offsets[500]).name)
+
+    with open("races.json", "r", encoding="utf-8") as f:
+        print("Races:", [race["name"] for _, race in iter_json_array(f)])
+
+
+if __name__ == "__main__":
+    main()